@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+AI审查链路基准测试
+启动本地模拟LLM服务，分别通过 AIReviewer.review_patent（逐个审查）、batch_review（异步批量）、
+GUI审查线程（流式输出）和 review_prompts（多提示词并发）审查一组生成的说明书，
+离线评估并发、限流重试和流式输出的参数
+
+用法:
+    python benchmarks/bench_ai_review.py [--scenario review batch gui prompts] [--docs 8] [--chars 6000]
+        [--concurrency 4] [--rpm 600] [--latency 0.2] [--tps 200] [--rate-429 0.1] ...
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_llm_server import MockLLMServer, add_behavior_arguments, behavior_from_args
+
+
+SCENARIOS = ['review', 'batch', 'gui', 'prompts']
+SECTIONS = ['技术领域', '背景技术', '发明内容', '附图说明', '具体实施方式']
+PROMPT = "请检查说明书的结构完整性，各部分是否清楚、完整，并给出修改建议"
+
+
+def make_documents(directory: Path, count: int, chars: int) -> List[str]:
+    """生成指定数量和长度的说明书（各文档内容不同，避免命中审查结果缓存）"""
+    from docx import Document
+    
+    paths = []
+    per_section = max(1, chars // len(SECTIONS))
+    for i in range(count):
+        doc = Document()
+        doc.add_heading(f"一种基准测试用装置{i + 1}", level=1)
+        for section in SECTIONS:
+            doc.add_paragraph(section)
+            sentence = f"本实施例{i + 1}中，{section}部分描述了装置的组成和工作原理。"
+            text = sentence * (per_section // len(sentence) + 1)
+            for start in range(0, per_section, 500):
+                doc.add_paragraph(text[start:min(start + 500, per_section)])
+        path = directory / f"说明书_{i + 1}.docx"
+        doc.save(str(path))
+        paths.append(str(path))
+    return paths
+
+
+def percentile(values: List[float], ratio: float) -> float:
+    """计算分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+
+def bench_review(paths: List[str], cache_dir: Path) -> Dict:
+    """逐个调用 review_patent（非流式，长文档分段审查）"""
+    from src.ai_reviewer.response_cache import ResponseCache
+    from src.ai_reviewer.reviewer import AIReviewer
+    
+    reviewer = AIReviewer(ResponseCache(cache_dir / "review.db"))
+    latencies, failures = [], 0
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            reviewer.review_patent(path, PROMPT, use_cache=False)
+        except Exception as e:
+            failures += 1
+            print(f"  ⚠️  {Path(path).name}: {e}")
+        latencies.append(time.perf_counter() - start)
+    reviewer.response_cache.close()
+    return {'latencies': latencies, 'failures': failures}
+
+
+def bench_batch(paths: List[str], cache_dir: Path, args: argparse.Namespace) -> Dict:
+    """调用 batch_review 并发审查全部文档"""
+    from src.ai_reviewer.response_cache import ResponseCache
+    from src.ai_reviewer.reviewer import AIReviewer
+    
+    reviewer = AIReviewer(ResponseCache(cache_dir / "batch.db"))
+    results = reviewer.batch_review(
+        paths,
+        PROMPT,
+        max_concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        max_retries=args.retries
+    )
+    reviewer.response_cache.close()
+    
+    for path, result in results.items():
+        if not result['success']:
+            print(f"  ⚠️  {Path(path).name}: {result['error']}")
+    return {
+        'latencies': [result['latency'] for result in results.values()],
+        'failures': sum(1 for result in results.values() if not result['success']),
+        'retries': sum(result['retries'] for result in results.values())
+    }
+
+
+def bench_gui(paths: List[str]) -> Dict:
+    """在当前线程中执行GUI审查线程的 run()（流式输出，统计首次显示时间和界面刷新次数）"""
+    from PySide6.QtCore import QCoreApplication
+    from src.gui.main_window import AIReviewThread
+    
+    app = QCoreApplication.instance() or QCoreApplication([])
+    latencies, first_partial, updates, failures = [], [], [], 0
+    for path in paths:
+        thread = AIReviewThread(path, PROMPT)
+        events = {'first': None, 'updates': 0, 'error': None}
+        start = time.perf_counter()
+        
+        def on_partial(_text, events=events, start=start):
+            if events['first'] is None:
+                events['first'] = time.perf_counter() - start
+            events['updates'] += 1
+        
+        thread.partial_result.connect(on_partial)
+        thread.error.connect(lambda message, events=events: events.update(error=message))
+        thread.run()
+        
+        latencies.append(time.perf_counter() - start)
+        if events['error']:
+            failures += 1
+            print(f"  ⚠️  {Path(path).name}: {events['error']}")
+        else:
+            first_partial.append(events['first'] or 0.0)
+            updates.append(events['updates'])
+    app.processEvents()
+    
+    return {
+        'latencies': latencies,
+        'failures': failures,
+        'first_partial': sum(first_partial) / len(first_partial) if first_partial else 0.0,
+        'updates': sum(updates) / len(updates) if updates else 0.0
+    }
+
+
+def bench_prompts(paths: List[str]) -> Dict:
+    """对每个文档调用 review_prompts 并发执行全部预设提示词（统计上下文缓存命中）"""
+    from src.ai_reviewer.reviewer import AIReviewer
+    
+    reviewer = AIReviewer()
+    latencies, failures = [], 0
+    for path in paths:
+        content = reviewer.extract_document_text(path)
+        start = time.perf_counter()
+        results = reviewer.review_prompts(content, use_cache=False)
+        latencies.append(time.perf_counter() - start)
+        failures += sum(1 for result in results.values() if not result['success'])
+    return {'latencies': latencies, 'failures': failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI审查链路基准测试（使用本地模拟LLM服务）")
+    parser.add_argument('--scenario', nargs='+', choices=SCENARIOS, default=SCENARIOS, help="测试场景")
+    parser.add_argument('--docs', type=int, default=8, help="文档数量")
+    parser.add_argument('--chars', type=int, default=6000, help="每个文档的正文字符数")
+    parser.add_argument('--concurrency', type=int, default=4, help="批量审查的并发调用数")
+    parser.add_argument('--rpm', type=float, default=600, help="批量审查每分钟最多调用数")
+    parser.add_argument('--retries', type=int, default=5, help="批量审查单次调用的最大重试次数")
+    parser.add_argument('--timeout', type=float, default=30, help="客户端读写超时（秒）")
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as temp_dir, MockLLMServer(behavior_from_args(args)) as server:
+        # 共享客户端在首次使用时读取这些环境变量
+        os.environ['DEEPSEEK_BASE_URL'] = server.base_url
+        os.environ['DEEPSEEK_API_KEY'] = "mock"
+        os.environ['DEEPSEEK_TIMEOUT'] = str(args.timeout)
+        
+        temp_path = Path(temp_dir)
+        paths = make_documents(temp_path, args.docs, args.chars)
+        print(f"模拟服务: {server.base_url}  文档: {args.docs} 个 × {args.chars} 字")
+        print()
+        print(f"{'场景':<8} {'总耗时(s)':>10} {'平均(s)':>8} {'P95(s)':>8} {'失败':>5} {'请求':>6} "
+              f"{'429/500':>8} {'重试':>5} {'连接':>5} {'并发峰值':>8} {'缓存命中':>8}")
+        print("-" * 96)
+        
+        extras = []
+        for scenario in args.scenario:
+            server.reset_stats()
+            start = time.perf_counter()
+            if scenario == 'review':
+                summary = bench_review(paths, temp_path)
+            elif scenario == 'batch':
+                summary = bench_batch(paths, temp_path, args)
+            elif scenario == 'gui':
+                summary = bench_gui(paths)
+            else:
+                summary = bench_prompts(paths)
+            wall = time.perf_counter() - start
+            
+            stats = server.stats
+            latencies = summary['latencies']
+            hit_ratio = stats.cache_hit_tokens / stats.prompt_tokens if stats.prompt_tokens else 0.0
+            retries = summary.get('retries')
+            print(f"{scenario:<8} {wall:>10.2f} {sum(latencies) / len(latencies):>8.2f} "
+                  f"{percentile(latencies, 0.95):>8.2f} {summary['failures']:>5} {stats.requests:>6} "
+                  f"{stats.errors_429:>4}/{stats.errors_500:<3} {'-' if retries is None else retries:>5} "
+                  f"{stats.connections:>5} {stats.max_active:>8} {hit_ratio:>8.0%}")
+            if scenario == 'gui':
+                extras.append(
+                    f"gui: 平均首次显示 {summary['first_partial']:.2f}s，平均界面刷新 {summary['updates']:.0f} 次"
+                )
+        
+        for line in extras:
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+预览页面渲染基准测试
+对比PyMuPDF像素图转换为Qt图像的两种方式的每页耗时：
+PNG编码后解码（tobytes("png") + QImage.fromData）与直接按像素内存构造QImage（pixmap_to_qimage）
+
+用法:
+    python benchmarks/bench_preview_render.py [PDF路径 ...]
+    （无图形界面时设置 QT_QPA_PLATFORM=offscreen）
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pymupdf
+from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtWidgets import QApplication
+
+from src.gui.page_renderer import pixmap_to_qimage
+
+
+ZOOM_LEVELS = [1.0, 1.5, 3.0]
+SAMPLE_PAGES = 20
+
+
+def make_sample_pdf(path: Path):
+    """生成含文字和图形的示例PDF"""
+    doc = pymupdf.open()
+    for i in range(SAMPLE_PAGES):
+        page = doc.new_page()
+        text = f"[{i + 1:04d}] The device comprises a housing, a sensor and a controller. " * 40
+        page.insert_textbox(pymupdf.Rect(72, 72, 523, 500), text, fontsize=9)
+        for j in range(8):
+            page.draw_circle((150 + j * 40, 650), 18, color=(0, 0, 0), fill=(j / 8, 0.4, 1 - j / 8))
+    doc.save(str(path))
+    doc.close()
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def bench(pdf_path: str, zoom: float) -> dict:
+    """逐页渲染并分别用两种方式转换，返回各阶段的每页平均耗时（毫秒）"""
+    totals = {'render': 0.0, 'png': 0.0, 'direct': 0.0, 'to_pixmap': 0.0}
+    doc = pymupdf.open(pdf_path)
+    matrix = pymupdf.Matrix(zoom, zoom)
+    
+    for page in doc:
+        pix, elapsed = timed(lambda: page.get_pixmap(matrix=matrix, alpha=False))
+        totals['render'] += elapsed
+        
+        _, elapsed = timed(lambda: QImage.fromData(pix.tobytes("png")))
+        totals['png'] += elapsed
+        
+        image, elapsed = timed(lambda: pixmap_to_qimage(pix))
+        totals['direct'] += elapsed
+        
+        _, elapsed = timed(lambda: QPixmap.fromImage(image))
+        totals['to_pixmap'] += elapsed
+    
+    count = len(doc)
+    doc.close()
+    return {name: total / count * 1000 for name, total in totals.items()}
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    paths = sys.argv[1:]
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if not paths:
+            sample = Path(temp_dir) / "sample.pdf"
+            make_sample_pdf(sample)
+            paths = [str(sample)]
+        
+        print(f"{'文件':<16} {'缩放':>5} {'渲染(ms)':>9} {'PNG转换(ms)':>12} {'直接转换(ms)':>13} "
+              f"{'加速':>6} {'转QPixmap(ms)':>14}")
+        print("-" * 84)
+        for path in paths:
+            for zoom in ZOOM_LEVELS:
+                result = bench(path, zoom)
+                speedup = result['png'] / result['direct'] if result['direct'] else 0.0
+                print(f"{Path(path).name[:16]:<16} {zoom:>5.1f} {result['render']:>9.2f} "
+                      f"{result['png']:>12.2f} {result['direct']:>13.2f} {speedup:>5.1f}x "
+                      f"{result['to_pixmap']:>14.2f}")
+    
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
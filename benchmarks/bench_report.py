@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+PDF报告生成基准测试
+验证报告构建时间随检查结果数量线性增长
+
+用法:
+    python benchmarks/bench_report.py [结果数量 ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.report_generator.pdf_generator import PDFReportGenerator
+from src.core.models import CheckReport, CheckResult, CheckCategory, Severity, PatentDocument
+
+
+DEFAULT_SIZES = [1000, 5000, 10000, 50000]
+
+
+def make_report(count: int) -> CheckReport:
+    """构造包含指定数量检查结果的报告（模拟逐图检测结果）"""
+    report = CheckReport(document=PatentDocument(specification_path="说明书.docx"))
+    categories = list(CheckCategory)
+    severities = list(Severity)
+    
+    for i in range(count):
+        report.add_result(CheckResult(
+            rule_id=f"I{i % 7:03d}",
+            category=categories[i % len(categories)],
+            severity=severities[i % len(severities)],
+            title=f"图{i // 4 + 1}检测结果",
+            description=f"图{i // 4 + 1}分辨率为{150 + i % 100}dpi，低于要求的200dpi <可能影响印刷>",
+            location=f"附图/图{i // 4 + 1}.png",
+            suggestion="请重新以不低于200dpi的分辨率导出附图" if i % 3 == 0 else None,
+            reference="专利审查指南 第一部分第一章 4.3" if i % 5 == 0 else None
+        ))
+    return report
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    generator = PDFReportGenerator()
+    
+    print(f"{'结果数':>8} {'构建内容(s)':>12} {'生成PDF(s)':>12} {'每项(ms)':>10} {'文件(MB)':>10}")
+    print("-" * 58)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count in sizes:
+            report = make_report(count)
+            output_path = os.path.join(temp_dir, f"report_{count}.pdf")
+            
+            start = time.perf_counter()
+            generator.build_story(report)
+            story_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            generator.generate(report, output_path)
+            total_time = time.perf_counter() - start
+            
+            size_mb = os.path.getsize(output_path) / 1024 / 1024
+            print(f"{count:>8} {story_time:>12.2f} {total_time:>12.2f} "
+                  f"{total_time / count * 1000:>10.3f} {size_mb:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
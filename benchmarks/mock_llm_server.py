@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+本地模拟LLM服务
+兼容OpenAI/DeepSeek的 /chat/completions 接口，可配置首字延迟、生成速度、流式分块和错误注入
+（429限流、5xx、超时无响应、流式中断），并模拟DeepSeek上下文缓存的用量统计
+
+用法:
+    python benchmarks/mock_llm_server.py [--port 8765] [--latency 0.5] [--tps 50] [--rate-429 0.1] [--server-concurrency 4] ...
+
+启动后设置以下环境变量，GUI和命令行即通过模拟服务审查:
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8765
+    DEEPSEEK_API_KEY=mock
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ai_reviewer.token_budget import estimate_tokens
+
+
+RESPONSE_TEXT = (
+    "一、说明书结构完整，技术领域、背景技术、发明内容、附图说明和具体实施方式齐全。"
+    "二、建议在具体实施方式中补充关键参数的取值范围，并说明各实施例之间的区别。"
+    "三、权利要求中的技术特征应在说明书中得到清楚、完整的支持。"
+)
+CHARS_PER_TOKEN = 2             # 模拟输出时每个token对应的字符数
+CACHE_BLOCK_TOKENS = 64         # DeepSeek上下文缓存以64 token为单位命中
+PREFIX_STEP_CHARS = 64          # 记录请求前缀的字符间隔
+
+
+@dataclass
+class MockBehavior:
+    """模拟服务的行为配置"""
+    latency: float = 0.2                # 首字延迟（秒），非流式请求同样先等待该时间
+    tokens_per_second: float = 200.0    # 生成速度，<=0 表示不限速
+    response_tokens: int = 300          # 每次回复的token数（不超过请求的max_tokens）
+    chunk_tokens: int = 4               # 流式输出时每个数据块的token数
+    error_429_rate: float = 0.0         # 返回429的概率
+    error_500_rate: float = 0.0         # 返回500的概率
+    timeout_rate: float = 0.0           # 不响应（等待hang_seconds后断开）的概率
+    disconnect_rate: float = 0.0        # 流式输出到一半时断开连接的概率
+    hang_seconds: float = 30.0          # 模拟超时时的等待时间
+    retry_after: Optional[float] = None  # 429响应的Retry-After头（秒）
+    max_concurrency: int = 0            # 服务端并发上限，超出时返回429；0表示不限
+    prefix_cache: bool = True           # 是否模拟上下文缓存（相同前缀计为缓存命中）
+    seed: Optional[int] = None          # 随机数种子（错误注入可复现）
+
+
+@dataclass
+class ServerStats:
+    """模拟服务的请求统计"""
+    connections: int = 0        # 建立的TCP连接数（小于请求数说明连接被复用）
+    requests: int = 0
+    streamed: int = 0
+    errors_429: int = 0
+    errors_500: int = 0
+    timeouts: int = 0
+    disconnects: int = 0
+    max_active: int = 0         # 同时处理的最大请求数
+    prompt_tokens: int = 0
+    cache_hit_tokens: int = 0
+    completion_tokens: int = 0
+    
+    def to_dict(self) -> Dict[str, int]:
+        """转换为字典"""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """请求处理（HTTP/1.1，支持长连接）"""
+    
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+    
+    def setup(self):
+        super().setup()
+        self.server.mock.count('connections')
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/stats'):
+            self._send_json(200, self.server.mock.stats.to_dict())
+        else:
+            self._send_error(404, "not_found", "Not Found")
+    
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_error(404, "not_found", "Not Found")
+            return
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            self._send_error(400, "invalid_request_error", "Invalid JSON")
+            return
+        
+        mock = self.server.mock
+        if not mock.enter():
+            mock.count('errors_429')
+            self._send_error(429, "rate_limit_error", "Too many concurrent requests")
+            return
+        try:
+            self._complete(mock, request)
+        finally:
+            mock.leave()
+    
+    def _complete(self, mock: "MockLLMServer", request: dict):
+        """处理一次对话补全请求"""
+        behavior = mock.behavior
+        mock.count('requests')
+        
+        fault = mock.draw_fault()
+        if fault == 'timeout':
+            mock.count('timeouts')
+            time.sleep(behavior.hang_seconds)
+            self.close_connection = True
+            return
+        if fault == '429':
+            mock.count('errors_429')
+            self._send_error(429, "rate_limit_error", "Rate limit reached")
+            return
+        if fault == '500':
+            mock.count('errors_500')
+            self._send_error(500, "server_error", "Internal server error")
+            return
+        
+        usage = mock.usage(request)
+        model = request.get('model') or "mock"
+        max_tokens = request.get('max_tokens') or behavior.response_tokens
+        tokens = max(1, min(behavior.response_tokens, max_tokens))
+        usage['completion_tokens'] = tokens
+        usage['total_tokens'] = usage['prompt_tokens'] + tokens
+        mock.count('completion_tokens', tokens)
+        finish_reason = 'length' if max_tokens < behavior.response_tokens else 'stop'
+        
+        time.sleep(behavior.latency)
+        if request.get('stream'):
+            mock.count('streamed')
+            include_usage = bool((request.get('stream_options') or {}).get('include_usage'))
+            self._stream(mock, model, tokens, finish_reason, usage if include_usage else None)
+            return
+        
+        mock.generate_delay(tokens)
+        self._send_json(200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': mock.text(0, tokens)},
+                'finish_reason': finish_reason
+            }],
+            'usage': usage
+        })
+    
+    def _stream(self, mock: "MockLLMServer", model: str, tokens: int, finish_reason: str, usage: Optional[dict]):
+        """以SSE分块输出回复"""
+        behavior = mock.behavior
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        
+        def event(choices, **extra):
+            payload = {'id': chunk_id, 'object': 'chat.completion.chunk', 'created': created,
+                       'model': model, 'choices': choices, **extra}
+            self._write_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n")
+        
+        try:
+            event([{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}])
+            disconnect_at = tokens // 2 if mock.draw_disconnect() else None
+            step = max(1, behavior.chunk_tokens)
+            for start in range(0, tokens, step):
+                if disconnect_at is not None and start >= disconnect_at:
+                    mock.count('disconnects')
+                    self.close_connection = True
+                    return
+                count = min(step, tokens - start)
+                mock.generate_delay(count)
+                event([{'index': 0, 'delta': {'content': mock.text(start, count)}, 'finish_reason': None}])
+            event([{'index': 0, 'delta': {}, 'finish_reason': finish_reason}])
+            if usage is not None:
+                event([], usage=usage)
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+    
+    def _write_chunk(self, text: str):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+    
+    def _send_json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _send_error(self, status: int, error_type: str, message: str):
+        headers = {}
+        retry_after = self.server.mock.behavior.retry_after
+        if status == 429 and retry_after is not None:
+            headers['Retry-After'] = f"{retry_after:g}"
+        self._send_json(status, {'error': {'message': message, 'type': error_type, 'code': status}}, headers)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    mock: "MockLLMServer"
+
+
+class MockLLMServer:
+    """本地模拟LLM服务（在后台线程中运行）"""
+    
+    def __init__(self, behavior: Optional[MockBehavior] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化模拟服务
+        
+        Args:
+            behavior: 行为配置，默认无错误注入
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+        """
+        self.behavior = behavior or MockBehavior()
+        self.stats = ServerStats()
+        self._lock = threading.Lock()
+        self._random = random.Random(self.behavior.seed)
+        self._active = 0
+        self._prefixes: Set[str] = set()
+        self._server = _Server((host, port), _Handler)
+        self._server.mock = self
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        """API基础URL（传给DeepSeekClient或设置为DEEPSEEK_BASE_URL）"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> "MockLLMServer":
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def serve_forever(self):
+        """在当前线程中运行服务，直到按下Ctrl+C"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+    
+    def stop(self):
+        """停止服务"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def reset_stats(self):
+        """清空请求统计和上下文缓存"""
+        with self._lock:
+            self.stats = ServerStats()
+            self._prefixes.clear()
+    
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            setattr(self.stats, name, getattr(self.stats, name) + value)
+    
+    def enter(self) -> bool:
+        """登记一个进行中的请求，超出并发上限时返回False"""
+        with self._lock:
+            limit = self.behavior.max_concurrency
+            if limit and self._active >= limit:
+                return False
+            self._active += 1
+            self.stats.max_active = max(self.stats.max_active, self._active)
+            return True
+    
+    def leave(self):
+        with self._lock:
+            self._active -= 1
+    
+    def draw_fault(self) -> Optional[str]:
+        """按配置的概率抽取本次请求注入的错误"""
+        behavior = self.behavior
+        with self._lock:
+            roll = self._random.random()
+        for fault, rate in (('timeout', behavior.timeout_rate),
+                            ('429', behavior.error_429_rate),
+                            ('500', behavior.error_500_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+    
+    def draw_disconnect(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.behavior.disconnect_rate
+    
+    def generate_delay(self, tokens: int):
+        """按生成速度等待"""
+        if self.behavior.tokens_per_second > 0:
+            time.sleep(tokens / self.behavior.tokens_per_second)
+    
+    @staticmethod
+    def text(start: int, tokens: int) -> str:
+        """第start个token起的tokens个token的回复文本"""
+        begin = start * CHARS_PER_TOKEN % len(RESPONSE_TEXT)
+        length = tokens * CHARS_PER_TOKEN
+        repeated = RESPONSE_TEXT * (length // len(RESPONSE_TEXT) + 2)
+        return repeated[begin:begin + length]
+    
+    def usage(self, request: dict) -> dict:
+        """
+        计算请求的输入用量
+        
+        开启prefix_cache时，与之前请求相同的最长前缀按64 token为单位计为缓存命中
+        """
+        prompt = ''.join(
+            f"{message.get('role', '')}\n{message.get('content') or ''}\n"
+            for message in request.get('messages') or []
+        )
+        prompt_tokens = estimate_tokens(prompt)
+        hit_tokens = 0
+        
+        if self.behavior.prefix_cache:
+            hit_chars, digests = self._match_prefix(prompt)
+            hit_tokens = estimate_tokens(prompt[:hit_chars]) // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS
+            with self._lock:
+                self._prefixes.update(digests)
+        
+        hit_tokens = min(hit_tokens, prompt_tokens)
+        self.count('prompt_tokens', prompt_tokens)
+        self.count('cache_hit_tokens', hit_tokens)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'prompt_cache_hit_tokens': hit_tokens,
+            'prompt_cache_miss_tokens': prompt_tokens - hit_tokens
+        }
+    
+    def _match_prefix(self, prompt: str) -> Tuple[int, Set[str]]:
+        """返回已缓存的最长前缀长度（字符）和本次请求的全部前缀摘要"""
+        digest = hashlib.sha1()
+        digests = set()
+        hit_chars = 0
+        with self._lock:
+            known = set(self._prefixes)
+        for end in range(PREFIX_STEP_CHARS, len(prompt) + 1, PREFIX_STEP_CHARS):
+            digest.update(prompt[end - PREFIX_STEP_CHARS:end].encode('utf-8'))
+            key = digest.copy().hexdigest()
+            digests.add(key)
+            # 前缀摘要包含之前的全部内容，命中即说明整个前缀相同
+            if key in known:
+                hit_chars = end
+        return hit_chars, digests
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser):
+    """添加模拟服务行为的命令行参数"""
+    group = parser.add_argument_group("模拟服务行为")
+    group.add_argument('--latency', type=float, default=MockBehavior.latency, help="首字延迟（秒）")
+    group.add_argument('--tps', type=float, default=MockBehavior.tokens_per_second, help="每秒生成token数")
+    group.add_argument('--tokens', type=int, default=MockBehavior.response_tokens, help="每次回复的token数")
+    group.add_argument('--chunk-tokens', type=int, default=MockBehavior.chunk_tokens, help="流式数据块的token数")
+    group.add_argument('--rate-429', type=float, default=0.0, help="返回429的概率")
+    group.add_argument('--rate-500', type=float, default=0.0, help="返回500的概率")
+    group.add_argument('--rate-timeout', type=float, default=0.0, help="不响应的概率")
+    group.add_argument('--rate-disconnect', type=float, default=0.0, help="流式输出中途断开的概率")
+    group.add_argument('--hang', type=float, default=MockBehavior.hang_seconds, help="模拟超时的等待时间（秒）")
+    group.add_argument('--retry-after', type=float, default=None, help="429响应的Retry-After（秒）")
+    group.add_argument('--server-concurrency', type=int, default=0, help="服务端并发上限，超出返回429")
+    group.add_argument('--no-prefix-cache', action='store_true', help="不模拟上下文缓存")
+    group.add_argument('--seed', type=int, default=None, help="随机数种子")
+
+
+def behavior_from_args(args: argparse.Namespace) -> MockBehavior:
+    """由命令行参数构造行为配置"""
+    return MockBehavior(
+        latency=args.latency,
+        tokens_per_second=args.tps,
+        response_tokens=args.tokens,
+        chunk_tokens=args.chunk_tokens,
+        error_429_rate=args.rate_429,
+        error_500_rate=args.rate_500,
+        timeout_rate=args.rate_timeout,
+        disconnect_rate=args.rate_disconnect,
+        hang_seconds=args.hang,
+        retry_after=args.retry_after,
+        max_concurrency=args.server_concurrency,
+        prefix_cache=not args.no_prefix_cache,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟LLM服务（OpenAI兼容接口）")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+    
+    server = MockLLMServer(behavior_from_args(args), args.host, args.port)
+    print(f"✓ 模拟LLM服务已启动: {server.base_url}")
+    print(f"  export DEEPSEEK_BASE_URL={server.base_url} DEEPSEEK_API_KEY=mock")
+    print(f"  请求统计: {server.base_url}/stats")
+    server.serve_forever()
+    print(f"\n请求统计: {json.dumps(server.stats.to_dict(), ensure_ascii=False)}")
+
+
+if __name__ == '__main__':
+    main()
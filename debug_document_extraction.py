@@ -44,8 +44,8 @@ def main():
         print("测试：组装给DeepSeek的完整消息")
         print("=" * 70)
         
-        from src.ai_reviewer.deepseek_client import DeepSeekClient
-        client = DeepSeekClient()
+        from src.ai_reviewer.deepseek_client import get_shared_client
+        client = get_shared_client()
         
         prompt = "请审查这份专利申请的技术方案完整性和逻辑性"
         
@@ -3,9 +3,10 @@
 验证摘要附图的完整性和合规性
 """
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 import re
 
+from src.core.config_snapshot import ConfigSnapshot
 from src.core.models import CheckResult, Severity, CheckCategory, PatentDocument
 from src.core.rule_engine import BaseChecker
 
@@ -13,9 +14,11 @@ from src.core.rule_engine import BaseChecker
 class AbstractChecker(BaseChecker):
     """摘要附图检查器"""
     
-    def __init__(self):
+    SECTIONS = ('abstract_rules',)
+    
+    def __init__(self, config: dict = None, snapshot: Optional[ConfigSnapshot] = None):
         """初始化检查器"""
-        super().__init__()
+        super().__init__(config, snapshot)
         self.category = CheckCategory.ABSTRACT
     
     def check(self, document: PatentDocument) -> List[CheckResult]:
@@ -2,6 +2,10 @@
 AI审查模块 - 基于DeepSeek大模型的专利审查
 """
 from .reviewer import AIReviewer
-from .deepseek_client import DeepSeekClient
+from .chunked_review import ChunkedReviewer
+from .deepseek_client import DeepSeekClient, get_shared_client
+from .response_cache import ResponseCache
+from .token_budget import TokenBudget, estimate_tokens
 
-__all__ = ['AIReviewer', 'DeepSeekClient']
+__all__ = ['AIReviewer', 'ChunkedReviewer', 'DeepSeekClient', 'ResponseCache', 'TokenBudget', 'estimate_tokens',
+           'get_shared_client']
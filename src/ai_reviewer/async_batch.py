@@ -0,0 +1,223 @@
+"""
+异步批量AI审查
+基于asyncio并发审查多个文档：令牌桶限流、并发上限、429/5xx指数退避重试（带随机抖动）
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import openai
+
+from .chunked_review import ChunkedReviewer
+from .deepseek_client import DeepSeekClient, TokenUsage
+
+
+class TokenBucket:
+    """令牌桶限流器（asyncio）"""
+    
+    def __init__(self, rate: float, capacity: float):
+        """
+        初始化令牌桶
+        
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 令牌桶容量（允许的突发请求数）
+        """
+        if rate <= 0:
+            raise ValueError("无法创建令牌桶: rate必须大于0")
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """取得一个令牌，令牌不足时等待"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class ReviewStats:
+    """单个文档的审查统计"""
+    calls: int = 0              # API调用次数（分段审查时大于1）
+    retries: int = 0            # 重试次数
+    usage: TokenUsage = field(default_factory=TokenUsage)  # token用量（含缓存命中）
+
+
+def is_retryable(error: Exception) -> bool:
+    """判断API错误是否可重试（限流、服务端错误、网络错误）"""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """读取响应头中的Retry-After（秒）"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncBatchReviewer:
+    """异步批量审查器"""
+    
+    MAX_CONCURRENCY = 4         # 同时进行的API调用数
+    REQUESTS_PER_MINUTE = 60    # 每分钟最多发起的API调用数
+    MAX_RETRIES = 5             # 单次调用的最大重试次数
+    BASE_DELAY = 1.0            # 退避基准时间（秒）
+    MAX_DELAY = 60.0            # 单次退避上限（秒）
+    
+    def __init__(
+        self,
+        reviewer,
+        client: DeepSeekClient,
+        max_concurrency: int = MAX_CONCURRENCY,
+        requests_per_minute: float = REQUESTS_PER_MINUTE,
+        max_retries: int = MAX_RETRIES,
+        max_content_length: Optional[int] = None
+    ):
+        """
+        初始化批量审查器
+        
+        Args:
+            reviewer: AIReviewer实例（提供文档读取和审查结果缓存）
+            client: DeepSeek客户端
+            max_concurrency: 同时进行的API调用数
+            requests_per_minute: 每分钟最多发起的API调用数
+            max_retries: 单次调用的最大重试次数
+            max_content_length: 单次调用的最大文档内容长度，超过时分段审查；默认按token预算计算
+        """
+        self.reviewer = reviewer
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.chunked = ChunkedReviewer(client, max_chunk_chars=max_content_length)
+    
+    async def run(self, document_paths: Sequence[str], prompt: str) -> Dict[str, dict]:
+        """
+        并发审查多个文档
+        
+        Args:
+            document_paths: 文档路径列表
+            prompt: 审查提示词
+            
+        Returns:
+            字典，键为文档路径，值包含 success、result/error、latency（秒）、retries、calls、usage
+        """
+        self._bucket = TokenBucket(self.requests_per_minute / 60, self.max_concurrency)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        paths = list(dict.fromkeys(document_paths))
+        results = await asyncio.gather(*(self.review_document(path, prompt) for path in paths))
+        return dict(zip(paths, results))
+    
+    async def review_document(self, document_path: str, prompt: str) -> dict:
+        """
+        审查单个文档（短文档单次调用，长文档分段审查后合并）
+        
+        Returns:
+            审查结果字典
+        """
+        stats = ReviewStats()
+        start = time.monotonic()
+        try:
+            document_content = await asyncio.to_thread(self.reviewer.extract_document_text, document_path)
+            
+            key = self.reviewer.cache_key(document_content, prompt, self.client)
+            cache = self.reviewer.response_cache
+            cached = cache.get(key) if cache else None
+            if cached is not None:
+                result = cached
+            else:
+                result = await self._review_content(document_content, prompt, stats)
+                if cache and result:
+                    cache.put(key, result, self.client.model)
+            
+            return {
+                'success': True,
+                'result': result,
+                'latency': time.monotonic() - start,
+                'retries': stats.retries,
+                'calls': stats.calls,
+                'usage': stats.usage.to_dict()
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f"AI审查失败: {e}",
+                'latency': time.monotonic() - start,
+                'retries': stats.retries,
+                'calls': stats.calls,
+                'usage': stats.usage.to_dict()
+            }
+    
+    async def _review_content(self, document_content: str, prompt: str, stats: ReviewStats) -> str:
+        """审查文档内容"""
+        plan = self.chunked.plan(document_content, prompt)
+        if plan.single_call:
+            messages = DeepSeekClient.build_review_messages(document_content, prompt)
+            return await self._call(messages, stats, plan.output_tokens)
+        
+        chunks = self.chunked.split(document_content, plan.chunk_chars)
+        findings = await asyncio.gather(*(
+            self._call(
+                DeepSeekClient.build_review_messages(
+                    chunk.text, ChunkedReviewer.build_chunk_prompt(chunk, i, len(chunks), prompt)
+                ),
+                stats,
+                plan.map_output_tokens
+            )
+            for i, chunk in enumerate(chunks)
+        ))
+        messages = ChunkedReviewer.build_reduce_messages(prompt, chunks, findings)
+        return await self._call(messages, stats, plan.output_tokens)
+    
+    async def _call(
+        self,
+        messages: List[Dict[str, str]],
+        stats: ReviewStats,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        限流并发调用API，可重试错误按指数退避（带随机抖动）重试
+        
+        Raises:
+            Exception: 不可重试的错误，或重试次数用尽
+        """
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            async with self._semaphore:
+                stats.calls += 1
+                try:
+                    return await self.client.async_chat_completion(
+                        messages, max_tokens=max_tokens, usage=stats.usage
+                    )
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        raise Exception(f"DeepSeek API调用失败: {str(e)}")
+                    error = e
+            
+            # 退避期间释放并发名额
+            delay = random.uniform(0, min(self.MAX_DELAY, self.BASE_DELAY * 2 ** attempt))
+            delay = max(delay, retry_after(error) or 0)
+            attempt += 1
+            stats.retries += 1
+            await asyncio.sleep(delay)
@@ -0,0 +1,329 @@
+"""
+长文档分段审查
+按说明书章节切分文档，各段并发审查（map），再合并为一份审查意见（reduce）
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from .deepseek_client import DeepSeekClient, TokenUsage
+from .token_budget import ReviewPlan, TokenBudget, estimate_tokens
+from ..core.config_loader import ConfigLoader
+from ..structure_checker.section_locator import SectionLocator
+
+
+@dataclass
+class ReviewChunk:
+    """参与审查的一段文档"""
+    title: str                  # 章节名称，如 "背景技术"、"具体实施方式（2/3）"
+    text: str                   # 文档内容
+
+
+class ChunkedReviewer:
+    """长文档分段审查器"""
+    
+    MAX_WORKERS = 4             # 并发审查的分段数上限
+    PREAMBLE_TITLE = "开头部分"  # 第一个章节之前的内容（发明名称等）
+    
+    def __init__(
+        self,
+        client: DeepSeekClient,
+        max_chunk_chars: Optional[int] = None,
+        max_workers: int = MAX_WORKERS,
+        locator: Optional[SectionLocator] = None,
+        budget: Optional[TokenBudget] = None
+    ):
+        """
+        初始化分段审查器
+        
+        Args:
+            client: DeepSeek客户端
+            max_chunk_chars: 单次调用的最大文档内容长度（字符数），默认按token预算计算
+            max_workers: 并发审查的分段数上限
+            locator: 章节定位器，默认使用配置中的必需/可选章节
+            budget: token预算规划器，默认按默认模型的上下文和输出上限规划
+        """
+        self.client = client
+        self.max_chunk_chars = max_chunk_chars
+        self.max_workers = max_workers
+        self.budget = budget or TokenBudget()
+        if locator is None:
+            rules = ConfigLoader().snapshot().structure
+            locator = SectionLocator(rules.required_sections, rules.optional_sections)
+        self.locator = locator
+    
+    def plan(self, document_content: str, prompt: str) -> ReviewPlan:
+        """
+        规划文档审查的调用方式
+        
+        Args:
+            document_content: 文档内容
+            prompt: 审查提示词
+            
+        Returns:
+            调用规划（指定了max_chunk_chars时按字符数切分，不限制输出长度）
+        """
+        if self.max_chunk_chars is None:
+            return self.budget.plan(document_content, prompt)
+        
+        return ReviewPlan(
+            document_tokens=estimate_tokens(document_content),
+            single_call=len(document_content) <= self.max_chunk_chars,
+            chunk_chars=self.max_chunk_chars,
+            output_tokens=None,
+            map_output_tokens=None
+        )
+    
+    def split(self, document_content: str, max_chunk_chars: Optional[int] = None) -> List[ReviewChunk]:
+        """
+        按章节切分文档
+        
+        过长的章节按段落继续切分，相邻的短章节合并，每段不超过max_chunk_chars
+        
+        Args:
+            document_content: 文档内容
+            max_chunk_chars: 每段的最大字符数，默认使用初始化时的设置
+            
+        Returns:
+            分段列表（按文档顺序）
+        """
+        lines = document_content.split('\n')
+        scan = self.locator.begin()
+        for line in lines:
+            scan.feed(line.strip())
+        spans = list(scan.finish(total=len(lines)).values())
+        
+        # 章节边界：开头部分 + 各章节
+        segments = []
+        first = spans[0].start if spans else len(lines)
+        if first > 0:
+            segments.append((self.PREAMBLE_TITLE, lines[:first]))
+        for span in spans:
+            segments.append((span.name, lines[span.start:span.end]))
+        
+        limit = max_chunk_chars or self.max_chunk_chars or self.budget.plan(document_content, '').chunk_chars
+        pieces = []
+        for title, segment_lines in segments:
+            text = '\n'.join(segment_lines).strip()
+            if text:
+                pieces.extend(self._split_long(title, text, limit))
+        return self._merge_short(pieces, limit)
+    
+    @staticmethod
+    def _split_long(title: str, text: str, limit: int) -> List[ReviewChunk]:
+        """按段落切分过长的章节"""
+        if len(text) <= limit:
+            return [ReviewChunk(title, text)]
+        
+        parts = []
+        current = []
+        size = 0
+        for line in text.split('\n'):
+            # 单个超长段落按字符硬切分
+            while len(line) > limit:
+                if current:
+                    parts.append('\n'.join(current))
+                    current, size = [], 0
+                parts.append(line[:limit])
+                line = line[limit:]
+            if current and size + len(line) + 1 > limit:
+                parts.append('\n'.join(current))
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+        if current:
+            parts.append('\n'.join(current))
+        
+        parts = [part for part in parts if part.strip()]
+        return [
+            ReviewChunk(f"{title}（{i}/{len(parts)}）", part)
+            for i, part in enumerate(parts, 1)
+        ]
+    
+    @staticmethod
+    def _merge_short(pieces: List[ReviewChunk], limit: int) -> List[ReviewChunk]:
+        """合并相邻的短章节，减少调用次数"""
+        chunks = []
+        for piece in pieces:
+            last = chunks[-1] if chunks else None
+            if last and len(last.text) + len(piece.text) + 2 <= limit:
+                chunks[-1] = ReviewChunk(f"{last.title}、{piece.title}", f"{last.text}\n\n{piece.text}")
+            else:
+                chunks.append(piece)
+        return chunks
+    
+    def map(
+        self,
+        chunks: Sequence[ReviewChunk],
+        prompt: str,
+        on_progress: Optional[Callable[[str], None]] = None,
+        max_tokens: Optional[int] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> List[str]:
+        """
+        并发审查各分段
+        
+        Args:
+            chunks: 分段列表
+            prompt: 审查提示词
+            on_progress: 进度回调（可选）
+            max_tokens: 每段审查意见的最大生成token数（可选）
+            usage: 用量累计对象（可选）
+            
+        Returns:
+            各分段的审查意见（与chunks顺序一致）
+            
+        Raises:
+            Exception: 任一分段审查失败
+        """
+        findings = [''] * len(chunks)
+        workers = max(1, min(self.max_workers, len(chunks)))
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._review_chunk, chunk, i, len(chunks), prompt, max_tokens, usage): i
+                for i, chunk in enumerate(chunks)
+            }
+            done = 0
+            for future in as_completed(futures):
+                i = futures[future]
+                findings[i] = future.result()
+                done += 1
+                if on_progress:
+                    on_progress(f"✓ 已审查 {done}/{len(chunks)} 段: {chunks[i].title}")
+        
+        return findings
+    
+    def _review_chunk(
+        self,
+        chunk: ReviewChunk,
+        index: int,
+        total: int,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> str:
+        """审查单个分段"""
+        chunk_prompt = self.build_chunk_prompt(chunk, index, total, prompt)
+        return self.client.review_with_prompt(chunk.text, chunk_prompt, max_tokens=max_tokens, usage=usage)
+    
+    @staticmethod
+    def build_chunk_prompt(chunk: ReviewChunk, index: int, total: int, prompt: str) -> str:
+        """
+        组装单个分段的审查提示词
+        
+        Args:
+            chunk: 分段
+            index: 分段序号（从0开始）
+            total: 分段总数
+            prompt: 审查提示词
+        """
+        return (
+            f"{prompt}\n\n"
+            f"（本次仅提供说明书的「{chunk.title}」部分，为全文第{index + 1}/{total}段。"
+            f"请只针对这部分内容列出发现的问题和修改建议，简明扼要，不要总结全文。）"
+        )
+    
+    @staticmethod
+    def build_reduce_messages(
+        prompt: str,
+        chunks: Sequence[ReviewChunk],
+        findings: Sequence[str]
+    ) -> List[Dict[str, str]]:
+        """
+        组装合并各分段审查意见的消息列表
+        
+        Args:
+            prompt: 审查提示词
+            chunks: 分段列表
+            findings: 各分段的审查意见
+            
+        Returns:
+            消息列表
+        """
+        sections = '\n\n'.join(
+            f"【{chunk.title}】\n{finding.strip()}"
+            for chunk, finding in zip(chunks, findings)
+        )
+        user_message = f"""以下是对同一份专利申请文档各部分分别审查得到的意见。
+请根据审查要求将它们合并为一份完整的审查意见：去除重复内容，指出各部分之间的不一致之处，并按问题的严重程度整理。
+
+审查要求：
+{prompt}
+
+各部分审查意见：
+{sections}
+
+请提供专业的审查意见。"""
+        
+        return [
+            {"role": "system", "content": DeepSeekClient.DEFAULT_SYSTEM_PROMPT},
+            {"role": "user", "content": user_message}
+        ]
+    
+    def review(
+        self,
+        document_content: str,
+        prompt: str,
+        on_progress: Optional[Callable[[str], None]] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> str:
+        """
+        审查完整文档（短文档单次调用，长文档分段审查后合并）
+        
+        Args:
+            document_content: 文档内容
+            prompt: 审查提示词
+            on_progress: 进度回调（可选）
+            usage: 用量累计对象（可选），累计全部调用的token用量
+            
+        Returns:
+            审查结果
+        """
+        plan = self.plan(document_content, prompt)
+        if plan.single_call:
+            return self.client.review_with_prompt(
+                document_content, prompt, max_tokens=plan.output_tokens, usage=usage
+            )
+        
+        chunks = self.split(document_content, plan.chunk_chars)
+        findings = self.map(chunks, prompt, on_progress, plan.map_output_tokens, usage)
+        messages = self.build_reduce_messages(prompt, chunks, findings)
+        return self.client.chat_completion(messages, max_tokens=plan.output_tokens, usage=usage)
+    
+    def stream_review(
+        self,
+        document_content: str,
+        prompt: str,
+        on_progress: Optional[Callable[[str], None]] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> Iterator[str]:
+        """
+        审查完整文档，以流式方式产出最终审查意见
+        
+        长文档先并发审查各分段，再流式输出合并结果
+        
+        Args:
+            document_content: 文档内容
+            prompt: 审查提示词
+            on_progress: 进度回调（可选）
+            usage: 用量累计对象（可选），累计全部调用的token用量
+            
+        Yields:
+            审查结果的文本增量
+        """
+        plan = self.plan(document_content, prompt)
+        if plan.single_call:
+            yield from self.client.stream_review_with_prompt(
+                document_content, prompt, max_tokens=plan.output_tokens, usage=usage
+            )
+            return
+        
+        chunks = self.split(document_content, plan.chunk_chars)
+        if on_progress:
+            on_progress(f"📑 文档约 {plan.document_tokens} tokens，分为 {len(chunks)} 段并发审查...")
+        findings = self.map(chunks, prompt, on_progress, plan.map_output_tokens, usage)
+        if on_progress:
+            on_progress("⏳ 正在合并各段审查意见...")
+        messages = self.build_reduce_messages(prompt, chunks, findings)
+        yield from self.client.stream_chat_completion(messages, max_tokens=plan.output_tokens, usage=usage)
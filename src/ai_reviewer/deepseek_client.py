@@ -2,30 +2,133 @@
 DeepSeek API客户端封装
 支持调用DeepSeek Chat模型进行专利审查
 """
+import asyncio
 import os
-from typing import Optional, List, Dict
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
-from openai import OpenAI
+from openai import (
+    DEFAULT_CONNECTION_LIMITS,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    OpenAI,
+    Timeout,
+)
 from dotenv import load_dotenv
 
 
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env():
+    """加载.env文件（每个进程只加载一次）"""
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            load_dotenv()
+            _env_loaded = True
+
+
+@dataclass
+class TokenUsage:
+    """
+    API调用的token用量（可累计多次调用）
+    
+    cache_hit_tokens为命中服务端上下文缓存的输入token数（DeepSeek返回prompt_cache_hit_tokens，
+    OpenAI兼容接口返回prompt_tokens_details.cached_tokens），接口未返回时保持为0
+    """
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hit_tokens: int = 0
+    cache_miss_tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    
+    def add(self, usage: Any):
+        """
+        累计一次调用的用量
+        
+        Args:
+            usage: API响应中的usage对象（可为None）
+        """
+        if usage is None:
+            return
+        hit = getattr(usage, 'prompt_cache_hit_tokens', None)
+        miss = getattr(usage, 'prompt_cache_miss_tokens', None)
+        if hit is None:
+            details = getattr(usage, 'prompt_tokens_details', None)
+            hit = getattr(details, 'cached_tokens', None) or 0
+            miss = (usage.prompt_tokens or 0) - hit
+        
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+            self.cache_hit_tokens += hit or 0
+            self.cache_miss_tokens += miss or 0
+    
+    def to_dict(self) -> Dict[str, int]:
+        """转换为字典"""
+        return {
+            'calls': self.calls,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cache_hit_tokens': self.cache_hit_tokens,
+            'cache_miss_tokens': self.cache_miss_tokens
+        }
+
+
 class DeepSeekClient:
     """DeepSeek API客户端"""
     
     # DeepSeek API配置
     DEFAULT_BASE_URL = "https://api.deepseek.com"
     DEFAULT_MODEL = "deepseek-chat"
+    DEFAULT_TEMPERATURE = 0.7
+    
+    # 默认审查系统提示词
+    DEFAULT_SYSTEM_PROMPT = (
+        "你是一个专业的专利审查助手，擅长分析专利申请文档。"
+        "请基于用户的要求，对提供的专利文档进行专业、详细的审查分析。"
+        "你的分析应该包括：问题识别、改进建议、法律风险提示等。"
+        "请使用清晰、结构化的中文进行回答。"
+    )
+    
+    # 超时配置（秒），可通过环境变量 DEEPSEEK_TIMEOUT / DEEPSEEK_CONNECT_TIMEOUT 覆盖
+    DEFAULT_TIMEOUT = 300.0         # 读写超时，流式调用为相邻两个数据块的间隔
+    DEFAULT_CONNECT_TIMEOUT = 10.0
     
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    # 连接池：保持长连接，复用TLS会话（openai依赖httpx，沿用其Limits类型）
+    POOL_LIMITS = type(DEFAULT_CONNECTION_LIMITS)(
+        max_connections=32,
+        max_keepalive_connections=16,
+        keepalive_expiry=300.0
+    )
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: Optional[Timeout] = None,
+        model: Optional[str] = None
+    ):
         """
         初始化DeepSeek客户端
         
+        应用内请使用 get_shared_client() 获取共享实例，避免重复建立连接
+        
         Args:
             api_key: API密钥，如果未提供则从环境变量读取
-            base_url: API基础URL，默认使用DeepSeek官方地址
+            base_url: API基础URL，默认读取环境变量 DEEPSEEK_BASE_URL，未设置时使用DeepSeek官方地址
+            timeout: 超时配置，默认读取环境变量
+            model: 默认使用的模型名称，未指定时使用 DEFAULT_MODEL
         """
         # 加载.env文件
-        load_dotenv()
+        load_env()
         
         # 获取API密钥
         self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
@@ -35,18 +138,54 @@ class DeepSeekClient:
             )
         
         # 初始化OpenAI客户端（DeepSeek兼容OpenAI API格式）
-        self.base_url = base_url or self.DEFAULT_BASE_URL
+        self.base_url = base_url or os.getenv("DEEPSEEK_BASE_URL") or self.DEFAULT_BASE_URL
+        self.timeout = timeout or self.default_timeout()
+        self.model = model or self.DEFAULT_MODEL
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url=self.base_url
+            base_url=self.base_url,
+            timeout=self.timeout,
+            http_client=DefaultHttpxClient(timeout=self.timeout, limits=self.POOL_LIMITS)
         )
+        # 异步客户端绑定事件循环，每个事件循环各用一个
+        self._async_clients: Dict[asyncio.AbstractEventLoop, AsyncOpenAI] = {}
+        self._async_lock = threading.Lock()
+    
+    @classmethod
+    def default_timeout(cls) -> Timeout:
+        """
+        读取环境变量中的超时配置
+        
+        Returns:
+            超时配置
+            
+        Raises:
+            ValueError: 环境变量不是有效的秒数
+        """
+        load_env()
+        values = {}
+        for name, default in (
+            ("DEEPSEEK_TIMEOUT", cls.DEFAULT_TIMEOUT),
+            ("DEEPSEEK_CONNECT_TIMEOUT", cls.DEFAULT_CONNECT_TIMEOUT),
+        ):
+            value = os.getenv(name)
+            try:
+                values[name] = float(value) if value else default
+            except ValueError:
+                raise ValueError(f"无法解析环境变量 {name}: {value!r} 不是有效的秒数")
+        return Timeout(values["DEEPSEEK_TIMEOUT"], connect=values["DEEPSEEK_CONNECT_TIMEOUT"])
+    
+    def close(self):
+        """关闭同步客户端的连接池"""
+        self.client.close()
         
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
-        model: str = DEFAULT_MODEL,
-        temperature: float = 0.7,
+        model: Optional[str] = None,
+        temperature: float = DEFAULT_TEMPERATURE,
         max_tokens: Optional[int] = None,
+        usage: Optional[TokenUsage] = None,
         **kwargs
     ) -> str:
         """
@@ -54,9 +193,10 @@ class DeepSeekClient:
         
         Args:
             messages: 消息列表，格式为 [{"role": "user/system/assistant", "content": "..."}]
-            model: 使用的模型名称
+            model: 使用的模型名称，默认使用客户端的 model
             temperature: 温度参数，控制输出的随机性 (0.0-2.0)
             max_tokens: 最大生成token数
+            usage: 用量累计对象（可选），调用完成后累加本次用量
             **kwargs: 其他API参数
             
         Returns:
@@ -67,13 +207,16 @@ class DeepSeekClient:
         """
         try:
             response = self.client.chat.completions.create(
-                model=model,
+                model=model or self.model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 **kwargs
             )
             
+            if usage is not None:
+                usage.add(response.usage)
+            
             # 提取返回内容
             if response.choices and len(response.choices) > 0:
                 return response.choices[0].message.content
@@ -83,6 +226,124 @@ class DeepSeekClient:
         except Exception as e:
             raise Exception(f"DeepSeek API调用失败: {str(e)}")
     
+    def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = DEFAULT_TEMPERATURE,
+        max_tokens: Optional[int] = None,
+        usage: Optional[TokenUsage] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        以流式方式调用DeepSeek Chat API
+        
+        Args:
+            messages: 消息列表，格式为 [{"role": "user/system/assistant", "content": "..."}]
+            model: 使用的模型名称，默认使用客户端的 model
+            temperature: 温度参数，控制输出的随机性 (0.0-2.0)
+            max_tokens: 最大生成token数
+            usage: 用量累计对象（可选），调用完成后累加本次用量
+            **kwargs: 其他API参数
+            
+        Yields:
+            模型生成的文本增量
+            
+        Raises:
+            Exception: API调用失败时抛出异常
+        """
+        if usage is not None:
+            kwargs.setdefault('stream_options', {"include_usage": True})
+        
+        try:
+            stream = self.client.chat.completions.create(
+                model=model or self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                **kwargs
+            )
+            
+            for chunk in stream:
+                # 开启include_usage时，最后一个块只携带用量
+                if usage is not None and getattr(chunk, 'usage', None):
+                    usage.add(chunk.usage)
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    yield content
+                    
+        except Exception as e:
+            raise Exception(f"DeepSeek API调用失败: {str(e)}")
+    
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """
+        当前事件循环的异步OpenAI客户端（懒加载，须在事件循环中访问）
+        
+        关闭了SDK内置重试，由调用方统一控制限流和退避
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    max_retries=0,
+                    timeout=self.timeout,
+                    http_client=DefaultAsyncHttpxClient(timeout=self.timeout, limits=self.POOL_LIMITS)
+                )
+                self._async_clients[loop] = client
+            return client
+    
+    async def aclose(self):
+        """关闭当前事件循环的异步客户端（每次asyncio.run结束前调用）"""
+        with self._async_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+    
+    async def async_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = DEFAULT_TEMPERATURE,
+        max_tokens: Optional[int] = None,
+        usage: Optional[TokenUsage] = None,
+        **kwargs
+    ) -> str:
+        """
+        异步调用DeepSeek Chat API
+        
+        与chat_completion不同，API错误原样抛出（如openai.RateLimitError），便于调用方判断是否重试
+        
+        Args:
+            messages: 消息列表，格式为 [{"role": "user/system/assistant", "content": "..."}]
+            model: 使用的模型名称，默认使用客户端的 model
+            temperature: 温度参数，控制输出的随机性 (0.0-2.0)
+            max_tokens: 最大生成token数
+            usage: 用量累计对象（可选），调用完成后累加本次用量
+            **kwargs: 其他API参数
+            
+        Returns:
+            API返回的文本内容
+        """
+        response = await self.async_client.chat.completions.create(
+            model=model or self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        if usage is not None:
+            usage.add(response.usage)
+        if not response.choices:
+            raise ValueError("API返回结果为空")
+        return response.choices[0].message.content
+    
     def simple_chat(self, user_message: str, system_message: Optional[str] = None) -> str:
         """
         简化的对话接口
@@ -107,7 +368,9 @@ class DeepSeekClient:
         self, 
         document_content: str, 
         review_prompt: str,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        usage: Optional[TokenUsage] = None
     ) -> str:
         """
         使用指定提示词审查文档
@@ -116,31 +379,76 @@ class DeepSeekClient:
             document_content: 文档内容
             review_prompt: 审查提示词
             system_prompt: 系统提示词（可选）
+            max_tokens: 最大生成token数（可选）
+            usage: 用量累计对象（可选）
             
         Returns:
             审查结果
         """
+        messages = self.build_review_messages(document_content, review_prompt, system_prompt)
+        return self.chat_completion(messages, max_tokens=max_tokens, usage=usage)
+    
+    def stream_review_with_prompt(
+        self,
+        document_content: str,
+        review_prompt: str,
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> Iterator[str]:
+        """
+        使用指定提示词流式审查文档
+        
+        Args:
+            document_content: 文档内容
+            review_prompt: 审查提示词
+            system_prompt: 系统提示词（可选）
+            max_tokens: 最大生成token数（可选）
+            usage: 用量累计对象（可选）
+            
+        Yields:
+            审查结果的文本增量
+        """
+        messages = self.build_review_messages(document_content, review_prompt, system_prompt)
+        return self.stream_chat_completion(messages, max_tokens=max_tokens, usage=usage)
+    
+    @staticmethod
+    def build_review_messages(
+        document_content: str,
+        review_prompt: str,
+        system_prompt: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        组装文档审查的消息列表
+        
+        Args:
+            document_content: 文档内容
+            review_prompt: 审查提示词
+            system_prompt: 系统提示词（可选）
+            
+        Returns:
+            消息列表
+        """
         # 默认系统提示词
         if not system_prompt:
-            system_prompt = (
-                "你是一个专业的专利审查助手，擅长分析专利申请文档。"
-                "请基于用户的要求，对提供的专利文档进行专业、详细的审查分析。"
-                "你的分析应该包括：问题识别、改进建议、法律风险提示等。"
-                "请使用清晰、结构化的中文进行回答。"
-            )
+            system_prompt = DeepSeekClient.DEFAULT_SYSTEM_PROMPT
         
-        # 组装用户消息
-        user_message = f"""请根据以下要求审查这份专利申请文档：
-
-审查要求：
-{review_prompt}
+        # 组装用户消息：文档在前、审查要求在后，同一文档的不同审查要求共享相同前缀，
+        # 可命中服务端上下文缓存
+        user_message = f"""以下是一份专利申请文档。
 
 专利文档内容：
 {document_content}
 
+请根据以下要求审查上述专利申请文档：
+{review_prompt}
+
 请提供专业的审查意见。"""
         
-        return self.simple_chat(user_message, system_prompt)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
     
     def test_connection(self) -> bool:
         """
@@ -154,3 +462,78 @@ class DeepSeekClient:
             return bool(response)
         except Exception:
             return False
+
+
+def coalesce_deltas(
+    deltas: Iterable[str],
+    interval: float = 0.05,
+    max_chars: int = 2000
+) -> Iterator[str]:
+    """
+    合并流式文本增量，减少界面刷新次数
+    
+    第一个增量立即产出（首字延迟不变），之后按时间间隔或字符数批量产出
+    
+    Args:
+        deltas: 文本增量序列
+        interval: 最短产出间隔（秒）
+        max_chars: 缓冲字符数达到该值时立即产出
+        
+    Yields:
+        合并后的文本片段
+    """
+    buffer = []
+    size = 0
+    last = None
+    
+    for delta in deltas:
+        buffer.append(delta)
+        size += len(delta)
+        now = time.monotonic()
+        if last is None or now - last >= interval or size >= max_chars:
+            yield ''.join(buffer)
+            buffer.clear()
+            size = 0
+            last = now
+    
+    if buffer:
+        yield ''.join(buffer)
+
+
+_shared_lock = threading.Lock()
+_shared_clients: Dict[Tuple[str, str], DeepSeekClient] = {}
+
+
+def get_shared_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> DeepSeekClient:
+    """
+    获取进程内共享的DeepSeek客户端
+    
+    相同API密钥和地址复用同一个客户端及其连接池，GUI、命令行和批量审查共用
+    
+    Args:
+        api_key: API密钥，如果未提供则从环境变量读取
+        base_url: API基础URL，默认读取环境变量 DEEPSEEK_BASE_URL，未设置时使用DeepSeek官方地址
+        
+    Returns:
+        DeepSeekClient实例
+    """
+    load_env()
+    key = (
+        api_key or os.getenv("DEEPSEEK_API_KEY") or "",
+        base_url or os.getenv("DEEPSEEK_BASE_URL") or DeepSeekClient.DEFAULT_BASE_URL
+    )
+    with _shared_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = DeepSeekClient(api_key, base_url)
+            _shared_clients[key] = client
+        return client
+
+
+def close_shared_clients():
+    """关闭全部共享客户端（应用退出时调用）"""
+    with _shared_lock:
+        clients = list(_shared_clients.values())
+        _shared_clients.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,172 @@
+"""
+AI审查结果缓存
+以 文档内容+提示词+API地址+模型参数 的哈希为键，将审查结果保存在SQLite中，跨会话复用
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+"""
+
+# 缓存键格式版本，键的组成方式变化时递增
+KEY_VERSION = 3
+
+_BLANK_LINES = re.compile(r'\n{3,}')
+_TRAILING_SPACE = re.compile(r'[ \t　]+\n')
+
+
+def normalize_content(text: str) -> str:
+    """
+    规范化文档内容，使仅空白不同的同一文档得到相同的缓存键
+    
+    Args:
+        text: 文档内容
+        
+    Returns:
+        规范化后的文本
+    """
+    text = unicodedata.normalize('NFC', text)
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = _TRAILING_SPACE.sub('\n', text + '\n')
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+class ResponseCache:
+    """AI审查结果缓存"""
+    
+    DEFAULT_TTL_DAYS = 30
+    DEFAULT_MAX_ENTRIES = 500
+    
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        ttl_days: float = DEFAULT_TTL_DAYS,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        """
+        打开（必要时创建）缓存数据库
+        
+        Args:
+            db_path: 数据库文件路径，默认 ~/.patentcheck/ai_cache.db
+            ttl_days: 缓存有效期（天）
+            max_entries: 最多缓存条数，超出时淘汰最久未使用的结果
+        """
+        self.db_path = Path(db_path) if db_path else Path.home() / ".patentcheck" / "ai_cache.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+    
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            self._conn.close()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    
+    @staticmethod
+    def make_key(
+        document_content: str,
+        prompt: str,
+        base_url: str,
+        model: str,
+        temperature: float,
+        system_prompt: str
+    ) -> str:
+        """
+        计算缓存键
+        
+        Args:
+            document_content: 文档内容
+            prompt: 审查提示词
+            base_url: 返回审查结果的API地址（不同服务的结果互不复用）
+            model: 实际使用的模型名称
+            temperature: 温度参数
+            system_prompt: 系统提示词
+            
+        Returns:
+            缓存键（sha256十六进制）
+        """
+        payload = json.dumps([
+            KEY_VERSION,
+            hashlib.sha256(normalize_content(document_content).encode('utf-8')).hexdigest(),
+            prompt.strip(),
+            base_url.rstrip('/'),
+            model,
+            round(float(temperature), 3),
+            system_prompt.strip()
+        ], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存的审查结果
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            审查结果，未命中或已过期返回None
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+    
+    def put(self, key: str, response: str, model: str = ""):
+        """
+        保存审查结果，并淘汰过期和超出容量的条目
+        
+        Args:
+            key: 缓存键
+            response: 审查结果
+            model: 模型名称
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
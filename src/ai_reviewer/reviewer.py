@@ -2,12 +2,18 @@
 AI审查器核心模块
 提供专利文档的AI审查功能
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
-from docx import Document
-import pymupdf  # PyMuPDF
+from typing import Callable, Dict, List, Optional
 
-from .deepseek_client import DeepSeekClient
+from .async_batch import AsyncBatchReviewer
+from .chunked_review import ChunkedReviewer
+from .deepseek_client import DeepSeekClient, TokenUsage, get_shared_client
+from .response_cache import ResponseCache
+from .text_cleaner import clean_pdf_pages, clean_text
+from ..file_parser.docx_stream import DocxStreamReader
+from ..file_parser.parser import FileParser
 
 
 class AIReviewer:
@@ -21,21 +27,52 @@ class AIReviewer:
         "请分析专利申请中可能存在的法律风险"
     ]
     
-    def __init__(self):
-        """初始化AI审查器"""
+    def __init__(self, response_cache: Optional[ResponseCache] = None):
+        """
+        初始化AI审查器
+        
+        Args:
+            response_cache: 审查结果缓存，默认使用 ~/.patentcheck/ai_cache.db
+        """
         self.client = None
+        self.response_cache = response_cache
     
     def _get_client(self) -> DeepSeekClient:
         """
-        获取DeepSeek客户端实例（懒加载）
+        获取DeepSeek客户端实例（懒加载，使用进程内共享的客户端）
         
         Returns:
             DeepSeekClient实例
         """
         if self.client is None:
-            self.client = DeepSeekClient()
+            self.client = get_shared_client()
         return self.client
     
+    def _get_cache(self) -> ResponseCache:
+        """获取审查结果缓存（懒加载）"""
+        if self.response_cache is None:
+            self.response_cache = ResponseCache()
+        return self.response_cache
+    
+    @staticmethod
+    def cache_key(document_content: str, prompt: str, client: DeepSeekClient) -> str:
+        """
+        计算审查结果的缓存键（按客户端的API地址和模型，使用默认温度和系统提示词）
+        
+        Args:
+            document_content: 文档内容
+            prompt: 审查提示词
+            client: 执行审查的DeepSeek客户端
+        """
+        return ResponseCache.make_key(
+            document_content,
+            prompt,
+            client.base_url,
+            client.model,
+            DeepSeekClient.DEFAULT_TEMPERATURE,
+            DeepSeekClient.DEFAULT_SYSTEM_PROMPT
+        )
+    
     def extract_document_text(self, file_path: str) -> str:
         """
         从文档中提取文本内容
@@ -78,25 +115,27 @@ class AIReviewer:
             提取的文本
         """
         try:
-            doc = Document(file_path)
-            
-            # 提取所有段落文本
-            paragraphs = [para.text for para in doc.paragraphs if para.text.strip()]
-            
-            # 提取表格文本
+            paragraphs = []
             tables_text = []
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = ' | '.join(cell.text.strip() for cell in row.cells if cell.text.strip())
-                    if row_text:
-                        tables_text.append(row_text)
+            
+            # 流式提取段落和表格文本
+            with DocxStreamReader(file_path) as reader:
+                for block in reader.iter_blocks():
+                    if block.kind == 'paragraph':
+                        if block.text.strip():
+                            paragraphs.append(block.text)
+                    elif block.kind == 'table':
+                        for row in block.rows:
+                            row_text = ' | '.join(cell.strip() for cell in row if cell.strip())
+                            if row_text:
+                                tables_text.append(row_text)
             
             # 组合所有文本
             all_text = '\n'.join(paragraphs)
             if tables_text:
                 all_text += '\n\n【表格内容】\n' + '\n'.join(tables_text)
             
-            return all_text
+            return clean_text(all_text)
             
         except Exception as e:
             raise ValueError(f"读取Word文档失败: {str(e)}")
@@ -112,18 +151,10 @@ class AIReviewer:
             提取的文本
         """
         try:
-            doc = pymupdf.open(file_path)
-            text_parts = []
+            pages = [page.text for page in FileParser.iter_pdf_pages(file_path, use_ocr=False)]
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                if text.strip():
-                    text_parts.append(f"【第{page_num + 1}页】\n{text}")
-            
-            doc.close()
-            
-            return '\n\n'.join(text_parts)
+            # 去除页码、页眉页脚和多余空白，这些内容只会占用token
+            return clean_pdf_pages(pages)
             
         except Exception as e:
             raise ValueError(f"读取PDF文档失败: {str(e)}")
@@ -132,7 +163,8 @@ class AIReviewer:
         self, 
         document_path: str, 
         prompt: str,
-        max_content_length: int = 10000
+        max_content_length: Optional[int] = None,
+        use_cache: bool = True
     ) -> str:
         """
         审查专利文档
@@ -140,7 +172,9 @@ class AIReviewer:
         Args:
             document_path: 文档路径
             prompt: 审查提示词
-            max_content_length: 最大文档内容长度（字符数），超过会截断
+            max_content_length: 单次调用的最大文档内容长度（字符数），超过时按章节分段审查后合并；
+                默认按模型上下文和输出上限的token预算计算
+            use_cache: 是否使用审查结果缓存
             
         Returns:
             审查结果文本
@@ -152,52 +186,142 @@ class AIReviewer:
             # 提取文档内容
             document_content = self.extract_document_text(document_path)
             
-            # 如果文档过长，进行截断
-            if len(document_content) > max_content_length:
-                document_content = document_content[:max_content_length] + "\n\n[文档内容过长，已截断...]"
-            
             # 获取DeepSeek客户端
             client = self._get_client()
             
-            # 调用API进行审查
-            result = client.review_with_prompt(document_content, prompt)
+            # 相同文档、提示词和服务直接返回缓存结果
+            key = self.cache_key(document_content, prompt, client)
+            if use_cache:
+                cached = self._get_cache().get(key)
+                if cached is not None:
+                    return cached
+            
+            # 调用API进行审查（长文档分段并发审查）
+            chunked = ChunkedReviewer(client, max_chunk_chars=max_content_length)
+            result = chunked.review(document_content, prompt)
+            
+            if use_cache and result:
+                self._get_cache().put(key, result, client.model)
             
             return result
             
         except Exception as e:
             raise Exception(f"AI审查失败: {str(e)}")
     
+    def review_prompts(
+        self,
+        document_content: str,
+        prompts: Optional[List[str]] = None,
+        use_cache: bool = True,
+        on_result: Optional[Callable[[str, dict], None]] = None
+    ) -> Dict[str, dict]:
+        """
+        对同一文档并发执行多个审查提示词
+        
+        审查消息中文档在前、审查要求在后，各提示词共享相同的文档前缀。并发请求前先发送一次
+        只输出一个token的预热请求，使文档前缀写入服务端上下文缓存，之后各请求的文档部分按缓存命中计费。
+        
+        Args:
+            document_content: 文档内容（只提取一次）
+            prompts: 审查提示词列表，默认使用全部预设提示词
+            use_cache: 是否使用审查结果缓存
+            on_result: 单个提示词完成时的回调（可选），参数为 (提示词, 结果字典)
+            
+        Returns:
+            字典，键为提示词，值包含 success、result/error、cached（是否来自结果缓存）、
+            usage（token用量，含 cache_hit_tokens）
+        """
+        prompts = list(dict.fromkeys(prompts or self.PRESET_PROMPTS))
+        results = {}
+        pending = []
+        client = self._get_client()
+        
+        for prompt in prompts:
+            cached = self._get_cache().get(self.cache_key(document_content, prompt, client)) if use_cache else None
+            if cached is None:
+                pending.append(prompt)
+                continue
+            results[prompt] = {'success': True, 'result': cached, 'cached': True, 'usage': TokenUsage().to_dict()}
+            if on_result:
+                on_result(prompt, results[prompt])
+        
+        if not pending:
+            return {prompt: results[prompt] for prompt in prompts}
+        
+        chunked = ChunkedReviewer(client)
+        
+        if len(pending) > 1 and chunked.plan(document_content, pending[0]).single_call:
+            self._warm_up_prefix(client, document_content)
+        
+        def review(prompt: str) -> dict:
+            usage = TokenUsage()
+            try:
+                result = chunked.review(document_content, prompt, usage=usage)
+            except Exception as e:
+                return {'success': False, 'error': f"AI审查失败: {str(e)}", 'cached': False, 'usage': usage.to_dict()}
+            if use_cache and result:
+                self._get_cache().put(self.cache_key(document_content, prompt, client), result, client.model)
+            return {'success': True, 'result': result, 'cached': False, 'usage': usage.to_dict()}
+        
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            futures = {executor.submit(review, prompt): prompt for prompt in pending}
+            for future in as_completed(futures):
+                prompt = futures[future]
+                results[prompt] = future.result()
+                if on_result:
+                    on_result(prompt, results[prompt])
+        
+        return {prompt: results[prompt] for prompt in prompts}
+    
+    @staticmethod
+    def _warm_up_prefix(client: DeepSeekClient, document_content: str):
+        """发送只输出一个token的请求，将文档前缀写入服务端上下文缓存（失败不影响审查）"""
+        try:
+            messages = DeepSeekClient.build_review_messages(document_content, "请仅回复“收到”。")
+            client.chat_completion(messages, max_tokens=1)
+        except Exception as e:
+            print(f"⚠️  上下文缓存预热失败: {e}")
+    
     def batch_review(
         self, 
         document_paths: list, 
-        prompt: str
+        prompt: str,
+        max_concurrency: int = AsyncBatchReviewer.MAX_CONCURRENCY,
+        requests_per_minute: float = AsyncBatchReviewer.REQUESTS_PER_MINUTE,
+        max_retries: int = AsyncBatchReviewer.MAX_RETRIES
     ) -> dict:
         """
         批量审查多个文档
         
+        各文档并发审查，按每分钟调用数限流；限流（429）和服务端错误（5xx）按指数退避重试
+        
         Args:
             document_paths: 文档路径列表
             prompt: 审查提示词
+            max_concurrency: 同时进行的API调用数
+            requests_per_minute: 每分钟最多发起的API调用数
+            max_retries: 单次调用的最大重试次数
             
         Returns:
-            字典，键为文档路径，值为审查结果
+            字典，键为文档路径，值为审查结果（含 latency 耗时秒数和 retries 重试次数）
         """
-        results = {}
+        self._get_cache()
+        client = self._get_client()
+        batch = AsyncBatchReviewer(
+            self,
+            client,
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            max_retries=max_retries
+        )
         
-        for doc_path in document_paths:
+        async def run():
             try:
-                result = self.review_patent(doc_path, prompt)
-                results[doc_path] = {
-                    'success': True,
-                    'result': result
-                }
-            except Exception as e:
-                results[doc_path] = {
-                    'success': False,
-                    'error': str(e)
-                }
+                return await batch.run(document_paths, prompt)
+            finally:
+                await client.aclose()
         
-        return results
+        return asyncio.run(run())
     
     @staticmethod
     def get_preset_prompts() -> list:
@@ -0,0 +1,78 @@
+"""
+审查文本清理
+去除PDF页眉页脚、页码和多余空白，减少发送给模型的无效token
+"""
+import re
+from collections import Counter
+from typing import List, Sequence
+
+
+# 页眉页脚只在每页开头/结尾的若干行中查找（页码只看每页第一行和最后一行）
+EDGE_LINES = 2
+# 在至少该比例的页面中重复出现的边缘行视为页眉页脚
+REPEAT_RATIO = 0.5
+
+_PAGE_NUMBER = re.compile(
+    r'^(?:[-—–]\s*\d+\s*[-—–]|第\s*\d+\s*页(?:\s*[/，,]?\s*共\s*\d+\s*页)?|\d+\s*/\s*\d+|\d+|page\s*\d+(?:\s*of\s*\d+)?)$',
+    re.IGNORECASE
+)
+_DIGITS = re.compile(r'\d+')
+_SPACES = re.compile(r'[ \t　\xa0]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def clean_text(text: str) -> str:
+    """
+    合并连续空白和空行
+    
+    Args:
+        text: 原始文本
+        
+    Returns:
+        清理后的文本
+    """
+    lines = [_SPACES.sub(' ', line).strip() for line in text.replace('\r\n', '\n').split('\n')]
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def clean_pdf_pages(pages: Sequence[str]) -> str:
+    """
+    清理PDF逐页文本并拼接
+    
+    去除每页第一行和最后一行中的页码，以及在多数页面首尾重复出现的页眉页脚（数字不同视为相同，如"申请号 2024xxxx 第3页"）；
+    其他只含数字的行（表格数值、附图标记等）保留
+    
+    Args:
+        pages: 每页文本
+        
+    Returns:
+        清理后的全文
+    """
+    page_lines: List[List[str]] = [
+        [line for line in (_SPACES.sub(' ', l).strip() for l in page.split('\n')) if line]
+        for page in pages
+    ]
+    
+    # 统计每页首尾行的出现次数（每页只计一次；页码形式的行不参与，避免正文数字行被当作页眉页脚）
+    edge_counts = Counter()
+    for lines in page_lines:
+        edges = lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+        edge_counts.update({_DIGITS.sub('#', line) for line in edges if not _PAGE_NUMBER.match(line)})
+    
+    threshold = max(2, REPEAT_RATIO * len(page_lines))
+    repeated = {key for key, count in edge_counts.items() if count >= threshold}
+    
+    cleaned = []
+    for lines in page_lines:
+        last = len(lines) - 1
+        kept = [
+            line for i, line in enumerate(lines)
+            if not (
+                (i in (0, last) and _PAGE_NUMBER.match(line))
+                or ((i < EDGE_LINES or i > last - EDGE_LINES) and _DIGITS.sub('#', line) in repeated)
+            )
+        ]
+        if kept:
+            cleaned.append('\n'.join(kept))
+    
+    return clean_text('\n\n'.join(cleaned))
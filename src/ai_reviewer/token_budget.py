@@ -0,0 +1,150 @@
+"""
+Token预算
+估算文本token数，并按模型上下文和输出上限规划单次调用或分段审查
+"""
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from .deepseek_client import DeepSeekClient
+
+
+# DeepSeek官方换算：1个中文字符约0.6个token，1个英文字符约0.3个token
+CJK_TOKENS_PER_CHAR = 0.6
+OTHER_TOKENS_PER_CHAR = 0.3
+MESSAGE_OVERHEAD_TOKENS = 8         # 每条消息的角色和分隔符开销
+
+_CJK = re.compile(r'[　-〿㐀-䶿一-鿿豈-﫿＀-￯]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的token数
+    
+    Args:
+        text: 文本
+        
+    Returns:
+        估算的token数（向上取整）
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return math.ceil(cjk * CJK_TOKENS_PER_CHAR + (len(text) - cjk) * OTHER_TOKENS_PER_CHAR)
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    """模型的上下文和输出上限（token）"""
+    context_tokens: int
+    max_output_tokens: int
+
+
+# 保守取值，留出服务端模板和估算误差的余量
+MODEL_LIMITS: Dict[str, ModelLimits] = {
+    "deepseek-chat": ModelLimits(context_tokens=65536, max_output_tokens=8192),
+    "deepseek-reasoner": ModelLimits(context_tokens=65536, max_output_tokens=32768),
+}
+DEFAULT_LIMITS = ModelLimits(context_tokens=32768, max_output_tokens=4096)
+
+
+@dataclass(frozen=True)
+class ReviewPlan:
+    """一次文档审查的调用规划"""
+    document_tokens: int            # 文档内容的估算token数
+    single_call: bool               # 是否单次调用即可审查全文
+    chunk_chars: int                # 分段审查时每段的最大字符数
+    output_tokens: Optional[int]    # 最终审查意见（单次调用或合并调用）的max_tokens
+    map_output_tokens: Optional[int]  # 分段审查时每段意见的max_tokens
+
+
+class TokenBudget:
+    """Token预算规划器"""
+    
+    OUTPUT_TOKENS = 4096            # 最终审查意见的默认输出上限
+    MAP_OUTPUT_TOKENS = 1024        # 每段审查意见的默认输出上限
+    MAX_CHUNK_TOKENS = 16000        # 每段文档的token上限（分段越小并发度越高）
+    SAFETY_TOKENS = 1024            # 估算误差余量
+    MIN_CHUNK_CHARS = 1000
+    
+    def __init__(
+        self,
+        model: str = DeepSeekClient.DEFAULT_MODEL,
+        output_tokens: int = OUTPUT_TOKENS,
+        map_output_tokens: int = MAP_OUTPUT_TOKENS,
+        max_chunk_tokens: int = MAX_CHUNK_TOKENS
+    ):
+        """
+        初始化预算规划器
+        
+        Args:
+            model: 模型名称
+            output_tokens: 最终审查意见的输出上限
+            map_output_tokens: 每段审查意见的输出上限
+            max_chunk_tokens: 每段文档的token上限
+        """
+        self.limits = MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+        self.output_tokens = min(output_tokens, self.limits.max_output_tokens)
+        self.map_output_tokens = min(map_output_tokens, self.output_tokens)
+        self.max_chunk_tokens = max_chunk_tokens
+    
+    def input_budget(self, output_tokens: int) -> int:
+        """
+        预留输出后可用于输入的token数
+        
+        Args:
+            output_tokens: 预留的输出token数
+        """
+        return self.limits.context_tokens - output_tokens - self.SAFETY_TOKENS
+    
+    @staticmethod
+    def prompt_overhead(prompt: str) -> int:
+        """
+        审查消息中除文档内容外的token数（系统提示词、审查要求、分段说明）
+        
+        Args:
+            prompt: 审查提示词
+        """
+        messages = DeepSeekClient.build_review_messages("", prompt)
+        # 分段审查时追加的说明约100字
+        return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages) + 100
+    
+    def plan(self, document_content: str, prompt: str) -> ReviewPlan:
+        """
+        规划文档审查的调用方式
+        
+        Args:
+            document_content: 文档内容
+            prompt: 审查提示词
+            
+        Returns:
+            调用规划
+        """
+        document_tokens = estimate_tokens(document_content)
+        overhead = self.prompt_overhead(prompt)
+        chars_per_token = len(document_content) / document_tokens if document_tokens else 1.0
+        
+        if document_tokens <= min(self.max_chunk_tokens, self.input_budget(self.output_tokens) - overhead):
+            return ReviewPlan(
+                document_tokens=document_tokens,
+                single_call=True,
+                chunk_chars=max(len(document_content), self.MIN_CHUNK_CHARS),
+                output_tokens=self.output_tokens,
+                map_output_tokens=None
+            )
+        
+        chunk_tokens = min(self.max_chunk_tokens, self.input_budget(self.map_output_tokens) - overhead)
+        chunk_count = math.ceil(document_tokens / chunk_tokens)
+        
+        # 合并调用的输入为各段意见之和，超出预算时压缩每段意见的长度
+        reduce_budget = self.input_budget(self.output_tokens) - overhead
+        map_output_tokens = max(256, min(self.map_output_tokens, reduce_budget // chunk_count))
+        
+        return ReviewPlan(
+            document_tokens=document_tokens,
+            single_call=False,
+            chunk_chars=max(self.MIN_CHUNK_CHARS, int(chunk_tokens * chars_per_token)),
+            output_tokens=self.output_tokens,
+            map_output_tokens=map_output_tokens
+        )
@@ -2,9 +2,9 @@
 图文标号对齐检查器
 """
 import re
-from typing import List, Set
-from docx import Document
+from typing import List, Optional, Set
 
+from ..core.config_snapshot import ConfigSnapshot
 from ..core.models import CheckResult, PatentDocument, CheckCategory, Severity
 from ..core.rule_engine import BaseChecker
 
@@ -12,8 +12,12 @@ from ..core.rule_engine import BaseChecker
 class AlignmentChecker(BaseChecker):
     """图文标号对齐检查器"""
     
-    def __init__(self, config: dict = None):
-        super().__init__(config or {'enabled': True})
+    SECTIONS = ('alignment_rules', 'marker_rules')
+    CACHEABLE = True
+    
+    def __init__(self, config: dict = None, snapshot: Optional[ConfigSnapshot] = None):
+        super().__init__(config, snapshot)
+        self.check_continuity = self.snapshot.marker.check_continuity
     
     def check(self, document: PatentDocument) -> List[CheckResult]:
         """检查图文标号一致性"""
@@ -24,7 +28,7 @@ class AlignmentChecker(BaseChecker):
         
         try:
             # 1. 从说明书中提取标号
-            spec_markers = self._extract_markers_from_spec(document.specification_path)
+            spec_markers = self._extract_markers_from_spec(self._read_spec_text(document))
             
             # 2. 从附图说明段落提取图中应有的标号
             # 这里简化处理：假设说明书中提到的所有数字标号都应该在图中
@@ -40,7 +44,7 @@ class AlignmentChecker(BaseChecker):
                         if i not in spec_markers:
                             missing_markers.append(i)
                     
-                    if missing_markers:
+                    if missing_markers and self.check_continuity:
                         results.append(CheckResult(
                             rule_id="A001",
                             category=CheckCategory.ALIGNMENT,
@@ -84,25 +88,34 @@ class AlignmentChecker(BaseChecker):
         
         return results
     
-    def _extract_markers_from_spec(self, spec_path: str) -> Set[int]:
+    def _read_spec_text(self, document: PatentDocument) -> str:
         """
-        从说明书中提取标号
+        读取说明书全文（不修改文档，检查结果可缓存）
+        
+        Args:
+            document: 专利文档（检测线程已读取全文时直接复用）
         
         Returns:
-            标号集合
+            说明书全文
         """
-        markers = set()
+        if isinstance(document.specification_content, str):
+            return document.specification_content
         
         from ..file_parser.parser import FileParser
         
-        # 根据文件类型提取文本
-        if spec_path.lower().endswith('.pdf'):
-            # PDF文档
-            full_text = FileParser.extract_pdf_text(spec_path, use_ocr=True)
-        else:
-            # Word文档
-            doc = FileParser.load_word_document(spec_path)
-            full_text = '\n'.join([p.text for p in doc.paragraphs])
+        return FileParser.extract_specification_text(document.specification_path)
+    
+    def _extract_markers_from_spec(self, full_text: str) -> Set[int]:
+        """
+        从说明书中提取标号
+        
+        Args:
+            full_text: 说明书全文
+            
+        Returns:
+            标号集合
+        """
+        markers = set()
         
         # 正则表达式匹配常见的标号模式
         # 模式1: "标号12"、"零件15"、"部件20"等
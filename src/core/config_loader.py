@@ -3,8 +3,11 @@
 用于加载和管理检测规则配置
 """
 import json
+import threading
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config_snapshot import SECTIONS, ConfigSnapshot, compile_config
 
 
 class ConfigLoader:
@@ -12,6 +15,10 @@ class ConfigLoader:
     
     _instance = None
     _config = None
+    _snapshot = None
+    _config_path = None
+    _lock = threading.Lock()
+    _subscribers: List[Callable[[ConfigSnapshot, Tuple[str, ...]], None]] = []
     
     def __new__(cls):
         """单例模式"""
@@ -31,21 +38,69 @@ class ConfigLoader:
         Args:
             config_path: 配置文件路径，默认使用内置配置
         """
-        if config_path is None:
-            # 使用默认配置文件
-            project_root = Path(__file__).parent.parent.parent
-            config_path = project_root / "resources" / "rules" / "detection_rules.json"
+        config_path = Path(config_path) if config_path is not None else self.default_config_path()
+        self._config_path = config_path
         
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                self._config = json.load(f)
+            config, snapshot = self._read_config(config_path)
+            self._swap(config, snapshot)
             print(f"✓ 配置文件加载成功: {config_path}")
         except FileNotFoundError:
             print(f"⚠️  配置文件不存在: {config_path}，使用默认配置")
-            self._config = self._get_default_config()
+            self._use_default_config()
         except json.JSONDecodeError as e:
             print(f"❌ 配置文件格式错误: {e}，使用默认配置")
-            self._config = self._get_default_config()
+            self._use_default_config()
+        except ValueError as e:
+            print(f"❌ 配置项无效: {e}，使用默认配置")
+            self._use_default_config()
+    
+    @staticmethod
+    def default_config_path() -> Path:
+        """内置检测规则文件路径"""
+        project_root = Path(__file__).parent.parent.parent
+        return project_root / "resources" / "rules" / "detection_rules.json"
+    
+    @property
+    def config_path(self) -> Optional[Path]:
+        """当前配置文件路径"""
+        return self._config_path
+    
+    @staticmethod
+    def _read_config(config_path: Path) -> Tuple[Dict, ConfigSnapshot]:
+        """读取并编译配置文件，失败时抛出异常"""
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return config, compile_config(config)
+    
+    def _swap(self, config: Dict, snapshot: ConfigSnapshot) -> Tuple[str, ...]:
+        """
+        替换当前配置和快照
+        
+        Returns:
+            发生变化的规则分区
+        """
+        with self._lock:
+            old = self._snapshot
+            self._config = config
+            self._snapshot = snapshot
+        return snapshot.changed_sections(old) if old is not None else SECTIONS
+    
+    def _use_default_config(self):
+        """使用内置默认配置"""
+        config = self._get_default_config()
+        self._swap(config, compile_config(config))
+    
+    def snapshot(self) -> ConfigSnapshot:
+        """
+        获取当前配置快照
+        
+        快照在加载配置时编译一次，不可变，可安全地在线程间共享
+        
+        Returns:
+            配置快照
+        """
+        return self._snapshot
     
     def get(self, key_path: str, default: Any = None) -> Any:
         """
@@ -58,19 +113,11 @@ class ConfigLoader:
         Returns:
             配置值
         """
-        if self._config is None:
+        if self._snapshot is None:
             return default
         
-        keys = key_path.split('.')
-        value = self._config
-        
-        for key in keys:
-            if isinstance(value, dict) and key in value:
-                value = value[key]
-            else:
-                return default
-        
-        return value
+        # 点号路径在编译快照时已展开
+        return self._snapshot.get(key_path, default)
     
     def get_structure_rules(self) -> Dict:
         """获取结构检查规则"""
@@ -155,8 +202,54 @@ class ConfigLoader:
             config_path: 配置文件路径
         """
         self._config = None
+        self._snapshot = None
         self.load_config(config_path)
     
+    def try_reload(self) -> Optional[Tuple[str, ...]]:
+        """
+        校验并热加载当前配置文件
+        
+        新配置完整读取并编译通过后才替换快照；文件不完整或配置无效时保留当前快照。
+        已开始的检测持有旧快照，不受影响。
+        
+        Returns:
+            发生变化的规则分区（无变化时为空元组），加载失败返回None
+        """
+        config_path = self._config_path or self.default_config_path()
+        try:
+            config, snapshot = self._read_config(config_path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  配置文件重新加载失败: {e}，继续使用当前配置")
+            return None
+        
+        if self._snapshot is not None and snapshot.version == self._snapshot.version:
+            return ()
+        
+        changed = self._swap(config, snapshot)
+        print(f"✓ 配置文件已重新加载: {config_path}")
+        
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot, changed)
+            except Exception as e:
+                print(f"⚠️  配置更新通知失败: {e}")
+        return changed
+    
+    def subscribe(self, callback: Callable[[ConfigSnapshot, Tuple[str, ...]], None]):
+        """
+        订阅配置热加载
+        
+        Args:
+            callback: 回调函数，参数为 (新快照, 发生变化的规则分区)，在监视线程中调用
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[ConfigSnapshot, Tuple[str, ...]], None]):
+        """取消订阅配置热加载"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
     @property
     def config(self) -> Dict:
         """获取完整配置"""
@@ -0,0 +1,357 @@
+"""
+配置快照
+将检测规则配置编译为不可变的类型化对象，检查器在热路径上只做属性访问
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+
+# 配置快照中的规则分区（配置文件中的顶层键）
+SECTIONS = (
+    'structure_rules',
+    'image_rules',
+    'marker_rules',
+    'alignment_rules',
+    'abstract_rules',
+    'report_rules',
+    'performance',
+)
+
+
+@dataclass(frozen=True)
+class StructureRules:
+    """说明书结构规则"""
+    __slots__ = ('required_sections', 'optional_sections', 'section_order_strict', 'allow_custom_sections')
+    required_sections: Tuple[str, ...]
+    optional_sections: Tuple[str, ...]
+    section_order_strict: bool
+    allow_custom_sections: bool
+
+
+@dataclass(frozen=True)
+class ImageRules:
+    """附图格式规则"""
+    __slots__ = (
+        'min_width', 'min_height', 'min_dpi', 'recommended_dpi',
+        'allowed_extensions', 'max_file_size_mb',
+        'check_color_pixels', 'max_color_pixel_ratio', 'check_line_width', 'min_line_width_px'
+    )
+    min_width: int
+    min_height: int
+    min_dpi: int
+    recommended_dpi: int
+    allowed_extensions: Tuple[str, ...]
+    max_file_size_mb: float
+    check_color_pixels: bool
+    max_color_pixel_ratio: float
+    check_line_width: bool
+    min_line_width_px: int
+
+
+@dataclass(frozen=True)
+class MarkerRules:
+    """附图标号规则"""
+    __slots__ = (
+        'use_ocr', 'use_hough_circle', 'min_marker_number', 'max_marker_number',
+        'check_continuity', 'allow_gaps', 'max_gap_size', 'check_duplicates'
+    )
+    use_ocr: bool
+    use_hough_circle: bool
+    min_marker_number: int
+    max_marker_number: int
+    check_continuity: bool
+    allow_gaps: bool
+    max_gap_size: int
+    check_duplicates: bool
+
+
+@dataclass(frozen=True)
+class AlignmentRules:
+    """图文对齐规则"""
+    __slots__ = (
+        'check_missing_markers', 'check_extra_markers', 'tolerance',
+        'check_unused_markers', 'warn_threshold'
+    )
+    check_missing_markers: bool
+    check_extra_markers: bool
+    tolerance: int
+    check_unused_markers: bool
+    warn_threshold: int
+
+
+@dataclass(frozen=True)
+class AbstractRules:
+    """摘要附图规则"""
+    __slots__ = ('required', 'must_be_figure_1', 'max_count', 'patterns', 'case_sensitive')
+    required: bool
+    must_be_figure_1: bool
+    max_count: int
+    patterns: Tuple[str, ...]
+    case_sensitive: bool
+
+
+@dataclass(frozen=True)
+class ReportRules:
+    """报告生成规则"""
+    __slots__ = (
+        'default_format', 'include_summary', 'include_statistics', 'group_by_category', 'severity_colors'
+    )
+    default_format: str
+    include_summary: bool
+    include_statistics: bool
+    group_by_category: bool
+    severity_colors: Mapping[str, str]     # 级别 -> 颜色（#RRGGBB）
+
+
+@dataclass(frozen=True)
+class PerformanceSettings:
+    """性能设置"""
+    __slots__ = ('max_processing_time_seconds', 'enable_parallel', 'max_workers', 'cache_parsed_files')
+    max_processing_time_seconds: int
+    enable_parallel: bool
+    max_workers: int
+    cache_parsed_files: bool
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    编译后的配置快照
+    
+    version为整个配置的哈希，section_hashes为各规则分区的哈希，
+    可直接作为检测结果缓存的键：规则不变则哈希不变。
+    """
+    __slots__ = (
+        'version', 'section_hashes', 'structure', 'image', 'marker', 'alignment',
+        'abstract', 'report', 'performance', 'raw', 'flat'
+    )
+    version: str
+    section_hashes: Mapping[str, str]
+    structure: StructureRules
+    image: ImageRules
+    marker: MarkerRules
+    alignment: AlignmentRules
+    abstract: AbstractRules
+    report: ReportRules
+    performance: PerformanceSettings
+    raw: Mapping[str, Any]                 # 原始配置（只读）
+    flat: Mapping[str, Any]                # 点号路径 -> 配置值
+    
+    def get(self, key_path: str, default: Any = None) -> Any:
+        """
+        按点号路径获取原始配置值
+        
+        Args:
+            key_path: 配置键路径，如 "image_rules.resolution.min_dpi"
+            default: 默认值
+        """
+        return self.flat.get(key_path, default)
+    
+    def hash_of(self, *sections: str) -> str:
+        """
+        获取若干规则分区的组合哈希
+        
+        Args:
+            sections: 规则分区名称，如 "image_rules"
+        """
+        if len(sections) == 1:
+            return self.section_hashes.get(sections[0], '')
+        return _digest([self.section_hashes.get(s, '') for s in sections])
+    
+    def changed_sections(self, other: 'ConfigSnapshot') -> Tuple[str, ...]:
+        """
+        与另一快照相比发生变化的规则分区
+        
+        Args:
+            other: 旧快照
+        """
+        names = set(self.section_hashes) | set(other.section_hashes)
+        return tuple(sorted(
+            name for name in names
+            if self.section_hashes.get(name) != other.section_hashes.get(name)
+        ))
+
+
+def compile_config(raw: Dict[str, Any]) -> ConfigSnapshot:
+    """
+    将原始配置编译为配置快照
+    
+    Args:
+        raw: 从detection_rules.json加载的配置字典
+        
+    Returns:
+        配置快照
+        
+    Raises:
+        ValueError: 配置项类型错误
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("无法编译配置: 顶层必须是JSON对象")
+    
+    section_hashes = {name: _digest(raw.get(name, {})) for name in SECTIONS}
+    
+    structure = _Section(raw, 'structure_rules')
+    image = _Section(raw, 'image_rules')
+    marker = _Section(raw, 'marker_rules')
+    alignment = _Section(raw, 'alignment_rules')
+    abstract = _Section(raw, 'abstract_rules')
+    report = _Section(raw, 'report_rules')
+    performance = _Section(raw, 'performance')
+    
+    severity_levels = report.get_dict('severity_levels')
+    severity_colors = {
+        level: str(value['color'])
+        for level, value in severity_levels.items()
+        if isinstance(value, dict) and value.get('color')
+    }
+    
+    return ConfigSnapshot(
+        version=_digest(raw),
+        section_hashes=MappingProxyType(section_hashes),
+        structure=StructureRules(
+            required_sections=structure.get_strings('required_sections', (
+                '技术领域', '背景技术', '发明内容', '附图说明', '具体实施方式'
+            )),
+            optional_sections=structure.get_strings('optional_sections', ()),
+            section_order_strict=structure.get_bool('section_order_strict', False),
+            allow_custom_sections=structure.get_bool('allow_custom_sections', True)
+        ),
+        image=ImageRules(
+            min_width=image.get_int('resolution.min_width', 800),
+            min_height=image.get_int('resolution.min_height', 600),
+            min_dpi=image.get_int('resolution.min_dpi', 150),
+            recommended_dpi=image.get_int('resolution.recommended_dpi', 300),
+            allowed_extensions=tuple(
+                e.lower() for e in image.get_strings('format.allowed_extensions', ('.jpg', '.jpeg', '.png', '.tif', '.tiff'))
+            ),
+            max_file_size_mb=image.get_float('format.max_file_size_mb', 10.0),
+            check_color_pixels=image.get_bool('quality.check_color_pixels', True),
+            max_color_pixel_ratio=image.get_float('quality.max_color_pixel_ratio', 0.01),
+            check_line_width=image.get_bool('quality.check_line_width', True),
+            min_line_width_px=image.get_int('quality.min_line_width_px', 2)
+        ),
+        marker=MarkerRules(
+            use_ocr=marker.get_bool('detection.use_ocr', True),
+            use_hough_circle=marker.get_bool('detection.use_hough_circle', True),
+            min_marker_number=marker.get_int('detection.min_marker_number', 1),
+            max_marker_number=marker.get_int('detection.max_marker_number', 999),
+            check_continuity=marker.get_bool('validation.check_continuity', True),
+            allow_gaps=marker.get_bool('validation.allow_gaps', True),
+            max_gap_size=marker.get_int('validation.max_gap_size', 5),
+            check_duplicates=marker.get_bool('validation.check_duplicates', True)
+        ),
+        alignment=AlignmentRules(
+            check_missing_markers=alignment.get_bool('spec_to_figure.check_missing_markers', True),
+            check_extra_markers=alignment.get_bool('spec_to_figure.check_extra_markers', True),
+            tolerance=alignment.get_int('spec_to_figure.tolerance', 2),
+            check_unused_markers=alignment.get_bool('figure_to_spec.check_unused_markers', True),
+            warn_threshold=alignment.get_int('figure_to_spec.warn_threshold', 3)
+        ),
+        abstract=AbstractRules(
+            required=abstract.get_bool('figure.required', True),
+            must_be_figure_1=abstract.get_bool('figure.must_be_figure_1', True),
+            max_count=abstract.get_int('figure.max_count', 1),
+            patterns=abstract.get_strings('naming.patterns', ('摘要附图', 'abstract', '图1', 'Fig.1', 'Figure1')),
+            case_sensitive=abstract.get_bool('naming.case_sensitive', False)
+        ),
+        report=ReportRules(
+            default_format=report.get_str('output.default_format', 'pdf'),
+            include_summary=report.get_bool('output.include_summary', True),
+            include_statistics=report.get_bool('output.include_statistics', True),
+            group_by_category=report.get_bool('output.group_by_category', True),
+            severity_colors=MappingProxyType(severity_colors)
+        ),
+        performance=PerformanceSettings(
+            max_processing_time_seconds=performance.get_int('max_processing_time_seconds', 120),
+            enable_parallel=performance.get_bool('enable_parallel', True),
+            max_workers=performance.get_int('max_workers', 4),
+            cache_parsed_files=performance.get_bool('cache_parsed_files', True)
+        ),
+        raw=MappingProxyType(raw),
+        flat=MappingProxyType(flatten(raw))
+    )
+
+
+def flatten(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    展开嵌套配置，生成 点号路径 -> 值 的映射（中间节点也包含在内）
+    
+    Args:
+        config: 配置字典
+    """
+    flat = {}
+    stack = [('', config)]
+    while stack:
+        prefix, node = stack.pop()
+        for key, value in node.items():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            flat[path] = value
+            if isinstance(value, dict):
+                stack.append((path, value))
+    return flat
+
+
+def _digest(value: Any) -> str:
+    """配置内容哈希（与键顺序、缩进无关）"""
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class _Section:
+    """带类型校验的配置分区读取器"""
+    
+    def __init__(self, raw: Dict[str, Any], name: str):
+        self.name = name
+        self.data = raw.get(name, {})
+        if not isinstance(self.data, dict):
+            raise ValueError(f"无法编译配置: {name} 必须是JSON对象")
+    
+    def _value(self, path: str, default: Any) -> Any:
+        value = self.data
+        for key in path.split('.'):
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return value
+    
+    def _invalid(self, path: str, value: Any, expected: str) -> ValueError:
+        return ValueError(f"无法编译配置: {self.name}.{path} 应为{expected}，实际为 {value!r}")
+    
+    def get_bool(self, path: str, default: bool) -> bool:
+        value = self._value(path, default)
+        if not isinstance(value, bool):
+            raise self._invalid(path, value, '布尔值')
+        return value
+    
+    def get_int(self, path: str, default: int) -> int:
+        value = self._value(path, default)
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise self._invalid(path, value, '整数')
+        return value
+    
+    def get_float(self, path: str, default: float) -> float:
+        value = self._value(path, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise self._invalid(path, value, '数值')
+        return float(value)
+    
+    def get_str(self, path: str, default: str) -> str:
+        value = self._value(path, default)
+        if not isinstance(value, str):
+            raise self._invalid(path, value, '字符串')
+        return value
+    
+    def get_strings(self, path: str, default: Tuple[str, ...]) -> Tuple[str, ...]:
+        value = self._value(path, default)
+        if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+            raise self._invalid(path, value, '字符串列表')
+        return tuple(value)
+    
+    def get_dict(self, path: str) -> Dict[str, Any]:
+        value = self._value(path, {})
+        if not isinstance(value, dict):
+            raise self._invalid(path, value, 'JSON对象')
+        return value
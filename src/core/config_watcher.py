@@ -0,0 +1,94 @@
+"""
+配置文件监视器
+轮询detection_rules.json，文件变化并写入完成后校验、热加载并通知订阅者
+"""
+import os
+import threading
+from typing import Optional, Tuple
+
+from .config_loader import ConfigLoader
+
+
+class ConfigWatcher:
+    """配置文件监视器（后台轮询线程）"""
+    
+    POLL_INTERVAL = 1.0         # 轮询间隔（秒）
+    
+    def __init__(self, loader: Optional[ConfigLoader] = None, interval: float = POLL_INTERVAL):
+        """
+        初始化监视器
+        
+        Args:
+            loader: 配置加载器，默认使用全局单例
+            interval: 轮询间隔（秒）
+        """
+        self.loader = loader or ConfigLoader()
+        self.interval = interval
+        self._signature = self._stat()
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        """监视线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """启动监视线程"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ConfigWatcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """
+        停止监视线程
+        
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _run(self):
+        """轮询循环"""
+        while not self._stop.wait(self.interval):
+            self.poll()
+    
+    def poll(self) -> Optional[Tuple[str, ...]]:
+        """
+        检查一次配置文件
+        
+        文件签名变化后需在下一次轮询时保持不变才会加载，避免读到写了一半的文件
+        
+        Returns:
+            发生变化的规则分区，本次未加载或加载失败返回None
+        """
+        signature = self._stat()
+        if signature == self._signature:
+            self._pending = None
+            return None
+        
+        if signature != self._pending:
+            self._pending = signature
+            return None
+        
+        self._signature = signature
+        self._pending = None
+        if signature is None:
+            # 文件被删除时保留当前配置
+            return None
+        return self.loader.try_reload()
+    
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        """获取配置文件签名 (修改时间, 大小)，文件不存在返回None"""
+        config_path = self.loader.config_path or self.loader.default_config_path()
+        try:
+            stat = os.stat(config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,547 @@
+"""
+检测历史存储
+基于SQLite保存每次检测的摘要和全部检查结果，支持按文件夹、时间、规则和级别查询，
+并对说明书文本和检查结果建立全文索引（FTS5 trigram，一两个字的关键词另用二元组索引，
+FTS5不可用时退回逐行匹配）
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .models import CheckResult
+
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    folder TEXT NOT NULL,
+    time TEXT NOT NULL,
+    spec_path TEXT,
+    total INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    warnings INTEGER NOT NULL DEFAULT 0,
+    infos INTEGER NOT NULL DEFAULT 0,
+    passes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_runs_folder ON runs(folder, time);
+CREATE INDEX IF NOT EXISTS idx_runs_time ON runs(time);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    rule_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    title TEXT,
+    description TEXT,
+    location TEXT,
+    suggestion TEXT,
+    reference TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS idx_results_rule ON results(rule_id, severity, run_id);
+CREATE INDEX IF NOT EXISTS idx_results_severity ON results(severity, run_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 检查结果参与全文索引的内容
+RESULT_INDEX_BODY = "rule_id || char(10) || title || char(10) || description || char(10) || ifnull(location, '')"
+
+_RUN_COLUMNS = "runs.id, runs.folder, runs.time, runs.spec_path, runs.total, runs.errors, runs.warnings, runs.infos, runs.passes"
+
+
+class HistoryStore:
+    """检测历史存储"""
+    
+    def __init__(self, db_path: Path):
+        """
+        打开（必要时创建）历史数据库
+        
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._conn.create_function('bigrams', 1, _bigrams, deterministic=True)
+        self.fts_enabled = self._create_search_index()
+        if self.fts_enabled:
+            self._create_short_index()
+    
+    def _create_search_index(self) -> bool:
+        """
+        创建全文索引表（说明书spec_index按run_id、检查结果result_index按results.id作为rowid）
+        
+        Returns:
+            是否使用FTS5索引
+        """
+        existing = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'spec_index'"
+        ).fetchone()
+        if existing:
+            return 'fts5' in existing[0].lower()
+        
+        try:
+            # trigram分词不依赖空格，适合中文；要求SQLite >= 3.34
+            with self._conn:
+                for table in ('spec_index', 'result_index'):
+                    self._conn.execute(f"CREATE VIRTUAL TABLE {table} USING fts5(body, tokenize='trigram')")
+            fts_enabled = True
+        except sqlite3.OperationalError:
+            print("⚠️  SQLite不支持FTS5 trigram，全文搜索将逐行匹配")
+            with self._conn:
+                for table in ('spec_index', 'result_index'):
+                    self._conn.execute(f"CREATE TABLE {table} (body TEXT)")
+            fts_enabled = False
+        
+        # 为已有检查结果补建索引
+        with self._conn:
+            self._conn.execute(f"INSERT INTO result_index (rowid, body) SELECT id, {RESULT_INDEX_BODY} FROM results")
+        return fts_enabled
+    
+    def _create_short_index(self):
+        """
+        创建短关键词索引（spec_short_index、result_short_index，rowid与对应的全文索引相同）
+        
+        trigram索引只能匹配不少于3个字符的关键词，而中文部件名称多为两个字。
+        将文本切成重叠的二元组作为词元建立无内容的FTS5索引（只存索引不存原文），
+        两个字的关键词按词元、单字按词元前缀查找
+        """
+        existing = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'spec_short_index'"
+        ).fetchone()
+        if existing:
+            return
+        
+        # ascii分词器把所有非ASCII字符（含中文标点）视为词元字符，二元组不会被再次切分
+        with self._conn:
+            for table in ('spec_short_index', 'result_short_index'):
+                self._conn.execute(
+                    f"CREATE VIRTUAL TABLE {table} USING fts5(body, tokenize='ascii', content='', prefix='1')"
+                )
+            # 为已有记录补建索引
+            self._conn.execute("INSERT INTO spec_short_index (rowid, body) SELECT rowid, bigrams(body) FROM spec_index")
+            self._conn.execute(
+                f"INSERT INTO result_short_index (rowid, body) SELECT id, bigrams({RESULT_INDEX_BODY}) FROM results"
+            )
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+    
+    def add_run(
+        self,
+        folder: str,
+        summary: Dict[str, int],
+        results: Iterable[CheckResult] = (),
+        time: Optional[datetime] = None,
+        spec_path: Optional[str] = None,
+        spec_text: Optional[str] = None
+    ) -> int:
+        """
+        保存一次检测
+        
+        Args:
+            folder: 检测的文件夹
+            summary: 统计摘要（CheckReport.get_summary()）
+            results: 检查结果
+            time: 检测时间，默认为当前时间
+            spec_path: 说明书路径
+            spec_text: 说明书文本（提供时加入全文索引）
+            
+        Returns:
+            检测记录ID
+        """
+        time_text = (time or datetime.now()).strftime(TIME_FORMAT)
+        rows = (
+            (
+                r.rule_id, r.category.value, r.severity.value, r.title, r.description,
+                r.location, r.suggestion, r.reference, _dump_details(r)
+            )
+            for r in results
+        )
+        
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (folder, time, spec_path, total, errors, warnings, infos, passes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    folder, time_text, spec_path,
+                    summary.get('total', 0), summary.get('errors', 0), summary.get('warnings', 0),
+                    summary.get('infos', 0), summary.get('passes', 0)
+                )
+            )
+            run_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO results (run_id, rule_id, category, severity, title, description, "
+                "location, suggestion, reference, details) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((run_id,) + row for row in rows)
+            )
+            
+            # 全文索引
+            self._conn.execute(
+                f"INSERT INTO result_index (rowid, body) SELECT id, {RESULT_INDEX_BODY} FROM results WHERE run_id = ?",
+                (run_id,)
+            )
+            if spec_text:
+                self._conn.execute("INSERT INTO spec_index (rowid, body) VALUES (?, ?)", (run_id, spec_text))
+            if self.fts_enabled:
+                self._conn.execute(
+                    f"INSERT INTO result_short_index (rowid, body) "
+                    f"SELECT id, bigrams({RESULT_INDEX_BODY}) FROM results WHERE run_id = ?",
+                    (run_id,)
+                )
+                if spec_text:
+                    self._conn.execute(
+                        "INSERT INTO spec_short_index (rowid, body) VALUES (?, bigrams(?))", (run_id, spec_text)
+                    )
+        return run_id
+    
+    def count_runs(self, folder: Optional[str] = None) -> int:
+        """
+        统计检测记录数
+        
+        Args:
+            folder: 只统计该文件夹的记录
+        """
+        if folder is None:
+            return self._query("SELECT COUNT(*) FROM runs")[0][0]
+        return self._query("SELECT COUNT(*) FROM runs WHERE folder = ?", (folder,))[0][0]
+    
+    def list_runs(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        folder: Optional[str] = None,
+        latest_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        按时间倒序分页列出检测记录
+        
+        Args:
+            limit: 每页记录数
+            offset: 跳过的记录数
+            folder: 只列出该文件夹的记录
+            latest_only: 每个文件夹只保留最近一次检测
+            
+        Returns:
+            检测记录列表（包含id、folder、time、spec_path、summary）
+        """
+        where, params = [], []
+        if folder is not None:
+            where.append("folder = ?")
+            params.append(folder)
+        if latest_only:
+            where.append("id IN (SELECT MAX(id) FROM runs GROUP BY folder)")
+        
+        sql = f"SELECT {_RUN_COLUMNS} FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY time DESC, id DESC LIMIT ? OFFSET ?"
+        
+        return [_run_dict(row) for row in self._query(sql, params + [limit, offset])]
+    
+    def get_results(self, run_id: int) -> List[Dict[str, Any]]:
+        """
+        获取一次检测的全部检查结果
+        
+        Args:
+            run_id: 检测记录ID
+            
+        Returns:
+            检查结果字典列表（与CheckResult.to_dict()格式一致）
+        """
+        rows = self._query(
+            "SELECT rule_id, category, severity, title, description, location, suggestion, "
+            "reference, details FROM results WHERE run_id = ? ORDER BY id",
+            (run_id,)
+        )
+        results = []
+        for row in rows:
+            result = dict(row)
+            result['details'] = json.loads(result['details']) if result['details'] else {}
+            results.append(result)
+        return results
+    
+    def find_runs(
+        self,
+        rule_id: Optional[str] = None,
+        severities: Optional[Sequence[str]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        folder: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        查询包含指定检查结果的检测记录
+        
+        例如上个月所有I002未通过的申请:
+            store.find_runs(rule_id="I002", severities=["error", "warning"],
+                            since=datetime(2026, 9, 1), until=datetime(2026, 10, 1))
+                            
+        Args:
+            rule_id: 规则ID
+            severities: 结果级别（error/warning/info/pass）
+            since: 检测时间下限（含）
+            until: 检测时间上限（不含）
+            folder: 文件夹
+            limit: 最多返回的记录数
+            
+        Returns:
+            检测记录列表（按时间倒序）
+        """
+        where, params = [], []
+        
+        result_filters, result_params = [], []
+        if rule_id is not None:
+            result_filters.append("rule_id = ?")
+            result_params.append(rule_id)
+        if severities:
+            result_filters.append(f"severity IN ({', '.join('?' * len(severities))})")
+            result_params.extend(severities)
+        if result_filters:
+            where.append(f"id IN (SELECT run_id FROM results WHERE {' AND '.join(result_filters)})")
+            params.extend(result_params)
+        
+        if since is not None:
+            where.append("time >= ?")
+            params.append(since.strftime(TIME_FORMAT))
+        if until is not None:
+            where.append("time < ?")
+            params.append(until.strftime(TIME_FORMAT))
+        if folder is not None:
+            where.append("folder = ?")
+            params.append(folder)
+        
+        sql = f"SELECT {_RUN_COLUMNS} FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY time DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        return [_run_dict(row) for row in self._query(sql, params)]
+    
+    def search(self, query: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        全文搜索说明书文本和检查结果
+        
+        以空白分隔的多个关键词须同时出现在同一份说明书或同一条检查结果中。
+        
+        Args:
+            query: 搜索关键词
+            limit: 最多返回的检测记录数
+            
+        Returns:
+            检测记录列表（按时间倒序），附加 match（spec/result）和 snippet（匹配片段）
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        
+        spec_where, spec_params = self._match_condition('spec_index', terms)
+        result_where, result_params = self._match_condition('result_index', terms)
+        
+        runs = self._query(
+            f"SELECT {_RUN_COLUMNS} FROM runs WHERE id IN ("
+            f"SELECT rowid FROM spec_index WHERE {spec_where} "
+            f"UNION SELECT results.run_id FROM result_index JOIN results ON results.id = result_index.rowid "
+            f"WHERE {result_where}"
+            f") ORDER BY time DESC, id DESC LIMIT ?",
+            spec_params + result_params + [limit]
+        )
+        if not runs:
+            return []
+        
+        # 只为当前返回的记录生成匹配片段
+        run_ids = [row['id'] for row in runs]
+        placeholders = ', '.join('?' * len(run_ids))
+        snippets = {}
+        for run_id, body in self._query(
+            f"SELECT results.run_id, result_index.body FROM result_index JOIN results "
+            f"ON results.id = result_index.rowid WHERE {result_where} AND results.run_id IN ({placeholders})",
+            result_params + run_ids
+        ):
+            snippets.setdefault(run_id, ('result', body))
+        for run_id, body in self._query(
+            f"SELECT rowid, body FROM spec_index WHERE {spec_where} AND rowid IN ({placeholders})",
+            spec_params + run_ids
+        ):
+            snippets[run_id] = ('spec', body)
+        
+        records = []
+        for row in runs:
+            record = _run_dict(row)
+            kind, body = snippets.get(row['id'], ('result', ''))
+            record['match'] = kind
+            record['snippet'] = _make_snippet(body, terms)
+            records.append(record)
+        return records
+    
+    def _match_condition(self, table: str, terms: List[str]):
+        """
+        构造全文匹配条件
+        
+        不少于3个字符的关键词用trigram索引匹配；更短的关键词先用二元组索引筛选候选行，
+        再用instr确认（含ASCII符号的关键词无法用二元组索引，只逐行匹配）
+        """
+        conditions, params = [], []
+        long_terms = [t for t in terms if len(t) >= 3] if self.fts_enabled else []
+        if long_terms:
+            conditions.append(f"{table} MATCH ?")
+            params.append(' AND '.join(_fts_phrase(t) for t in long_terms))
+        
+        short_terms = [t for t in terms if t not in long_terms]
+        indexed = [t for t in short_terms if all(not c.isascii() or c.isalnum() for c in t)]
+        if indexed and self.fts_enabled:
+            short_table = table.replace('_index', '_short_index')
+            conditions.append(f"{table}.rowid IN (SELECT rowid FROM {short_table} WHERE {short_table} MATCH ?)")
+            params.append(' AND '.join(_fts_phrase(t) + ('*' if len(t) == 1 else '') for t in indexed))
+        for term in short_terms:
+            conditions.append(f"instr({table}.body, ?) > 0")
+            params.append(term)
+        return ' AND '.join(conditions), params
+    
+    def delete_run(self, run_id: int):
+        """删除一次检测及其结果"""
+        with self._lock, self._conn:
+            if self.fts_enabled:
+                # 无内容索引删除时须提供原词元
+                self._conn.execute(
+                    f"INSERT INTO result_short_index (result_short_index, rowid, body) "
+                    f"SELECT 'delete', id, bigrams({RESULT_INDEX_BODY}) FROM results WHERE run_id = ?",
+                    (run_id,)
+                )
+                self._conn.execute(
+                    "INSERT INTO spec_short_index (spec_short_index, rowid, body) "
+                    "SELECT 'delete', rowid, bigrams(body) FROM spec_index WHERE rowid = ?",
+                    (run_id,)
+                )
+            self._conn.execute(
+                "DELETE FROM result_index WHERE rowid IN (SELECT id FROM results WHERE run_id = ?)", (run_id,)
+            )
+            self._conn.execute("DELETE FROM spec_index WHERE rowid = ?", (run_id,))
+            self._conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+    
+    def clear(self):
+        """清空全部历史"""
+        with self._lock, self._conn:
+            if self.fts_enabled:
+                for table in ('spec_short_index', 'result_short_index'):
+                    self._conn.execute(f"INSERT INTO {table} ({table}) VALUES ('delete-all')")
+            self._conn.execute("DELETE FROM result_index")
+            self._conn.execute("DELETE FROM spec_index")
+            self._conn.execute("DELETE FROM results")
+            self._conn.execute("DELETE FROM runs")
+    
+    def migrate_json(self, history_file: Path) -> int:
+        """
+        导入旧版history.json（每个数据库只导入一次）
+        
+        Args:
+            history_file: 旧版历史记录文件
+            
+        Returns:
+            导入的记录数
+        """
+        if self._get_meta('json_migrated') or not Path(history_file).exists():
+            return 0
+        
+        try:
+            with open(history_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取旧版历史记录失败: {e}")
+            records = []
+        
+        count = 0
+        for record in records:
+            try:
+                time = datetime.strptime(record["time"], TIME_FORMAT)
+                self.add_run(record["folder"], record.get("summary", {}), time=time)
+                count += 1
+            except (KeyError, TypeError, ValueError):
+                continue
+        
+        self._set_meta('json_migrated', datetime.now().strftime(TIME_FORMAT))
+        if count:
+            print(f"✓ 已导入{count}条旧版历史记录")
+        return count
+    
+    def _query(self, sql: str, params: Sequence = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    def _get_meta(self, key: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+    
+    def _set_meta(self, key: str, value: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _bigrams(text: Optional[str]) -> str:
+    """将文本切成重叠的二元组（每个字符一个，空白前的最后一个字符单独成组），以空格分隔"""
+    if not text:
+        return ''
+    return ' '.join(run[i:i + 2] for run in text.split() for i in range(len(run)))
+
+
+def _fts_phrase(term: str) -> str:
+    """FTS5短语（转义双引号）"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _make_snippet(body: str, terms: List[str], width: int = 30) -> str:
+    """截取第一个关键词附近的文本作为匹配片段"""
+    positions = [body.find(t) for t in terms if t in body]
+    if not positions:
+        return body[:width * 2].replace('\n', ' ')
+    
+    pos = min(positions)
+    start = max(0, pos - width)
+    end = min(len(body), pos + width)
+    snippet = body[start:end].replace('\n', ' ')
+    return ('…' if start else '') + snippet + ('…' if end < len(body) else '')
+
+
+def _dump_details(result: CheckResult) -> Optional[str]:
+    """序列化详细信息，空字典存为NULL"""
+    details = result.to_dict()['details']
+    return json.dumps(details, ensure_ascii=False, default=str) if details else None
+
+
+def _run_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    """数据库行 -> 检测记录字典（与旧版history.json记录格式兼容）"""
+    return {
+        'id': row['id'],
+        'folder': row['folder'],
+        'time': row['time'],
+        'spec_path': row['spec_path'],
+        'summary': {
+            'total': row['total'],
+            'errors': row['errors'],
+            'warnings': row['warnings'],
+            'infos': row['infos'],
+            'passes': row['passes']
+        }
+    }
@@ -1,11 +1,14 @@
 """
 核心数据结构定义
 """
+import sys
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+import numpy as np
+
 
 class Severity(Enum):
     """错误严重程度"""
@@ -25,18 +28,70 @@ class CheckCategory(Enum):
     AI_REVIEW = "ai_review"          # AI审查
 
 
-@dataclass
 class CheckResult:
-    """单个检查结果"""
-    rule_id: str                    # 规则ID
-    category: CheckCategory         # 检查类别
-    severity: Severity              # 严重程度
-    title: str                      # 标题
-    description: str                # 描述
-    location: str                   # 位置（文件名、行号等）
-    suggestion: Optional[str] = None  # 修改建议
-    reference: Optional[str] = None   # 法规参考
-    details: Dict[str, Any] = field(default_factory=dict)  # 详细信息
+    """
+    单个检查结果
+    
+    批量检测时会同时保留大量检查结果，因此使用__slots__而非dataclass：
+    规则ID和位置字符串驻留（sys.intern）共享，类别和级别统一为枚举单例，
+    details字典在首次访问时才创建。
+    """
+    
+    __slots__ = (
+        'rule_id', 'category', 'severity', 'title', 'description',
+        'location', 'suggestion', 'reference', '_details'
+    )
+    
+    def __init__(
+        self,
+        rule_id: str,                       # 规则ID
+        category: CheckCategory,            # 检查类别
+        severity: Severity,                 # 严重程度
+        title: str,                         # 标题
+        description: str,                   # 描述
+        location: str,                      # 位置（文件名、行号等）
+        suggestion: Optional[str] = None,   # 修改建议
+        reference: Optional[str] = None,    # 法规参考
+        details: Optional[Dict[str, Any]] = None  # 详细信息
+    ):
+        self.rule_id = _intern(rule_id)
+        self.category = CheckCategory(category)
+        self.severity = Severity(severity)
+        self.title = title
+        self.description = description
+        self.location = _intern(location)
+        self.suggestion = suggestion
+        self.reference = reference
+        # 未传入时首次访问再创建；传入的字典（包括空字典）直接保存，调用方之后的修改仍然生效
+        self._details = details
+    
+    @property
+    def details(self) -> Dict[str, Any]:
+        """详细信息（首次访问时创建）"""
+        if self._details is None:
+            self._details = {}
+        return self._details
+    
+    @details.setter
+    def details(self, value: Dict[str, Any]):
+        self._details = value
+    
+    def _astuple(self) -> tuple:
+        return (
+            self.rule_id, self.category, self.severity, self.title, self.description,
+            self.location, self.suggestion, self.reference, self._details or {}
+        )
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._astuple() == other._astuple()
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        fields = ', '.join(f'{name}={value!r}' for name, value in zip(_RESULT_FIELDS, self._astuple()))
+        return f'CheckResult({fields})'
     
     def to_dict(self) -> dict:
         """转换为字典"""
@@ -49,7 +104,129 @@ class CheckResult:
             'location': self.location,
             'suggestion': self.suggestion,
             'reference': self.reference,
-            'details': self.details
+            'details': self._details if self._details is not None else {}
+        }
+
+
+_RESULT_FIELDS = (
+    'rule_id', 'category', 'severity', 'title', 'description',
+    'location', 'suggestion', 'reference', 'details'
+)
+
+
+def _intern(value):
+    """驻留字符串，非字符串原样返回"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class ResultTable:
+    """
+    列式检查结果统计表
+    
+    按结果顺序保存类别、级别和规则ID的整数编码（numpy数组），
+    统计计数通过np.bincount一次完成，适合汇总大量检测结果。
+    """
+    
+    SEVERITIES = list(Severity)
+    CATEGORIES = list(CheckCategory)
+    
+    def __init__(self, capacity: int = 64):
+        """
+        初始化统计表
+        
+        Args:
+            capacity: 初始容量（不足时自动翻倍扩容）
+        """
+        self._severity_codes = {s: i for i, s in enumerate(self.SEVERITIES)}
+        self._category_codes = {c: i for i, c in enumerate(self.CATEGORIES)}
+        self._rule_codes: Dict[str, int] = {}
+        self.rule_ids: List[str] = []
+        
+        self._size = 0
+        self._severity = np.empty(capacity, dtype=np.uint8)
+        self._category = np.empty(capacity, dtype=np.uint8)
+        self._rule = np.empty(capacity, dtype=np.uint32)
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def append(self, result: CheckResult):
+        """
+        追加一个检查结果
+        
+        Args:
+            result: 检查结果
+        """
+        if self._size == len(self._severity):
+            self._grow(max(2 * self._size, 64))
+        
+        rule = self._rule_codes.get(result.rule_id)
+        if rule is None:
+            rule = self._rule_codes[result.rule_id] = len(self.rule_ids)
+            self.rule_ids.append(result.rule_id)
+        
+        i = self._size
+        self._severity[i] = self._severity_codes[result.severity]
+        self._category[i] = self._category_codes[result.category]
+        self._rule[i] = rule
+        self._size += 1
+    
+    def extend(self, results):
+        """追加多个检查结果"""
+        for result in results:
+            self.append(result)
+    
+    def _grow(self, capacity: int):
+        for name in ('_severity', '_category', '_rule'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+    
+    def severity_counts(self) -> Dict[Severity, int]:
+        """各级别结果数"""
+        counts = np.bincount(self._severity[:self._size], minlength=len(self.SEVERITIES))
+        return dict(zip(self.SEVERITIES, counts.tolist()))
+    
+    def category_counts(self) -> Dict[CheckCategory, Dict[Severity, int]]:
+        """各类别、各级别结果数（只包含有结果的类别）"""
+        n_sev = len(self.SEVERITIES)
+        codes = self._category[:self._size].astype(np.intp) * n_sev + self._severity[:self._size]
+        counts = np.bincount(codes, minlength=len(self.CATEGORIES) * n_sev).reshape(-1, n_sev)
+        
+        return {
+            category: dict(zip(self.SEVERITIES, row.tolist()))
+            for category, row in zip(self.CATEGORIES, counts)
+            if row.any()
+        }
+    
+    def rule_counts(self) -> Dict[str, int]:
+        """各规则ID结果数"""
+        counts = np.bincount(self._rule[:self._size], minlength=len(self.rule_ids))
+        return dict(zip(self.rule_ids, counts.tolist()))
+
+
+@dataclass
+class SectionSpan:
+    """说明书章节位置（段落序号区间）"""
+    name: str                        # 章节名称
+    start: int                       # 标题所在段落序号
+    end: Optional[int] = None        # 章节结束段落序号（不含），None表示延续至文末
+    required: bool = True            # 是否为必需章节
+    heading: str = ""                # 标题原文
+    
+    def contains(self, index: int) -> bool:
+        """判断段落序号是否落在本章节内"""
+        return index >= self.start and (self.end is None or index < self.end)
+    
+    def to_dict(self) -> dict:
+        """转换为字典"""
+        return {
+            'name': self.name,
+            'start': self.start,
+            'end': self.end,
+            'required': self.required,
+            'heading': self.heading
         }
 
 
@@ -65,6 +242,9 @@ class PatentDocument:
     specification_content: Optional[Any] = None
     figures_content: Dict[str, Any] = field(default_factory=dict)
     
+    # 章节定位结果（由结构检查器填充，供后续检查器限定检查范围）
+    sections: Dict[str, SectionSpan] = field(default_factory=dict)
+    
     def is_valid(self) -> bool:
         """检查文档是否有效"""
         # PDF文档可能包含所有内容，不需要单独的附图文件
@@ -92,6 +272,9 @@ class CheckReport:
     infos: int = 0
     passes: int = 0
     
+    # 列式统计表（按类别、级别、规则汇总）
+    table: ResultTable = field(default_factory=ResultTable, repr=False, compare=False)
+    
     # AI审查结果
     ai_review_result: Optional[str] = None
     ai_review_prompt: Optional[str] = None
@@ -99,6 +282,7 @@ class CheckReport:
     def add_result(self, result: CheckResult):
         """添加检查结果"""
         self.results.append(result)
+        self.table.append(result)
         self.total_checks += 1
         
         if result.severity == Severity.ERROR:
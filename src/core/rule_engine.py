@@ -1,20 +1,41 @@
 """
 规则引擎核心
 """
+import hashlib
 import json
-from typing import List, Dict, Any
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from pathlib import Path
 from abc import ABC, abstractmethod
 
+from .config_loader import ConfigLoader
+from .config_snapshot import ConfigSnapshot
 from .models import CheckResult, PatentDocument, CheckCategory, Severity
 
 
 class BaseChecker(ABC):
     """检查器基类"""
     
-    def __init__(self, config: Dict[str, Any]):
-        self.config = config
-        self.enabled = config.get('enabled', True)
+    # 检查器使用的规则分区，决定结果缓存键
+    SECTIONS: Tuple[str, ...] = ()
+    
+    # 检查结果只取决于文档内容和规则时可缓存（无副作用）
+    CACHEABLE = False
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None, snapshot: Optional[ConfigSnapshot] = None):
+        """
+        初始化检查器
+        
+        Args:
+            config: 检查器选项（如 enabled）
+            snapshot: 配置快照，默认使用当前加载的配置
+        """
+        self.config = config or {'enabled': True}
+        self.enabled = self.config.get('enabled', True)
+        self.snapshot = snapshot or ConfigLoader().snapshot()
+        self.rules_hash = self.snapshot.hash_of(*self.SECTIONS)
     
     @abstractmethod
     def check(self, document: PatentDocument) -> List[CheckResult]:
@@ -29,15 +50,17 @@ class BaseChecker(ABC):
 class RuleEngine:
     """规则引擎"""
     
-    def __init__(self, rules_path: str = None):
+    def __init__(self, rules_path: str = None, result_cache: Optional['ResultCache'] = None):
         """
         初始化规则引擎
         
         Args:
             rules_path: 规则配置文件路径
+            result_cache: 检查结果缓存（可在多次检测间共享）
         """
         self.rules = {}
         self.checkers = []
+        self.result_cache = result_cache
         
         if rules_path:
             self.load_rules(rules_path)
@@ -62,19 +85,131 @@ class RuleEngine:
         Returns:
             检查结果列表
         """
-        all_results = []
+        return list(self.iter_checks(document))
+        
+    def iter_checks(self, document: PatentDocument) -> Iterator[CheckResult]:
+        """
+        依次执行所有检查，每个检查器完成后立即产出其结果
         
+        Args:
+            document: 专利文档
+            
+        Returns:
+            检查结果迭代器
+        """
+        fingerprint = None
         for checker in self.checkers:
             if checker.is_enabled():
+                cache_key = None
+                if self.result_cache is not None and checker.CACHEABLE:
+                    if fingerprint is None:
+                        fingerprint = document_fingerprint(document)
+                    cache_key = (type(checker).__name__, checker.rules_hash, fingerprint)
+                    cached = self.result_cache.get(cache_key)
+                    if cached is not None:
+                        yield from cached
+                        continue
+                
                 try:
                     results = checker.check(document)
-                    all_results.extend(results)
+                    if cache_key is not None:
+                        self.result_cache.put(cache_key, checker.SECTIONS, results)
                 except Exception as e:
                     # 记录错误但不中断检查流程
                     print(f"检查器 {checker.__class__.__name__} 执行失败: {e}")
-        
-        return all_results
+                    continue
+                yield from results
     
     def get_rules_by_category(self, category: str) -> List[Dict]:
         """获取指定类别的规则"""
         return [r for r in self.rules if r.get('category') == category]
+
+
+class ResultCache:
+    """
+    检查结果缓存（LRU）
+    
+    缓存键为 (检查器, 规则哈希, 文档指纹)，规则或文档变化后自然失效；
+    也可按规则分区主动清除。
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        """
+        初始化缓存
+        
+        Args:
+            max_entries: 最多缓存的检查器结果数
+        """
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, Tuple[Tuple[str, ...], List[CheckResult]]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: tuple) -> Optional[List[CheckResult]]:
+        """获取缓存的检查结果"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return list(entry[1])
+    
+    def put(self, key: tuple, sections: Tuple[str, ...], results: List[CheckResult]):
+        """
+        缓存检查结果
+        
+        Args:
+            key: 缓存键
+            sections: 结果依赖的规则分区
+            results: 检查结果
+        """
+        with self._lock:
+            self._entries[key] = (tuple(sections), list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, sections: Optional[Tuple[str, ...]] = None) -> int:
+        """
+        清除依赖指定规则分区的缓存
+        
+        Args:
+            sections: 规则分区，None表示全部清除
+            
+        Returns:
+            清除的条目数
+        """
+        with self._lock:
+            if sections is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            
+            changed = set(sections)
+            stale = [key for key, (deps, _) in self._entries.items() if changed.intersection(deps)]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+
+def document_fingerprint(document: PatentDocument) -> str:
+    """
+    文档指纹：各文件路径、大小和修改时间的哈希
+    
+    Args:
+        document: 专利文档
+    """
+    paths = [document.specification_path, document.abstract_path, document.claims_path] + list(document.figures)
+    parts = []
+    for path in paths:
+        if not path:
+            parts.append('')
+            continue
+        try:
+            stat = os.stat(path)
+            parts.append(f"{path}|{stat.st_size}|{stat.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{path}|missing")
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,182 @@
+"""
+流式DOCX读取器
+直接从zip包中增量解析word/document.xml，不构建python-docx对象模型
+"""
+import posixpath
+import zipfile
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+from xml.etree import ElementTree
+
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+V_NS = 'urn:schemas-microsoft-com:vml'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_BODY = f'{{{W_NS}}}body'
+_P = f'{{{W_NS}}}p'
+_TBL = f'{{{W_NS}}}tbl'
+_TR = f'{{{W_NS}}}tr'
+_TC = f'{{{W_NS}}}tc'
+_T = f'{{{W_NS}}}t'
+_TAB = f'{{{W_NS}}}tab'
+_BR = f'{{{W_NS}}}br'
+_CR = f'{{{W_NS}}}cr'
+_BLIP = f'{{{A_NS}}}blip'
+_IMAGEDATA = f'{{{V_NS}}}imagedata'
+_EMBED = f'{{{R_NS}}}embed'
+_RID = f'{{{R_NS}}}id'
+
+
+@dataclass
+class DocxBlock:
+    """DOCX正文中的一个内容块"""
+    kind: str                                   # paragraph / table / image
+    text: str = ""                              # 段落文本
+    rows: List[List[str]] = field(default_factory=list)  # 表格单元格文本
+    target: Optional[str] = None                # 图片在zip包中的路径，如 word/media/image1.png
+
+
+class DocxStreamReader:
+    """流式DOCX读取器"""
+    
+    DOCUMENT_PART = 'word/document.xml'
+    RELS_PART = 'word/_rels/document.xml.rels'
+    
+    def __init__(self, file_path: str):
+        """
+        打开DOCX文件
+        
+        Args:
+            file_path: 文件路径
+        """
+        self.file_path = file_path
+        try:
+            self._zip = zipfile.ZipFile(file_path)
+            self._zip.getinfo(self.DOCUMENT_PART)
+        except (OSError, zipfile.BadZipFile, KeyError) as e:
+            raise ValueError(f"无法打开Word文档 {file_path}: {e}")
+        self._image_targets = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """关闭zip包"""
+        self._zip.close()
+    
+    def read_part(self, name: str) -> bytes:
+        """
+        读取zip包中的部件（如图片数据）
+        
+        Args:
+            name: 部件路径
+        """
+        return self._zip.read(name)
+    
+    def iter_blocks(self) -> Iterator[DocxBlock]:
+        """
+        按文档顺序逐个产出段落、表格和图片引用
+        
+        已处理的元素会立即从树中移除，内存占用与文档大小无关
+        """
+        targets = self._get_image_targets()
+        body = None
+        depth = 0
+        
+        with self._zip.open(self.DOCUMENT_PART) as f:
+            for event, elem in ElementTree.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == _BODY:
+                        body = elem
+                    depth += 1
+                    continue
+                
+                depth -= 1
+                if body is None or elem is body:
+                    continue
+                # 只处理body的直接子元素，嵌套内容随父元素一并处理
+                if depth != 2:
+                    continue
+                
+                if elem.tag == _P:
+                    yield DocxBlock('paragraph', text=_paragraph_text(elem))
+                elif elem.tag == _TBL:
+                    yield DocxBlock('table', rows=_table_rows(elem))
+                
+                for rel_id in _image_refs(elem):
+                    target = targets.get(rel_id)
+                    if target:
+                        yield DocxBlock('image', target=target)
+                
+                body.remove(elem)
+    
+    def iter_paragraphs(self) -> Iterator[str]:
+        """逐个产出正文段落文本（不含表格）"""
+        for block in self.iter_blocks():
+            if block.kind == 'paragraph':
+                yield block.text
+    
+    def _get_image_targets(self) -> dict:
+        """解析document.xml.rels，得到 关系ID -> 图片部件路径"""
+        if self._image_targets is None:
+            self._image_targets = {}
+            try:
+                rels = ElementTree.fromstring(self._zip.read(self.RELS_PART))
+            except KeyError:
+                return self._image_targets
+            
+            for rel in rels.iter(f'{{{PKG_REL_NS}}}Relationship'):
+                if not rel.get('Type', '').endswith('/image') or rel.get('TargetMode') == 'External':
+                    continue
+                target = rel.get('Target', '')
+                if target.startswith('/'):
+                    target = target.lstrip('/')
+                else:
+                    target = posixpath.normpath(posixpath.join('word', target))
+                self._image_targets[rel.get('Id')] = target
+        return self._image_targets
+
+
+def _paragraph_text(p: ElementTree.Element) -> str:
+    """提取段落文本（与python-docx的Paragraph.text一致）"""
+    parts = []
+    for node in p.iter():
+        if node.tag == _T:
+            parts.append(node.text or '')
+        elif node.tag == _TAB:
+            parts.append('\t')
+        elif node.tag in (_BR, _CR):
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def _table_rows(tbl: ElementTree.Element) -> List[List[str]]:
+    """提取表格各行单元格文本"""
+    rows = []
+    for tr in tbl.findall(_TR):
+        cells = []
+        for tc in tr.findall(_TC):
+            cells.append('\n'.join(_paragraph_text(p) for p in tc.iter(_P)))
+        rows.append(cells)
+    return rows
+
+
+def _image_refs(elem: ElementTree.Element) -> List[str]:
+    """提取元素内引用的图片关系ID"""
+    refs = []
+    for node in elem.iter():
+        if node.tag == _BLIP:
+            rel_id = node.get(_EMBED)
+        elif node.tag == _IMAGEDATA:
+            rel_id = node.get(_RID)
+        else:
+            continue
+        if rel_id:
+            refs.append(rel_id)
+    return refs
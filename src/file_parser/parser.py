@@ -2,15 +2,27 @@
 文件解析模块 - 识别和解析专利文档
 """
 import os
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 from docx import Document
 from PIL import Image
 import pymupdf  # PyMuPDF for PDF parsing
-import pytesseract  # OCR for text extraction from images
-import io
 
 from ..core.models import PatentDocument
+from .docx_stream import DocxBlock, DocxStreamReader
+from .pdf_ocr import PdfPageAnalyzer
+
+
+@dataclass
+class PdfPageText:
+    """PDF单页文本提取结果"""
+    page_number: int                  # 页码（从1开始）
+    text: str                         # 页面文本
+    blocks: List[Tuple[float, float, float, float, str]] = field(default_factory=list)  # 文本块 (x0, y0, x1, y1, 文本)
+    ocr_used: bool = False            # 是否使用了OCR
+    elapsed: float = 0.0              # 提取耗时（秒）
 
 
 class FileParser:
@@ -118,6 +130,37 @@ class FileParser:
         except Exception as e:
             raise ValueError(f"无法打开Word文档 {file_path}: {e}")
     
+    @staticmethod
+    def iter_word_blocks(file_path: str) -> Iterator[DocxBlock]:
+        """
+        流式读取Word文档的段落、表格和图片引用
+        
+        仅需文本内容时使用，避免构建python-docx对象模型；
+        需要样式等格式信息时仍使用load_word_document
+        
+        Args:
+            file_path: 文件路径
+        
+        Yields:
+            DocxBlock内容块
+        """
+        with DocxStreamReader(file_path) as reader:
+            yield from reader.iter_blocks()
+    
+    @staticmethod
+    def iter_word_paragraphs(file_path: str) -> Iterator[str]:
+        """
+        流式读取Word文档的正文段落文本
+        
+        Args:
+            file_path: 文件路径
+        
+        Yields:
+            段落文本
+        """
+        with DocxStreamReader(file_path) as reader:
+            yield from reader.iter_paragraphs()
+    
     @staticmethod
     def load_image(file_path: str) -> Image.Image:
         """
@@ -170,43 +213,102 @@ class FileParser:
             raise ValueError(f"无法打开PDF文档 {file_path}: {e}")
     
     @staticmethod
-    def extract_pdf_text(file_path: str, use_ocr: bool = True) -> str:
+    def iter_pdf_pages(file_path: str, use_ocr: bool = True) -> Iterator[PdfPageText]:
         """
-        提取PDF文本内容，支持OCR
+        逐页提取PDF文本，支持OCR
+        
+        按需逐页处理，调用方可随时停止迭代（如已找到全部章节），
+        停止后文档会被立即关闭
         
         Args:
             file_path: PDF文件路径
             use_ocr: 是否使用OCR提取图片中的文字（当直接提取为空时）
-            
-        Returns:
-            提取的文本内容
+        
+        Yields:
+            PdfPageText单页结果
         """
         try:
             doc = pymupdf.open(file_path)
-            text = ""
-            
+        except Exception as e:
+            raise ValueError(f"无法提取PDF文本 {file_path}: {e}")
+        
+        analyzer = PdfPageAnalyzer()
+        
+        try:
             for page_num in range(len(doc)):
+                start = time.perf_counter()
                 page = doc[page_num]
                 
-                # 尝试直接提取文本
-                page_text = page.get_text()
-                
-                # 如果文本为空且启用OCR，则使用OCR提取
-                if not page_text.strip() and use_ocr:
-                    # 将页面转换为图片
-                    pix = page.get_pixmap(matrix=pymupdf.Matrix(2, 2))  # 2x放大提高OCR精度
-                    img_data = pix.tobytes("png")
-                    img = Image.open(io.BytesIO(img_data))
+                try:
+                    # 文本和文本块共用同一次解析结果
+                    textpage = page.get_textpage()
                     
-                    # 使用OCR提取文字（中英文）
-                    page_text = pytesseract.image_to_string(img, lang='chi_sim+eng')
+                    if use_ocr:
+                        # 对缺少文本层的图片区域做OCR，并与文本层合并
+                        page_text, blocks, ocr_used = analyzer.analyze(page, textpage)
+                    else:
+                        page_text, blocks = analyzer.text_layer(page, textpage)
+                        ocr_used = False
+                except Exception as e:
+                    raise ValueError(f"无法提取PDF文本 {file_path} 第{page_num + 1}页: {e}")
                 
-                text += page_text + "\n"
-            
+                yield PdfPageText(
+                    page_number=page_num + 1,
+                    text=page_text,
+                    blocks=blocks,
+                    ocr_used=ocr_used,
+                    elapsed=time.perf_counter() - start
+                )
+        finally:
             doc.close()
-            return text
-        except Exception as e:
-            raise ValueError(f"无法提取PDF文本 {file_path}: {e}")
+    
+    @staticmethod
+    def extract_pdf_text(file_path: str, use_ocr: bool = True) -> str:
+        """
+        提取PDF文本内容，支持OCR
+        
+        Args:
+            file_path: PDF文件路径
+            use_ocr: 是否对缺少文本层的图片区域使用OCR
+            
+        Returns:
+            提取的文本内容
+        """
+        return ''.join(
+            page.text + "\n" for page in FileParser.iter_pdf_pages(file_path, use_ocr=use_ocr)
+        )
+    
+    @staticmethod
+    def extract_text(file_path: str, use_ocr: bool = False) -> str:
+        """
+        提取说明书纯文本（用于全文索引）
+        
+        Args:
+            file_path: Word或PDF文件路径
+            use_ocr: PDF是否对缺少文本层的图片区域使用OCR
+            
+        Returns:
+            提取的文本内容，不支持的格式返回空字符串
+        """
+        suffix = Path(file_path).suffix.lower()
+        if suffix == '.pdf':
+            return FileParser.extract_pdf_text(file_path, use_ocr=use_ocr)
+        if suffix == '.docx':
+            return '\n'.join(FileParser.iter_word_paragraphs(file_path))
+        return ''
+    
+    @staticmethod
+    def extract_specification_text(file_path: str) -> str:
+        """
+        提取说明书全文（标号检查和全文索引共用，PDF对缺少文本层的图片区域使用OCR）
+        
+        Args:
+            file_path: 说明书路径
+            
+        Returns:
+            说明书全文
+        """
+        return FileParser.extract_text(file_path, use_ocr=True)
     
     @staticmethod
     def get_pdf_info(file_path: str) -> dict:
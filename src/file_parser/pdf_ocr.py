@@ -0,0 +1,268 @@
+"""
+PDF页面OCR分析器
+只对页面中缺少文本层的图片区域做OCR，并与文本层合并
+"""
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import pymupdf  # PyMuPDF
+import pytesseract  # OCR for text extraction from images
+from PIL import Image
+
+
+@dataclass
+class ImageRegion:
+    """页面中的图片区域"""
+    rect: pymupdf.Rect                  # 图片在页面上的位置（pt）
+    native_scale: Optional[float] = None  # 图片原始分辨率对应的倍率（像素/pt），整页区域为None
+    xref: int = 0                       # 图片对象编号
+
+
+class OcrRasterizer:
+    """OCR用灰度光栅化器"""
+    
+    TARGET_DPI = 300            # Tesseract推荐的识别分辨率
+    MIN_DPI = 150               # 低于该分辨率小字号文字难以识别
+    MAX_PIXELS = 12_000_000     # 单次渲染像素上限（约A4幅面400dpi）
+    
+    def __init__(self, target_dpi: int = TARGET_DPI, min_dpi: int = MIN_DPI, max_pixels: int = MAX_PIXELS):
+        """
+        初始化光栅化器
+        
+        Args:
+            target_dpi: 目标分辨率
+            min_dpi: 最低分辨率
+            max_pixels: 单次渲染像素上限
+        """
+        self.target_dpi = target_dpi
+        self.min_dpi = min_dpi
+        self.max_pixels = max_pixels
+    
+    def choose_scale(self, rect: pymupdf.Rect, native_scale: Optional[float] = None) -> float:
+        """
+        根据区域大小选择渲染倍率
+        
+        Args:
+            rect: 渲染区域（pt）
+            native_scale: 图片原始分辨率倍率，超过该倍率渲染不会增加信息
+            
+        Returns:
+            渲染倍率（72dpi为1.0）
+        """
+        scale = self.target_dpi / 72
+        if native_scale is not None:
+            scale = min(scale, max(native_scale, self.min_dpi / 72))
+        
+        # 大幅面页面按像素上限缩小
+        area = rect.width * rect.height
+        if area > 0 and area * scale * scale > self.max_pixels:
+            scale = math.sqrt(self.max_pixels / area)
+        return scale
+    
+    def rasterize(self, page: pymupdf.Page, region: ImageRegion) -> pymupdf.Pixmap:
+        """
+        将区域直接渲染为灰度图
+        
+        Args:
+            page: PDF页面
+            region: 渲染区域
+            
+        Returns:
+            单通道灰度Pixmap
+        """
+        scale = self.choose_scale(region.rect, region.native_scale)
+        return page.get_pixmap(
+            matrix=pymupdf.Matrix(scale, scale),
+            clip=region.rect,
+            colorspace=pymupdf.csGRAY,
+            alpha=False
+        )
+    
+    @staticmethod
+    def to_image(pix: pymupdf.Pixmap) -> Image.Image:
+        """
+        将灰度Pixmap转换为PIL图像
+        
+        直接按行跨度读取像素缓冲区，只做一次内存拷贝，不做PNG编解码
+        """
+        return Image.frombytes("L", (pix.width, pix.height), pix.samples_mv, "raw", "L", pix.stride)
+
+
+class PdfPageAnalyzer:
+    """PDF页面分析器"""
+    
+    OCR_LANG = 'chi_sim+eng'
+    MIN_REGION_AREA = 1600      # 忽略小于40x40pt的图片（图标、装饰线等）
+    
+    def __init__(
+        self,
+        lang: str = OCR_LANG,
+        min_region_area: float = MIN_REGION_AREA,
+        rasterizer: Optional[OcrRasterizer] = None
+    ):
+        """
+        初始化页面分析器
+        
+        Args:
+            lang: Tesseract语言
+            min_region_area: 参与OCR的最小图片面积（pt²）
+            rasterizer: OCR光栅化器，默认按300dpi渲染灰度图
+        """
+        self.lang = lang
+        self.min_region_area = min_region_area
+        self.rasterizer = rasterizer or OcrRasterizer()
+        # 未找到Tesseract时记录错误，本文档之后的页面不再做OCR
+        self.ocr_unavailable: Optional[Exception] = None
+    
+    def image_regions(self, page: pymupdf.Page) -> List[ImageRegion]:
+        """
+        获取页面中的图片区域
+        
+        Args:
+            page: PDF页面
+            
+        Returns:
+            图片区域列表（已裁剪到页面范围并去重）
+        """
+        regions = []
+        seen = set()
+        
+        for item in page.get_images(full=True):
+            xref, width = item[0], item[2]
+            for rect in page.get_image_rects(xref):
+                rect = rect & page.rect
+                if rect.is_empty or rect.width * rect.height < self.min_region_area:
+                    continue
+                
+                key = tuple(round(v) for v in rect)
+                if key in seen:
+                    continue
+                seen.add(key)
+                
+                # 图片每pt对应的原始像素数
+                regions.append(ImageRegion(rect=rect, native_scale=width / rect.width, xref=xref))
+        
+        return regions
+    
+    def text_layer(
+        self,
+        page: pymupdf.Page,
+        textpage: pymupdf.TextPage
+    ) -> Tuple[str, List[Tuple[float, float, float, float, str]]]:
+        """
+        提取页面文本层
+        
+        Args:
+            page: PDF页面
+            textpage: 已解析的文本页
+            
+        Returns:
+            (页面文本, 文本块列表)
+        """
+        text = page.get_text(textpage=textpage)
+        blocks = [
+            (b[0], b[1], b[2], b[3], b[4])
+            for b in page.get_text("blocks", textpage=textpage)
+            if b[6] == 0
+        ]
+        return text, blocks
+    
+    def analyze(
+        self,
+        page: pymupdf.Page,
+        textpage: Optional[pymupdf.TextPage] = None
+    ) -> Tuple[str, List[Tuple[float, float, float, float, str]], bool]:
+        """
+        提取页面文本，对缺少文本层的图片区域做OCR并合并
+        
+        Args:
+            page: PDF页面
+            textpage: 已解析的文本页（可选，避免重复解析）
+            
+        Returns:
+            (页面文本, 文本块列表, 是否使用了OCR)
+            
+        Raises:
+            Exception: 页面没有文本层且所有区域OCR均失败
+        """
+        if textpage is None:
+            textpage = page.get_textpage()
+        
+        text, blocks = self.text_layer(page, textpage)
+        
+        if self.ocr_unavailable is not None:
+            # 已确认未安装Tesseract，不再渲染图片区域
+            if not text.strip():
+                raise self.ocr_unavailable
+            return text, blocks, False
+        
+        # 只处理文本层未覆盖的图片区域（已做过OCR的扫描件通常带有隐藏文本层）
+        regions = [
+            region for region in self.image_regions(page)
+            if not self._has_text_layer(region.rect, blocks)
+        ]
+        
+        if not regions:
+            if text.strip():
+                return text, blocks, False
+            # 没有文本也没有图片（如文字转曲），退回整页OCR
+            regions = [ImageRegion(rect=page.rect)]
+        
+        ocr_blocks = []
+        ocr_used = False
+        errors = []
+        for region in regions:
+            # 单个区域识别失败不影响页面的文本层
+            try:
+                region_text = self.ocr_region(page, region)
+            except pytesseract.TesseractNotFoundError as e:
+                print(f"⚠️  未找到Tesseract，跳过本文档的OCR: {e}")
+                self.ocr_unavailable = e
+                errors.append(e)
+                break
+            except Exception as e:
+                print(f"⚠️  第{page.number + 1}页图片区域OCR失败: {e}")
+                errors.append(e)
+                continue
+            ocr_used = True
+            if region_text.strip():
+                r = region.rect
+                ocr_blocks.append((r.x0, r.y0, r.x1, r.y1, region_text))
+        
+        if errors and not ocr_used and not text.strip():
+            # 没有文本层时OCR是唯一的文本来源
+            raise errors[0]
+        
+        if not ocr_blocks:
+            return text, blocks, ocr_used
+        
+        # 按阅读顺序（自上而下、从左到右）合并文本层和OCR结果
+        blocks = sorted(blocks + ocr_blocks, key=lambda b: (round(b[1]), b[0]))
+        merged = '\n'.join(b[4].rstrip('\n') for b in blocks) + '\n'
+        return merged, blocks, True
+    
+    @staticmethod
+    def _has_text_layer(rect: pymupdf.Rect, blocks: List[Tuple[float, float, float, float, str]]) -> bool:
+        """判断区域内是否已有文本层（以文本块中心点落在区域内为准）"""
+        for x0, y0, x1, y1, text in blocks:
+            if text.strip() and pymupdf.Point((x0 + x1) / 2, (y0 + y1) / 2) in rect:
+                return True
+        return False
+    
+    def ocr_region(self, page: pymupdf.Page, region: ImageRegion) -> str:
+        """
+        渲染并识别单个区域
+        
+        Args:
+            page: PDF页面
+            region: 图片区域
+            
+        Returns:
+            识别出的文本
+        """
+        pix = self.rasterizer.rasterize(page, region)
+        img = OcrRasterizer.to_image(pix)
+        
+        # 使用OCR提取文字（中英文）
+        return pytesseract.image_to_string(img, lang=self.lang)
@@ -52,13 +52,13 @@ class ConfigDialog(QDialog):
         history_group = QGroupBox("历史记录")
         history_layout = QFormLayout()
         
-        # 最大历史记录数
+        # 历史记录每页显示条数
         self.spin_max_history = QSpinBox()
         self.spin_max_history.setRange(5, 100)
         self.spin_max_history.setValue(
             self.config_manager.get("max_history", 20)
         )
-        history_layout.addRow("最大记录数:", self.spin_max_history)
+        history_layout.addRow("每页记录数:", self.spin_max_history)
         
         # 清空历史按钮
         self.btn_clear_history = QPushButton("清空历史记录")
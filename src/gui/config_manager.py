@@ -3,7 +3,10 @@
 """
 import json
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
+
+from ..core.history_store import HistoryStore
+from ..core.models import CheckReport
 
 
 class ConfigManager:
@@ -12,7 +15,8 @@ class ConfigManager:
     def __init__(self):
         self.config_dir = Path.home() / ".patentcheck"
         self.config_file = self.config_dir / "config.json"
-        self.history_file = self.config_dir / "history.json"
+        self.history_file = self.config_dir / "history.json"  # 旧版历史记录，仅用于迁移
+        self.history_db = self.config_dir / "history.db"
         
         # 确保配置目录存在
         self.config_dir.mkdir(exist_ok=True)
@@ -21,6 +25,10 @@ class ConfigManager:
         self.default_config = {
             "auto_save_report": True,
             "default_output_format": "pdf",
+            "compact_json_report": False,
+            "ai_cache_ttl_days": 30,
+            "ai_cache_max_entries": 500,
+            "preview_cache_max_mb": 200,
             "max_history": 20,
             "theme": "light",
             "show_hints": True,
@@ -28,7 +36,10 @@ class ConfigManager:
         }
         
         self.config = self.load_config()
-        self.history = self.load_history()
+        
+        # 检测历史保存在SQLite中，首次启动时导入旧版history.json
+        self.history_store = HistoryStore(self.history_db)
+        self.history_store.migrate_json(self.history_file)
     
     def load_config(self) -> Dict[str, Any]:
         """加载配置"""
@@ -50,46 +61,36 @@ class ConfigManager:
         except Exception as e:
             print(f"保存配置失败: {e}")
     
-    def load_history(self) -> list:
-        """加载历史记录"""
-        if self.history_file.exists():
-            try:
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                pass
-        return []
-    
-    def save_history(self):
-        """保存历史记录"""
-        try:
-            # 限制历史记录数量
-            max_history = self.config.get("max_history", 20)
-            self.history = self.history[-max_history:]
-            
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存历史记录失败: {e}")
+    @property
+    def history(self) -> List[Dict[str, Any]]:
+        """最近检测过的文件夹（每个文件夹最近一次，按时间正序，最多max_history条）"""
+        max_history = self.config.get("max_history", 20)
+        return list(reversed(self.history_store.list_runs(limit=max_history, latest_only=True)))
     
-    def add_history(self, folder_path: str, summary: Dict[str, int]):
-        """添加历史记录"""
-        from datetime import datetime
-        
-        record = {
-            "folder": folder_path,
-            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "summary": summary
-        }
+    def add_history(self, folder_path: str, summary: Dict[str, int], report: Optional[CheckReport] = None) -> int:
+        """
+        添加历史记录
         
-        # 移除相同路径的旧记录
-        self.history = [h for h in self.history if h["folder"] != folder_path]
+        Args:
+            folder_path: 检测的文件夹
+            summary: 统计摘要
+            report: 检测报告（提供时保存全部检查结果，并为说明书文本建立全文索引）
         
-        # 添加新记录到末尾
-        self.history.append(record)
+        Returns:
+            检测记录ID
+        """
+        if report is None:
+            return self.history_store.add_run(folder_path, summary)
         
-        # 保存
-        self.save_history()
+        spec_text = report.document.specification_content
+        return self.history_store.add_run(
+            folder_path,
+            summary,
+            results=report.results,
+            time=report.timestamp,
+            spec_path=report.document.specification_path,
+            spec_text=spec_text if isinstance(spec_text, str) else None
+        )
     
     def get(self, key: str, default: Any = None) -> Any:
         """获取配置值"""
@@ -102,5 +103,4 @@ class ConfigManager:
     
     def clear_history(self):
         """清空历史记录"""
-        self.history = []
-        self.save_history()
+        self.history_store.clear()
@@ -3,32 +3,77 @@
 支持PDF和Word文档的预览，包含图片显示
 """
 import os
-import io
+from functools import partial
 from pathlib import Path
 from typing import Optional, Dict, List
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QTabWidget, QWidget, QScrollArea, QComboBox, QMessageBox,
-    QProgressDialog, QToolBar
+    QProgressDialog, QToolBar, QListWidget, QListWidgetItem
 )
-from PySide6.QtCore import Qt, QThread, Signal, QSize
-from PySide6.QtGui import QPixmap, QImage, QPainter, QIcon
-import pymupdf  # PyMuPDF
-from docx import Document
+from PySide6.QtCore import Qt, QThread, Signal, QSize, QPoint, QRect
+from PySide6.QtGui import QImage, QIcon, QPainter, QPixmap, QTextDocument, QTextCursor
 from PIL import Image
 
+from ..file_parser.docx_stream import DocxStreamReader
+from .page_cache import THUMBNAIL, PageCache
+from .page_renderer import (
+    PageHandle, PageRenderer, PdfPageSource, TextDocumentPageSource, TileRenderer, page_handles
+)
+
+
+def build_word_document(file_path: str) -> QTextDocument:
+    """
+    将Word文档的段落、表格和图片按原顺序写入QTextDocument
+    
+    Args:
+        file_path: Word文档路径
+        
+    Returns:
+        填充好内容的文档（未设置页面宽度）
+    """
+    text_doc = QTextDocument()
+    cursor = QTextCursor(text_doc)
+    
+    # 流式遍历Word文档的段落和图片，图片按原位置插入
+    with DocxStreamReader(file_path) as reader:
+        for block in reader.iter_blocks():
+            if block.kind == 'paragraph':
+                cursor.insertText(block.text + '\n')
+            elif block.kind == 'table':
+                for row in block.rows:
+                    cursor.insertText(' | '.join(row) + '\n')
+            elif block.kind == 'image':
+                try:
+                    # 将图片转换为QImage
+                    qimg = QImage.fromData(reader.read_part(block.target))
+                    if not qimg.isNull():
+                        # 添加图片到文档
+                        cursor.insertImage(qimg, block.target)
+                        cursor.insertText('\n')
+                except Exception as e:
+                    print(f"提取图片失败: {e}")
+    return text_doc
+
 
 class DocumentLoadThread(QThread):
-    """文档加载线程，避免UI阻塞"""
-    finished = Signal(str, list)  # 文档类型，渲染的页面列表（QPixmap）
+    """文档加载线程，避免UI阻塞（只读取页数和页面尺寸，页面在显示时按需渲染）"""
+    finished = Signal(str, list)  # 文档类型，页面句柄列表（PageHandle）
     error = Signal(str, str)  # 文档类型，错误消息
     progress = Signal(str, int, int)  # 文档类型，当前页，总页数
     
-    def __init__(self, doc_type: str, file_path: str, zoom_level: float = 1.5):
+    def __init__(
+        self,
+        doc_type: str,
+        file_path: str,
+        zoom_level: float = 1.5,
+        page_cache: Optional[PageCache] = None
+    ):
         super().__init__()
         self.doc_type = doc_type
         self.file_path = file_path
         self.zoom_level = zoom_level
+        self.page_cache = page_cache
     
     def run(self):
         """执行文档加载"""
@@ -36,9 +81,9 @@ class DocumentLoadThread(QThread):
             ext = Path(self.file_path).suffix.lower()
             
             if ext == '.pdf':
-                pages = self._render_pdf()
+                pages = self._load_pdf()
             elif ext in ['.docx', '.doc']:
-                pages = self._render_word()
+                pages = self._load_word()
             else:
                 self.error.emit(self.doc_type, f"不支持的文件格式: {ext}")
                 return
@@ -48,96 +93,135 @@ class DocumentLoadThread(QThread):
         except Exception as e:
             self.error.emit(self.doc_type, f"加载失败: {str(e)}")
     
-    def _render_pdf(self) -> List[QPixmap]:
-        """渲染PDF文档为图片列表"""
-        pages = []
-        doc = pymupdf.open(self.file_path)
-        
-        for page_num in range(len(doc)):
-            self.progress.emit(self.doc_type, page_num + 1, len(doc))
-            
-            page = doc[page_num]
-            # 使用matrix控制渲染质量，zoom_level越大越清晰
-            mat = pymupdf.Matrix(self.zoom_level, self.zoom_level)
-            pix = page.get_pixmap(matrix=mat)
-            
-            # 转换为QPixmap
-            img_data = pix.tobytes("png")
-            qimg = QImage.fromData(img_data)
-            pixmap = QPixmap.fromImage(qimg)
-            pages.append(pixmap)
-        
-        doc.close()
-        return pages
-    
-    def _render_word(self) -> List[QPixmap]:
-        """渲染Word文档为图片
-        采用方案二：直接提取内容并渲染为图片
+    def _file_hash(self) -> Optional[str]:
+        """文件内容哈希（未启用磁盘缓存或计算失败时返回None）"""
+        if self.page_cache is None:
+            return None
+        try:
+            return self.page_cache.file_hash(self.file_path)
+        except Exception as e:
+            print(f"⚠️  预览缓存不可用: {e}")
+            return None
+    
+    def _load_pdf(self) -> List[PageHandle]:
+        """打开PDF文档，读取各页尺寸"""
+        source = PdfPageSource(self.file_path, self.zoom_level)
+        digest = self._file_hash()
+        if digest:
+            source.source_id = f"{digest}:pdf@{self.zoom_level}"
+        self.progress.emit(self.doc_type, source.page_count, source.page_count)
+        return page_handles(source)
+    
+    def _load_word(self) -> List[PageHandle]:
+        """排版Word文档
+        采用方案二：直接提取内容排版，显示时按页绘制
+        已缓存分页结果时跳过排版，文档推迟到需要渲染未缓存的页面时才创建
         """
-        from PySide6.QtGui import QTextDocument, QTextCursor, QTextImageFormat
-        from PySide6.QtWidgets import QTextEdit
-        
-        doc = Document(self.file_path)
         self.progress.emit(self.doc_type, 1, 1)
         
-        # 创建临时QTextDocument来渲染内容
-        text_doc = QTextDocument()
-        cursor = QTextCursor(text_doc)
+        build = partial(build_word_document, self.file_path)
+        digest = self._file_hash()
+        if not digest:
+            # 按A4纸张比例分页
+            return page_handles(TextDocumentPageSource(build))
         
-        # 遍历Word文档的段落
-        for para in doc.paragraphs:
-            cursor.insertText(para.text + '\n')
-        
-        # 提取图片
-        for rel in doc.part.rels.values():
-            if "image" in rel.target_ref:
-                try:
-                    image_data = rel.target_part.blob
-                    # 将图片转换为QPixmap
-                    qimg = QImage.fromData(image_data)
-                    if not qimg.isNull():
-                        # 添加图片到文档
-                        image_format = QTextImageFormat()
-                        cursor.insertImage(qimg, f"image_{len(doc.part.rels)}")
-                except Exception as e:
-                    print(f"提取图片失败: {e}")
-        
-        # 渲染QTextDocument为图片
-        # 设置文档大小（A4纸张比例）
-        page_width = 800
-        page_height = int(page_width * 1.414)  # A4比例
-        text_doc.setTextWidth(page_width)
-        
-        # 计算需要多少页
-        doc_height = text_doc.size().height()
-        num_pages = int(doc_height / page_height) + 1
-        
-        pages = []
-        for page_num in range(num_pages):
-            # 创建一个空白图片
-            pixmap = QPixmap(page_width, page_height)
-            pixmap.fill(Qt.white)
-            
-            # 在图片上绘制文档内容
-            painter = QPainter(pixmap)
-            painter.translate(0, -page_num * page_height)
-            text_doc.drawContents(painter)
-            painter.end()
-            
-            pages.append(pixmap)
+        source_id = f"{digest}:word@{TextDocumentPageSource.PAGE_WIDTH}"
+        page_sizes = None
+        try:
+            page_sizes = self.page_cache.get_layout(source_id)
+        except Exception as e:
+            print(f"⚠️  读取预览缓存失败: {e}")
+        
+        source = TextDocumentPageSource(build, page_sizes)
+        source.source_id = source_id
+        if page_sizes is None:
+            try:
+                self.page_cache.put_layout(source_id, source.page_sizes)
+            except Exception as e:
+                print(f"⚠️  写入预览缓存失败: {e}")
+        return page_handles(source)
+
+
+class TiledPageWidget(QWidget):
+    """按分块绘制的页面（分块渲染完成前以低分辨率的整页图像填充）"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.page_size = QSize()
+        self.backdrop: Optional[QPixmap] = None
+        self.tiles: Dict[tuple, QPixmap] = {}
+    
+    def set_page(self, page_size: QSize, backdrop: Optional[QPixmap]):
+        """
+        设置页面尺寸和底图，清空分块
         
-        return pages
+        Args:
+            page_size: 当前缩放比例下的页面尺寸
+            backdrop: 任意缩放比例的整页图像（绘制时拉伸）
+        """
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.setMinimumSize(page_size)
+        self.backdrop = backdrop
+        self.tiles = {}
+        self.update()
+    
+    def set_tiles(self, tiles: Dict[tuple, QPixmap]):
+        """设置已渲染的分块 {(列, 行): 图像}"""
+        self.tiles = tiles
+        self.update()
+    
+    def page_origin(self) -> QPoint:
+        """页面在控件中的位置（控件大于页面时居中）"""
+        return QPoint(
+            max(0, (self.width() - self.page_size.width()) // 2),
+            max(0, (self.height() - self.page_size.height()) // 2)
+        )
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.translate(self.page_origin())
+        page_rect = QRect(QPoint(0, 0), self.page_size)
+        painter.fillRect(page_rect, Qt.white)
+        if self.backdrop is not None:
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.drawPixmap(page_rect, self.backdrop)
+        
+        size = TileRenderer.TILE_SIZE
+        for (col, row), pixmap in self.tiles.items():
+            target = QRect(col * size, row * size, size, size).intersected(page_rect)
+            painter.drawPixmap(target, pixmap)
+        painter.end()
 
 
 class DocumentViewer(QWidget):
-    """单个文档查看器"""
+    """单个文档查看器（只渲染当前页和相邻页，缩略图只渲染可见部分，高倍缩放时分块渲染视口）"""
     
-    def __init__(self, parent=None):
+    PREFETCH_PAGES = 1  # 预渲染当前页前后的页数
+    TILE_ZOOM = 1.0     # 缩放比例超过该值时只分块渲染视口内的部分，整页按该比例渲染作为底图
+    THUMB_WIDTH = 120   # 缩略图宽度
+    THUMB_FALLBACK_PAGES = 10  # 无法确定可见范围时渲染当前页前后的缩略图数
+    
+    def __init__(self, parent=None, page_cache: Optional[PageCache] = None):
+        """
+        Args:
+            parent: 父窗口
+            page_cache: 预览页面磁盘缓存（可选）
+        """
         super().__init__(parent)
-        self.pages: List[QPixmap] = []
+        self.pages: List[PageHandle] = []
         self.current_page = 0
         self.zoom_factor = 1.0
         
+        self.renderer = PageRenderer(page_cache=page_cache, parent=self)
+        self.renderer.page_ready.connect(self.on_page_ready)
+        self.thumb_renderer = PageRenderer(
+            max_cached_pages=200, page_cache=page_cache, kind=THUMBNAIL, parent=self
+        )
+        self.thumb_renderer.page_ready.connect(self.on_thumbnail_ready)
+        self.tile_renderer = TileRenderer(parent=self)
+        self.tile_renderer.page_ready.connect(self.on_tile_ready)
+        
         self.init_ui()
     
     def init_ui(self):
@@ -187,6 +271,17 @@ class DocumentViewer(QWidget):
         
         layout.addLayout(toolbar)
         
+        content = QHBoxLayout()
+        
+        # 缩略图列表
+        self.thumb_list = QListWidget()
+        self.thumb_list.setIconSize(QSize(self.THUMB_WIDTH, int(self.THUMB_WIDTH * 1.414)))
+        self.thumb_list.setFixedWidth(self.THUMB_WIDTH + 40)
+        self.thumb_list.setUniformItemSizes(True)
+        self.thumb_list.currentRowChanged.connect(self.go_to_page)
+        self.thumb_list.verticalScrollBar().valueChanged.connect(self.update_thumbnails)
+        content.addWidget(self.thumb_list)
+        
         # 滚动区域显示文档
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidgetResizable(True)
@@ -196,14 +291,73 @@ class DocumentViewer(QWidget):
         self.image_label.setAlignment(Qt.AlignCenter)
         self.scroll_area.setWidget(self.image_label)
         
-        layout.addWidget(self.scroll_area)
+        # 高倍缩放时替换image_label
+        self.tile_view = TiledPageWidget()
+        for scroll_bar in (self.scroll_area.horizontalScrollBar(), self.scroll_area.verticalScrollBar()):
+            scroll_bar.valueChanged.connect(self.update_tiles)
+            scroll_bar.rangeChanged.connect(self.update_tiles)
+        
+        content.addWidget(self.scroll_area)
+        layout.addLayout(content)
     
-    def set_pages(self, pages: List[QPixmap]):
+    def set_pages(self, pages: List[PageHandle]):
         """设置文档页面"""
         self.pages = pages
+        source = pages[0].source if pages else None
+        self.renderer.set_source(source)
+        self.thumb_renderer.set_source(source)
+        self.tile_renderer.set_source(source)
         self.current_page = 0
+        
+        self.thumb_list.blockSignals(True)
+        self.thumb_list.clear()
+        for index in range(len(pages)):
+            self.thumb_list.addItem(QListWidgetItem(f"第{index + 1}页"))
+        if pages:
+            self.thumb_list.setCurrentRow(0)
+        self.thumb_list.blockSignals(False)
+        
         self.update_page_display()
         self.update_navigation_buttons()
+        self.update_thumbnails()
+    
+    def thumbnail_scale(self) -> float:
+        """缩略图的缩放比例（按第一页宽度计算）"""
+        return self.THUMB_WIDTH / self.pages[0].size().width()
+    
+    def visible_thumbnail_rows(self) -> List[int]:
+        """缩略图列表中可见的行"""
+        viewport = self.thumb_list.viewport()
+        first = self.thumb_list.indexAt(viewport.rect().topLeft()).row()
+        last = self.thumb_list.indexAt(viewport.rect().bottomLeft()).row()
+        if first < 0:
+            # 列表尚未显示，按当前页估计
+            first = max(0, self.current_page - self.THUMB_FALLBACK_PAGES)
+            last = self.current_page + self.THUMB_FALLBACK_PAGES
+        elif last < 0:
+            last = len(self.pages) - 1
+        return list(range(first, min(last, len(self.pages) - 1) + 1))
+    
+    def update_thumbnails(self, *args):
+        """渲染可见的缩略图"""
+        if not self.pages:
+            return
+        ready = self.thumb_renderer.request(self.visible_thumbnail_rows(), self.thumbnail_scale())
+        for index, pixmap in ready.items():
+            self.thumb_list.item(index).setIcon(QIcon(pixmap))
+    
+    def on_thumbnail_ready(self, index: int):
+        """缩略图渲染完成"""
+        if not self.pages or index >= self.thumb_list.count():
+            return
+        pixmap = self.thumb_renderer.cached(index, self.thumbnail_scale())
+        if pixmap is not None:
+            self.thumb_list.item(index).setIcon(QIcon(pixmap))
+    
+    def showEvent(self, event):
+        """显示后可见范围才能确定，重新请求缩略图"""
+        super().showEvent(event)
+        self.update_thumbnails()
     
     def update_page_display(self):
         """更新页面显示"""
@@ -212,24 +366,87 @@ class DocumentViewer(QWidget):
             self.lbl_page.setText("0 / 0")
             return
         
-        # 应用缩放
-        pixmap = self.pages[self.current_page]
-        if self.zoom_factor != 1.0:
-            new_width = int(pixmap.width() * self.zoom_factor)
-            new_height = int(pixmap.height() * self.zoom_factor)
-            pixmap = pixmap.scaled(new_width, new_height, 
-                                   Qt.KeepAspectRatio, 
-                                   Qt.SmoothTransformation)
-        
-        self.image_label.setPixmap(pixmap)
+        # 按当前缩放比例渲染当前页，并预渲染相邻页（分块显示时整页只按TILE_ZOOM渲染）
+        tiled = self.zoom_factor > self.TILE_ZOOM
+        indexes = [self.current_page]
+        for offset in range(1, self.PREFETCH_PAGES + 1):
+            indexes += [self.current_page + offset, self.current_page - offset]
+        ready = self.renderer.request(indexes, self.TILE_ZOOM if tiled else self.zoom_factor)
+        
+        pixmap = ready.get(self.current_page)
+        size = self.pages[self.current_page].size(self.zoom_factor)
+        if tiled:
+            self.show_page_widget(self.tile_view)
+            self.tile_view.set_page(size, pixmap or self.renderer.any_cached(self.current_page))
+            self.update_tiles()
+        else:
+            self.show_page_widget(self.image_label)
+            if pixmap is None:
+                # 渲染期间临时显示其他缩放比例的图像，没有时显示占位文字
+                pixmap = self.renderer.any_cached(self.current_page)
+                if pixmap is not None:
+                    pixmap = pixmap.scaled(size, Qt.KeepAspectRatio, Qt.FastTransformation)
+            
+            if pixmap is not None:
+                self.image_label.setPixmap(pixmap)
+            else:
+                self.image_label.setText(f"正在渲染第 {self.current_page + 1} 页...")
         self.lbl_page.setText(f"{self.current_page + 1} / {len(self.pages)}")
     
+        if self.thumb_list.currentRow() != self.current_page:
+            self.thumb_list.blockSignals(True)
+            self.thumb_list.setCurrentRow(self.current_page)
+            self.thumb_list.blockSignals(False)
+    
+    def show_page_widget(self, widget: QWidget):
+        """切换滚动区域中的页面控件（image_label 或 tile_view）"""
+        if self.scroll_area.widget() is not widget:
+            # takeWidget不销毁原控件，之后可以再切换回来
+            self.scroll_area.takeWidget()
+            self.scroll_area.setWidget(widget)
+    
+    def update_tiles(self, *args):
+        """请求渲染视口内的分块"""
+        if not self.pages or self.scroll_area.widget() is not self.tile_view:
+            return
+        viewport = self.scroll_area.viewport()
+        visible = QRect(
+            self.scroll_area.horizontalScrollBar().value(),
+            self.scroll_area.verticalScrollBar().value(),
+            viewport.width(),
+            viewport.height()
+        ).translated(-self.tile_view.page_origin())
+        self.tile_view.set_tiles(self.tile_renderer.request_tiles(self.current_page, self.zoom_factor, visible))
+    
+    def on_tile_ready(self, index: int):
+        """分块渲染完成"""
+        if index == self.current_page:
+            self.update_tiles()
+    
+    def on_page_ready(self, index: int):
+        """页面渲染完成"""
+        if index == self.current_page and self.pages:
+            self.update_page_display()
+    
+    def close_document(self):
+        """停止渲染并释放文档"""
+        self.thumb_renderer.close()
+        self.tile_renderer.close()
+        self.renderer.close()
+    
     def update_navigation_buttons(self):
         """更新导航按钮状态"""
         has_pages = len(self.pages) > 0
         self.btn_prev.setEnabled(has_pages and self.current_page > 0)
         self.btn_next.setEnabled(has_pages and self.current_page < len(self.pages) - 1)
     
+    def go_to_page(self, index: int):
+        """跳转到指定页（点击缩略图）"""
+        if 0 <= index < len(self.pages) and index != self.current_page:
+            self.current_page = index
+            self.update_page_display()
+            self.update_navigation_buttons()
+    
     def prev_page(self):
         """上一页"""
         if self.current_page > 0:
@@ -266,13 +483,21 @@ class DocumentViewer(QWidget):
 class DocumentPreviewDialog(QDialog):
     """文档预览对话框"""
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, page_cache: Optional[PageCache] = None):
+        """
+        Args:
+            parent: 父窗口
+            page_cache: 预览页面磁盘缓存（可选），重新打开同一文件时直接读取渲染结果
+        """
         super().__init__(parent)
         self.documents: Dict[str, str] = {}  # 文档类型 -> 文件路径
         self.viewers: Dict[str, DocumentViewer] = {}  # 文档类型 -> 查看器
         self.load_threads: List[DocumentLoadThread] = []
+        self.page_cache = page_cache
         
         self.init_ui()
+        # accept()/reject() 关闭对话框时不触发closeEvent
+        self.finished.connect(self.release_documents)
     
     def init_ui(self):
         """初始化界面"""
@@ -326,12 +551,12 @@ class DocumentPreviewDialog(QDialog):
                 continue
             
             # 创建查看器
-            viewer = DocumentViewer(self)
+            viewer = DocumentViewer(self, page_cache=self.page_cache)
             self.viewers[doc_type] = viewer
             self.tab_widget.addTab(viewer, doc_type)
             
             # 创建加载线程
-            thread = DocumentLoadThread(doc_type, file_path)
+            thread = DocumentLoadThread(doc_type, file_path, page_cache=self.page_cache)
             thread.finished.connect(self.on_document_loaded)
             thread.error.connect(self.on_load_error)
             thread.progress.connect(self.on_load_progress)
@@ -346,7 +571,7 @@ class DocumentPreviewDialog(QDialog):
         
         progress.close()
     
-    def on_document_loaded(self, doc_type: str, pages: List[QPixmap]):
+    def on_document_loaded(self, doc_type: str, pages: List[PageHandle]):
         """文档加载完成"""
         if doc_type in self.viewers:
             self.viewers[doc_type].set_pages(pages)
@@ -360,10 +585,16 @@ class DocumentPreviewDialog(QDialog):
         # 可以在这里更新进度显示
         pass
     
-    def closeEvent(self, event):
-        """关闭事件，清理线程"""
+    def release_documents(self, *args):
+        """等待加载线程结束，释放已打开的文档"""
         for thread in self.load_threads:
             if thread.isRunning():
                 thread.quit()
                 thread.wait()
+        for viewer in self.viewers.values():
+            viewer.close_document()
+    
+    def closeEvent(self, event):
+        """关闭事件，清理线程和已打开的文档"""
+        self.release_documents()
         event.accept()
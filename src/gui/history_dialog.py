@@ -2,7 +2,7 @@
 历史记录对话框
 """
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QPushButton,
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QLineEdit,
     QTableWidget, QTableWidgetItem, QHeaderView
 )
 from PySide6.QtCore import Qt, Signal
@@ -16,41 +16,77 @@ class HistoryDialog(QDialog):
     # 信号：选择了某个历史记录
     folder_selected = Signal(str)
     
+    # 搜索最多显示的记录数
+    SEARCH_LIMIT = 200
+    
     def __init__(self, config_manager: ConfigManager, parent=None):
         super().__init__(parent)
         self.config_manager = config_manager
+        self.store = config_manager.history_store
+        
+        # 分页状态：滚动到底部时再加载下一页
+        self.page_size = config_manager.get("max_history", 20)
+        self.loaded = 0
+        self.total = 0
+        self.searching = False
+        
         self.init_ui()
         self.load_history()
     
     def init_ui(self):
         """初始化界面"""
         self.setWindowTitle("检测历史")
-        self.setMinimumSize(700, 400)
+        self.setMinimumSize(900, 400)
         
         layout = QVBoxLayout()
         self.setLayout(layout)
         
+        # 全文搜索
+        search_layout = QHBoxLayout()
+        
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索说明书内容或检查结果（多个关键词用空格分隔）")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.returnPressed.connect(self.search)
+        self.search_input.textChanged.connect(self.on_search_text_changed)
+        search_layout.addWidget(self.search_input)
+        
+        self.btn_search = QPushButton("🔍 搜索")
+        self.btn_search.clicked.connect(self.search)
+        search_layout.addWidget(self.btn_search)
+        
+        layout.addLayout(search_layout)
+        
         # 历史记录表格
         self.history_table = QTableWidget()
-        self.history_table.setColumnCount(5)
+        self.history_table.setColumnCount(6)
         self.history_table.setHorizontalHeaderLabels([
-            "文件夹", "检测时间", "总数", "错误", "警告"
+            "文件夹", "检测时间", "总数", "错误", "警告", "匹配内容"
         ])
         
         # 设置列宽
         header = self.history_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
         header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(5, QHeaderView.Stretch)
         
         self.history_table.setSelectionBehavior(QTableWidget.SelectRows)
         self.history_table.setSelectionMode(QTableWidget.SingleSelection)
         self.history_table.doubleClicked.connect(self.on_item_double_clicked)
+        self.history_table.verticalScrollBar().valueChanged.connect(self.on_scrolled)
         
         layout.addWidget(self.history_table)
         
         # 按钮
         btn_layout = QHBoxLayout()
         
+        self.lbl_count = QLabel()
+        btn_layout.addWidget(self.lbl_count)
+        
+        self.btn_more = QPushButton("加载更多")
+        self.btn_more.clicked.connect(self.load_more)
+        btn_layout.addWidget(self.btn_more)
+        
         self.btn_open = QPushButton("打开选中文件夹")
         self.btn_open.clicked.connect(self.open_selected)
         btn_layout.addWidget(self.btn_open)
@@ -68,14 +104,54 @@ class HistoryDialog(QDialog):
         layout.addLayout(btn_layout)
     
     def load_history(self):
-        """加载历史记录"""
-        history = self.config_manager.history
+        """重新加载历史记录（只加载第一页）"""
+        self.searching = False
+        self.history_table.setRowCount(0)
+        self.loaded = 0
+        self.total = self.store.count_runs()
+        self.load_more()
+    
+    def load_more(self):
+        """加载下一页历史记录"""
+        records = self.store.list_runs(limit=self.page_size, offset=self.loaded)
+        self.append_records(records)
+        
+        self.loaded += len(records)
+        self.lbl_count.setText(f"已加载 {self.loaded} / {self.total} 条")
+        self.btn_more.setEnabled(self.loaded < self.total)
+    
+    def search(self):
+        """全文搜索历史记录"""
+        query = self.search_input.text().strip()
+        if not query:
+            self.load_history()
+            return
+        
+        self.searching = True
+        records = self.store.search(query, limit=self.SEARCH_LIMIT)
         
-        self.history_table.setRowCount(len(history))
+        self.history_table.setRowCount(0)
+        self.append_records(records)
         
-        for i, record in enumerate(reversed(history)):  # 倒序显示
-            # 文件夹
-            self.history_table.setItem(i, 0, QTableWidgetItem(record["folder"]))
+        suffix = "（仅显示最近的结果）" if len(records) >= self.SEARCH_LIMIT else ""
+        self.lbl_count.setText(f"找到 {len(records)} 条{suffix}")
+        self.btn_more.setEnabled(False)
+    
+    def on_search_text_changed(self, text: str):
+        """清空搜索框时恢复历史列表"""
+        if not text.strip() and self.searching:
+            self.load_history()
+    
+    def append_records(self, records):
+        """将检测记录追加到表格末尾"""
+        row = self.history_table.rowCount()
+        self.history_table.setRowCount(row + len(records))
+        
+        for i, record in enumerate(records, row):  # 按时间倒序
+            # 文件夹（记录ID保存在单元格数据中）
+            folder_item = QTableWidgetItem(record["folder"])
+            folder_item.setData(Qt.UserRole, record["id"])
+            self.history_table.setItem(i, 0, folder_item)
             
             # 时间
             self.history_table.setItem(i, 1, QTableWidgetItem(record["time"]))
@@ -91,6 +167,18 @@ class HistoryDialog(QDialog):
             self.history_table.setItem(i, 4, QTableWidgetItem(
                 str(summary.get("warnings", 0))
             ))
+            
+            # 搜索匹配片段
+            if "snippet" in record:
+                source = "说明书" if record["match"] == "spec" else "检查结果"
+                self.history_table.setItem(i, 5, QTableWidgetItem(f"[{source}] {record['snippet']}"))
+    
+    def on_scrolled(self, value: int):
+        """滚动到底部时加载下一页"""
+        if self.searching:
+            return
+        if value == self.history_table.verticalScrollBar().maximum() and self.loaded < self.total:
+            self.load_more()
     
     def on_item_double_clicked(self):
         """双击打开"""
@@ -129,11 +217,11 @@ class HistoryDialog(QDialog):
         
         if reply == QMessageBox.Yes:
             # 从历史记录中删除
-            self.config_manager.history = [
-                h for h in self.config_manager.history 
-                if h["folder"] != folder
-            ]
-            self.config_manager.save_history()
+            run_id = self.history_table.item(row, 0).data(Qt.UserRole)
+            self.store.delete_run(run_id)
             
             # 刷新表格
-            self.load_history()
+            if self.searching:
+                self.search()
+            else:
+                self.load_history()
@@ -11,24 +11,30 @@ from PySide6.QtWidgets import (
     QMessageBox, QComboBox, QLineEdit, QCheckBox
 )
 from PySide6.QtCore import Qt, QThread, Signal
-from PySide6.QtGui import QFont, QAction
+from PySide6.QtGui import QFont, QAction, QTextCursor
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.core.config_loader import ConfigLoader
+from src.core.config_watcher import ConfigWatcher
 from src.core.models import CheckReport
-from src.core.rule_engine import RuleEngine
+from src.core.rule_engine import RuleEngine, ResultCache
 from src.file_parser.parser import FileParser
 from src.structure_checker.checker import StructureChecker
 from src.image_checker.checker import ImageChecker
 from src.alignment_checker.checker import AlignmentChecker
 from src.report_generator.pdf_generator import PDFReportGenerator
+from src.report_generator.json_writer import write_report_json
 from src.gui.config_manager import ConfigManager
 from src.gui.config_dialog import ConfigDialog
 from src.gui.history_dialog import HistoryDialog
 from src.gui.document_preview_dialog import DocumentPreviewDialog
+from src.gui.page_cache import PageCache
 from src.ai_reviewer.reviewer import AIReviewer
+from src.ai_reviewer.deepseek_client import close_shared_clients
+from src.ai_reviewer.response_cache import ResponseCache
 
 
 class AIReviewThread(QThread):
@@ -36,21 +42,20 @@ class AIReviewThread(QThread):
     finished = Signal(str)  # 审查完成信号
     error = Signal(str)  # 错误信号
     progress = Signal(str)  # 进度信号
+    partial_result = Signal(str)  # 审查结果增量信号（合并后的文本片段）
     document_content_extracted = Signal(str, str)  # 文档内容提取完成信号（路径，内容）
     
-    def __init__(self, document_path, prompt, cached_content=None):
+    def __init__(self, document_path, prompt, cached_content=None, response_cache=None):
         super().__init__()
         self.document_path = document_path
         self.prompt = prompt
         self.cached_content = cached_content
+        self.response_cache = response_cache
     
     def run(self):
         """执行AI审查"""
         try:
-            self.progress.emit("🤖 正在连接DeepSeek API...")
-            
-            from src.ai_reviewer.deepseek_client import DeepSeekClient
-            client = DeepSeekClient()
+            reviewer = AIReviewer(self.response_cache)
             
             # 如果有缓存，直接使用
             if self.cached_content:
@@ -59,17 +64,104 @@ class AIReviewThread(QThread):
             else:
                 # 否则提取文档内容
                 self.progress.emit("📄 正在提取文档内容...")
-                reviewer = AIReviewer()
                 document_content = reviewer.extract_document_text(self.document_path)
                 
                 # 发送文档内容给主线程缓存
                 self.document_content_extracted.emit(self.document_path, document_content)
             
-            # 调用API进行审查
-            result = client.review_with_prompt(document_content, self.prompt)
+            from src.ai_reviewer.chunked_review import ChunkedReviewer
+            from src.ai_reviewer.deepseek_client import TokenUsage, coalesce_deltas, get_shared_client
+            client = get_shared_client()
+            
+            # 相同文档和提示词已在同一服务上审查过，直接返回缓存结果
+            key = AIReviewer.cache_key(document_content, self.prompt, client)
+            cached = reviewer.response_cache.get(key) if reviewer.response_cache else None
+            if cached is not None:
+                self.progress.emit("✓ 使用缓存的AI审查结果")
+                self.partial_result.emit(cached)
+                self.finished.emit(cached)
+                return
+            
+            self.progress.emit("🤖 正在连接DeepSeek API...")
+            usage = TokenUsage()
+            
+            # 流式调用API，合并后的增量实时显示（长文档先分段并发审查）
+            self.progress.emit("⏳ 正在等待AI审查结果...")
+            parts = []
+            deltas = ChunkedReviewer(client).stream_review(
+                document_content, self.prompt, on_progress=self.progress.emit, usage=usage
+            )
+            for text in coalesce_deltas(deltas):
+                parts.append(text)
+                self.partial_result.emit(text)
+            
+            result = ''.join(parts)
+            if not result:
+                raise ValueError("API返回结果为空")
+            
+            if reviewer.response_cache:
+                reviewer.response_cache.put(key, result, client.model)
             
             self.progress.emit("✓ AI审查完成")
+            if usage.calls:
+                self.progress.emit(
+                    f"ℹ️ 输入 {usage.prompt_tokens} tokens（上下文缓存命中 {usage.cache_hit_tokens}），"
+                    f"输出 {usage.completion_tokens} tokens"
+                )
             self.finished.emit(result)
+        
+        except Exception as e:
+            self.error.emit(f"AI审查失败: {str(e)}")
+
+
+class AIMultiReviewThread(QThread):
+    """多提示词AI审查线程（同一文档并发执行全部预设提示词）"""
+    finished = Signal(object)  # 完成信号，传递 {提示词: 结果字典}
+    error = Signal(str)  # 错误信号
+    progress = Signal(str)  # 进度信号
+    document_content_extracted = Signal(str, str)  # 文档内容提取完成信号（路径，内容）
+    
+    def __init__(self, document_path, prompts, cached_content=None, response_cache=None):
+        super().__init__()
+        self.document_path = document_path
+        self.prompts = prompts
+        self.cached_content = cached_content
+        self.response_cache = response_cache
+    
+    def run(self):
+        """执行多提示词AI审查"""
+        try:
+            reviewer = AIReviewer(self.response_cache)
+            
+            if self.cached_content:
+                self.progress.emit("✓ 使用缓存的文档内容")
+                document_content = self.cached_content
+            else:
+                self.progress.emit("📄 正在提取文档内容...")
+                document_content = reviewer.extract_document_text(self.document_path)
+                self.document_content_extracted.emit(self.document_path, document_content)
+            
+            self.progress.emit(f"🤖 正在并发执行 {len(self.prompts)} 个审查提示词...")
+            
+            def on_result(prompt, result):
+                if not result['success']:
+                    self.progress.emit(f"❌ {prompt}: {result['error']}")
+                elif result['cached']:
+                    self.progress.emit(f"✓ {prompt}（使用缓存的审查结果）")
+                else:
+                    usage = result['usage']
+                    self.progress.emit(
+                        f"✓ {prompt}（输入 {usage['prompt_tokens']} tokens，"
+                        f"上下文缓存命中 {usage['cache_hit_tokens']}）"
+                    )
+            
+            results = reviewer.review_prompts(
+                document_content,
+                self.prompts,
+                use_cache=self.response_cache is not None,
+                on_result=on_result
+            )
+            self.finished.emit(results)
             
         except Exception as e:
             self.error.emit(f"AI审查失败: {str(e)}")
@@ -81,9 +173,13 @@ class CheckThread(QThread):
     finished = Signal(object)  # 完成信号，传递报告对象
     error = Signal(str)  # 错误信号
     
-    def __init__(self, folder_path):
+    def __init__(self, folder_path, result_cache=None):
         super().__init__()
         self.folder_path = folder_path
+        self.result_cache = result_cache
+        
+        # 检测开始时固定配置快照，整次检测使用同一份规则
+        self.snapshot = ConfigLoader().snapshot()
     
     def run(self):
         """执行检测"""
@@ -101,26 +197,33 @@ class CheckThread(QThread):
                 self.error.emit("未找到有效的专利文档")
                 return
             
+            # 读取一次说明书全文，标号检查和保存历史记录时的全文索引共用
+            # （检查结果来自缓存时同样读取，全文索引不受缓存是否命中影响）
+            if document.specification_path:
+                try:
+                    document.specification_content = FileParser.extract_specification_text(
+                        document.specification_path
+                    )
+                except Exception as e:
+                    self.progress.emit(f"⚠️ 说明书文本提取失败，将不建立全文索引: {e}")
+            
             # 创建检测报告
             report = CheckReport(document=document)
             
             # 初始化规则引擎
             self.progress.emit("\n🔍 正在执行检查...")
-            engine = RuleEngine()
+            engine = RuleEngine(result_cache=self.result_cache)
             
             # 注册检查器
-            engine.register_checker(StructureChecker())
-            engine.register_checker(ImageChecker())
-            engine.register_checker(AlignmentChecker())
+            engine.register_checker(StructureChecker(snapshot=self.snapshot))
+            engine.register_checker(ImageChecker(snapshot=self.snapshot))
+            engine.register_checker(AlignmentChecker(snapshot=self.snapshot))
             
-            # 执行检查
-            results = engine.run_checks(document)
-            
-            # 添加结果到报告
-            for result in results:
+            # 执行检查，每个检查器完成后即加入报告
+            for result in engine.iter_checks(document):
                 report.add_result(result)
             
-            self.progress.emit(f"✓ 完成检查，共{len(results)}项结果\n")
+            self.progress.emit(f"✓ 完成检查，共{report.total_checks}项结果\n")
             
             # 发送完成信号
             self.finished.emit(report)
@@ -132,6 +235,8 @@ class CheckThread(QThread):
 class MainWindow(QMainWindow):
     """主窗口"""
     
+    config_reloaded = Signal(tuple)  # 检测规则热加载信号（发生变化的规则分区）
+    
     def __init__(self):
         super().__init__()
         self.folder_path = None
@@ -139,6 +244,21 @@ class MainWindow(QMainWindow):
         self.check_thread = None
         self.ai_review_thread = None
         
+        # 检查结果缓存（重复检测未修改的文件时复用结果）
+        self.result_cache = ResultCache()
+        
+        # 监视检测规则文件，修改后自动热加载
+        self.config_reloaded.connect(self.on_config_reloaded)
+        ConfigLoader().subscribe(self.on_config_changed)
+        self.config_watcher = ConfigWatcher()
+        self.config_watcher.start()
+        
+        # AI审查结果缓存（首次AI审查时打开）
+        self.response_cache = None
+        
+        # 预览页面磁盘缓存（首次预览时打开）
+        self.page_cache = None
+        
         # 文档内容缓存（用于AI审查）
         self.cached_document_content = None
         self.cached_document_path = None
@@ -254,6 +374,12 @@ class MainWindow(QMainWindow):
         self.ai_review_button.setMinimumHeight(35)
         self.ai_review_button.clicked.connect(self.start_ai_review)
         ai_control_layout.addWidget(self.ai_review_button)
+        self.ai_multi_review_button = QPushButton("🤖 全部预设审查")
+        self.ai_multi_review_button.setToolTip("对同一文档并发执行全部预设提示词")
+        self.ai_multi_review_button.setEnabled(False)
+        self.ai_multi_review_button.setMinimumHeight(35)
+        self.ai_multi_review_button.clicked.connect(self.start_ai_multi_review)
+        ai_control_layout.addWidget(self.ai_multi_review_button)
         ai_review_layout.addLayout(ai_control_layout)
         
         # AI审查结果展示区
@@ -399,7 +525,7 @@ class MainWindow(QMainWindow):
         self.progress_bar.setMaximum(0)  # 无限进度
         
         # 创建并启动检测线程
-        self.check_thread = CheckThread(self.folder_path)
+        self.check_thread = CheckThread(self.folder_path, self.result_cache)
         self.check_thread.progress.connect(self.log)
         self.check_thread.finished.connect(self.on_check_finished)
         self.check_thread.error.connect(self.on_check_error)
@@ -451,7 +577,7 @@ class MainWindow(QMainWindow):
         self.log("\n✨ 检测完成！")
         
         # 添加到历史记录
-        self.config_manager.add_history(self.folder_path, summary)
+        self.config_manager.add_history(self.folder_path, summary, self.report)
         
         # 自动保存报告
         if self.config_manager.get("auto_save_report", True):
@@ -463,7 +589,7 @@ class MainWindow(QMainWindow):
         self.btn_preview.setEnabled(True)  # 启用预览按钮
         self.btn_export_pdf.setEnabled(True)
         self.btn_export_json.setEnabled(True)
-        self.ai_review_button.setEnabled(True)
+        self.set_ai_buttons_enabled(True)
         
         # 检查是否需要同步执行AI审查
         if self.sync_review_checkbox.isChecked():
@@ -509,9 +635,8 @@ class MainWindow(QMainWindow):
         
         if filename:
             try:
-                import json
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(self.report.to_dict(), f, ensure_ascii=False, indent=2)
+                compact = self.config_manager.get("compact_json_report", False)
+                write_report_json(self.report, filename, compact=compact)
                 self.log(f"✓ JSON数据已保存: {filename}")
             except Exception as e:
                 self.log(f"❌ JSON导出失败: {e}")
@@ -533,9 +658,8 @@ class MainWindow(QMainWindow):
             
             if output_format == "json" or output_format == "both":
                 json_path = folder / "patent_check_report.json"
-                import json
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.report.to_dict(), f, ensure_ascii=False, indent=2)
+                compact = self.config_manager.get("compact_json_report", False)
+                write_report_json(self.report, str(json_path), compact=compact)
                 self.log(f"✓ 自动保存JSON: {json_path}")
                 
         except Exception as e:
@@ -594,7 +718,7 @@ class MainWindow(QMainWindow):
             return
         
         # 创建并显示预览对话框
-        dialog = DocumentPreviewDialog(self)
+        dialog = DocumentPreviewDialog(self, page_cache=self.get_page_cache())
         dialog.set_documents(documents)
         dialog.exec()
         
@@ -622,7 +746,7 @@ class MainWindow(QMainWindow):
             return
         
         self.ai_result_text.clear()
-        self.ai_review_button.setEnabled(False)
+        self.set_ai_buttons_enabled(False)
         self.log("🤖 正在进行AI审查，请稍候...")
         
         doc_path = self.report.document.specification_path
@@ -634,26 +758,108 @@ class MainWindow(QMainWindow):
             self.log("ℹ️ 使用已缓存的文档内容，无需重新读取")
         
         # 创建并启动AI审查线程
-        self.ai_review_thread = AIReviewThread(doc_path, prompt, cached_content)
+        self.ai_review_thread = AIReviewThread(doc_path, prompt, cached_content, self.get_response_cache())
         self.ai_review_thread.progress.connect(self.log)
+        self.ai_review_thread.partial_result.connect(self.on_ai_review_partial)
         self.ai_review_thread.finished.connect(self.on_ai_review_finished)
         self.ai_review_thread.error.connect(self.on_ai_review_error)
         self.ai_review_thread.document_content_extracted.connect(self.on_document_content_extracted)
         self.ai_review_thread.start()
     
+    def start_ai_multi_review(self):
+        """对当前说明书并发执行全部预设提示词"""
+        if not self.report or not self.report.document.specification_path:
+            QMessageBox.warning(self, "提示", "请先选择并检测包含说明书的专利文件夹")
+            return
+        
+        self.ai_result_text.clear()
+        self.set_ai_buttons_enabled(False)
+        self.log("🤖 正在执行全部预设审查，请稍候...")
+        
+        doc_path = self.report.document.specification_path
+        cached_content = None
+        if self.cached_document_path == doc_path and self.cached_document_content:
+            cached_content = self.cached_document_content
+            self.log("ℹ️ 使用已缓存的文档内容，无需重新读取")
+        
+        prompts = AIReviewer.get_preset_prompts()
+        self.ai_review_thread = AIMultiReviewThread(doc_path, prompts, cached_content, self.get_response_cache())
+        self.ai_review_thread.progress.connect(self.log)
+        self.ai_review_thread.finished.connect(self.on_ai_multi_review_finished)
+        self.ai_review_thread.error.connect(self.on_ai_review_error)
+        self.ai_review_thread.document_content_extracted.connect(self.on_document_content_extracted)
+        self.ai_review_thread.start()
+    
+    def on_ai_multi_review_finished(self, results: dict):
+        """全部预设审查完成"""
+        sections = []
+        for prompt, result in results.items():
+            body = result['result'] if result['success'] else f"❌ {result['error']}"
+            sections.append(f"【{prompt}】\n{body.strip()}")
+        text = '\n\n'.join(sections)
+        
+        self.ai_result_text.setPlainText(text)
+        if self.report:
+            self.report.ai_review_result = text
+            self.report.ai_review_prompt = '\n'.join(results)
+        self.set_ai_buttons_enabled(True)
+        
+        hit = sum(r['usage']['cache_hit_tokens'] for r in results.values())
+        prompt_tokens = sum(r['usage']['prompt_tokens'] for r in results.values())
+        succeeded = sum(1 for r in results.values() if r['success'])
+        self.log(f"✓ 全部预设审查完成: {succeeded}/{len(results)} 成功")
+        if prompt_tokens:
+            self.log(f"ℹ️ 输入共 {prompt_tokens} tokens，其中上下文缓存命中 {hit} tokens")
+    
+    def set_ai_buttons_enabled(self, enabled: bool):
+        """启用/禁用AI审查按钮"""
+        self.ai_review_button.setEnabled(enabled)
+        self.ai_multi_review_button.setEnabled(enabled)
+    
+    def get_response_cache(self):
+        """获取AI审查结果缓存（首次使用时打开，打开失败则不使用缓存）"""
+        if self.response_cache is None:
+            try:
+                self.response_cache = ResponseCache(
+                    ttl_days=self.config_manager.get("ai_cache_ttl_days", ResponseCache.DEFAULT_TTL_DAYS),
+                    max_entries=self.config_manager.get("ai_cache_max_entries", ResponseCache.DEFAULT_MAX_ENTRIES)
+                )
+            except Exception as e:
+                self.log(f"⚠️  AI审查结果缓存不可用: {e}")
+        return self.response_cache
+    
+    def get_page_cache(self):
+        """获取预览页面磁盘缓存（首次使用时打开，打开失败则不使用缓存）"""
+        if self.page_cache is None:
+            try:
+                self.page_cache = PageCache(
+                    max_mb=self.config_manager.get("preview_cache_max_mb", PageCache.DEFAULT_MAX_MB)
+                )
+            except Exception as e:
+                self.log(f"⚠️  预览缓存不可用: {e}")
+        return self.page_cache
+    
+    def on_ai_review_partial(self, text: str):
+        """追加AI审查结果增量"""
+        cursor = self.ai_result_text.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self.ai_result_text.setTextCursor(cursor)
+    
     def on_ai_review_finished(self, result: str):
         """AI审查完成"""
-        self.ai_result_text.setPlainText(result)
+        if self.ai_result_text.toPlainText() != result:
+            self.ai_result_text.setPlainText(result)
         if self.report:
             self.report.ai_review_result = result
             self.report.ai_review_prompt = self.prompt_input.toPlainText().strip()
-        self.ai_review_button.setEnabled(True)
+        self.set_ai_buttons_enabled(True)
         self.log("✓ AI审查结果已生成")
     
     def on_ai_review_error(self, error_msg: str):
         """计审查错误"""
         self.ai_result_text.setPlainText(f"❌ AI审查失败：{error_msg}")
-        self.ai_review_button.setEnabled(True)
+        self.set_ai_buttons_enabled(True)
         self.log(f"❌ AI审查失败：{error_msg}")
     
     def on_document_content_extracted(self, doc_path: str, content: str):
@@ -685,6 +891,24 @@ class MainWindow(QMainWindow):
             "<p>© 2024 PatentCheck Team</p>"
         )
     
+    def on_config_changed(self, snapshot, changed):
+        """检测规则已热加载（在监视线程中调用）"""
+        # 只清除依赖已变化规则的缓存，正在进行的检测继续使用旧快照
+        self.result_cache.invalidate(changed)
+        self.config_reloaded.emit(changed)
+    
+    def on_config_reloaded(self, changed):
+        """检测规则热加载完成"""
+        if changed:
+            self.log(f"✓ 检测规则已更新: {', '.join(changed)}（下次检测生效）")
+    
+    def closeEvent(self, event):
+        """关闭窗口时停止配置监视，关闭AI客户端连接"""
+        self.config_watcher.stop()
+        ConfigLoader().unsubscribe(self.on_config_changed)
+        close_shared_clients()
+        super().closeEvent(event)
+    
     def log(self, message):
         """添加日志"""
         self.log_text.append(message)
@@ -0,0 +1,237 @@
+"""
+预览页面磁盘缓存
+以 文件内容哈希+页码+缩放比例 为键，将渲染好的页面和缩略图保存在SQLite中，
+按总大小上限淘汰最久未使用的图像；同时缓存各文档的分页结果，重新打开Word文档时无需重新排版
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QImage
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS layouts (
+    source_id TEXT PRIMARY KEY,
+    sizes TEXT NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    source_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    scale REAL NOT NULL,
+    kind TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    stride INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (source_id, page, scale, kind)
+);
+CREATE INDEX IF NOT EXISTS idx_images_accessed ON images(accessed_at);
+"""
+
+PAGE = 'page'
+THUMBNAIL = 'thumb'
+
+
+class PageCache:
+    """预览页面磁盘缓存"""
+    
+    DEFAULT_MAX_MB = 200
+    MAX_LAYOUTS = 1000
+    # 渲染耗时低于该值的页面不写入缓存（读取并解压一页约需15ms，不比重新渲染快）
+    MIN_RENDER_SECONDS = 0.025
+    
+    def __init__(self, db_path: Optional[Path] = None, max_mb: float = DEFAULT_MAX_MB):
+        """
+        打开（必要时创建）缓存数据库
+        
+        Args:
+            db_path: 数据库文件路径，默认 ~/.patentcheck/preview_cache.db
+            max_mb: 图像总大小上限（MB），超出时淘汰最久未使用的图像
+        """
+        self.db_path = Path(db_path) if db_path else Path.home() / ".patentcheck" / "preview_cache.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+    
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            self._conn.close()
+    
+    def total_bytes(self) -> int:
+        """缓存图像的总大小（字节）"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM images").fetchone()[0]
+    
+    def file_hash(self, file_path: str) -> str:
+        """
+        计算文件内容的哈希（文件大小和修改时间未变时复用上次的结果）
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            sha256十六进制
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row is not None:
+            return row[0]
+        
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+            )
+        return digest.hexdigest()
+    
+    def get_layout(self, source_id: str) -> Optional[List[QSize]]:
+        """
+        读取文档的分页结果
+        
+        Args:
+            source_id: 页面来源标识（文件哈希+渲染方式）
+            
+        Returns:
+            各页尺寸，未缓存返回None
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT sizes FROM layouts WHERE source_id = ?", (source_id,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE layouts SET accessed_at = ? WHERE source_id = ?", (time.time(), source_id)
+            )
+        return [QSize(width, height) for width, height in json.loads(row[0])]
+    
+    def put_layout(self, source_id: str, page_sizes: List[QSize]):
+        """
+        保存文档的分页结果
+        
+        Args:
+            source_id: 页面来源标识
+            page_sizes: 各页尺寸
+        """
+        sizes = json.dumps([[size.width(), size.height()] for size in page_sizes])
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO layouts (source_id, sizes, accessed_at) VALUES (?, ?, ?)",
+                (source_id, sizes, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM layouts WHERE source_id IN ("
+                "SELECT source_id FROM layouts ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.MAX_LAYOUTS,)
+            )
+    
+    def get_image(self, source_id: str, page: int, scale: float, kind: str = PAGE) -> Optional[QImage]:
+        """
+        读取缓存的页面图像
+        
+        Args:
+            source_id: 页面来源标识
+            page: 页码（从0开始）
+            scale: 缩放比例
+            kind: PAGE（页面）或 THUMBNAIL（缩略图）
+            
+        Returns:
+            页面图像，未命中返回None
+        """
+        key = (source_id, page, round(scale, 3), kind)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT width, height, stride, data FROM images "
+                "WHERE source_id = ? AND page = ? AND scale = ? AND kind = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE images SET accessed_at = ? "
+                "WHERE source_id = ? AND page = ? AND scale = ? AND kind = ?", (time.time(), *key)
+            )
+        
+        width, height, stride, data = row
+        try:
+            pixels = zlib.decompress(data)
+        except zlib.error:
+            return None
+        return QImage(pixels, width, height, stride, QImage.Format_RGB32).copy()
+    
+    def put_image(self, source_id: str, page: int, scale: float, image: QImage, kind: str = PAGE):
+        """
+        保存页面图像，并按总大小上限淘汰最久未使用的图像
+        
+        Args:
+            source_id: 页面来源标识
+            page: 页码（从0开始）
+            scale: 缩放比例
+            image: 页面图像
+            kind: PAGE（页面）或 THUMBNAIL（缩略图）
+        """
+        if image.format() != QImage.Format_RGB32:
+            image = image.convertToFormat(QImage.Format_RGB32)
+        # 页面以白底文字为主，快速压缩即可达到约1/30的体积
+        data = zlib.compress(bytes(image.constBits()), 1)
+        
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images "
+                "(source_id, page, scale, kind, width, height, stride, data, bytes, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (source_id, page, round(scale, 3), kind, image.width(), image.height(),
+                 image.bytesPerLine(), data, len(data), now)
+            )
+            self._evict()
+    
+    def _evict(self):
+        """淘汰最久未使用的图像，直到总大小不超过上限（调用方持有锁）"""
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM images").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        stale = []
+        for rowid, size in self._conn.execute("SELECT rowid, bytes FROM images ORDER BY accessed_at"):
+            stale.append((rowid,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM images WHERE rowid = ?", stale)
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM images")
+            self._conn.execute("DELETE FROM layouts")
+            self._conn.execute("DELETE FROM files")
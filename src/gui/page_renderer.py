@@ -0,0 +1,462 @@
+"""
+文档页面按需渲染
+页面来源只在加载时读取页数和页面尺寸，页面图像在显示时由后台线程池渲染，
+渲染结果保存在有容量上限的LRU缓存中；高倍缩放时只分块渲染视口内的部分
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import pymupdf  # PyMuPDF
+from PySide6.QtCore import QObject, QPoint, QRect, QRectF, QSize, Qt, QThreadPool, Signal
+from PySide6.QtGui import QImage, QPainter, QPixmap, QTextDocument
+
+from .page_cache import PAGE, THUMBNAIL, PageCache
+
+
+# MuPDF不支持多线程并发调用，所有PDF的打开和渲染都串行执行
+_MUPDF_LOCK = threading.Lock()
+
+_render_pool: Optional[QThreadPool] = None
+
+
+def pixmap_to_qimage(pix: "pymupdf.Pixmap") -> QImage:
+    """
+    将PyMuPDF像素图转换为QImage
+    
+    直接以像素图的内存（按行跨度）构造QImage，再转换为Qt绘制最快的RGB32格式，
+    只复制一次像素，不经过PNG编码和解码
+    
+    Args:
+        pix: RGB或RGBA像素图
+        
+    Returns:
+        独立于像素图内存的QImage
+    """
+    if pix.n not in (3, 4) or (pix.n == 4 and not pix.alpha):
+        pix = pymupdf.Pixmap(pymupdf.csRGB, pix)
+    if pix.alpha:
+        # MuPDF的透明像素为预乘alpha
+        image = QImage(pix.samples_mv, pix.width, pix.height, pix.stride, QImage.Format_RGBA8888_Premultiplied)
+        return image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    image = QImage(pix.samples_mv, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
+    return image.convertToFormat(QImage.Format_RGB32)
+
+
+def render_pool() -> QThreadPool:
+    """页面渲染线程池（所有查看器共用）"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = QThreadPool()
+        _render_pool.setMaxThreadCount(2)
+    return _render_pool
+
+
+class PageSource:
+    """页面来源基类"""
+    
+    always_cache = False    # 是否每页都写入磁盘缓存（重新打开时准备文档的代价高）
+    
+    def __init__(self):
+        self.page_sizes: List[QSize] = []   # 缩放比例为1.0时各页的像素尺寸
+        self.source_id: Optional[str] = None  # 磁盘缓存标识（文件哈希+渲染方式），None表示不缓存
+        self._lock = threading.Lock()
+    
+    @property
+    def page_count(self) -> int:
+        return len(self.page_sizes)
+    
+    def page_size(self, index: int, scale: float = 1.0) -> QSize:
+        """指定缩放比例下的页面尺寸"""
+        size = self.page_sizes[index]
+        return QSize(max(1, round(size.width() * scale)), max(1, round(size.height() * scale)))
+    
+    def render(self, index: int, scale: float) -> QImage:
+        """
+        渲染指定页面（在工作线程中调用）
+        
+        Args:
+            index: 页码（从0开始）
+            scale: 缩放比例
+            
+        Returns:
+            页面图像
+        """
+        raise NotImplementedError
+    
+    def render_tile(self, index: int, scale: float, rect: QRect) -> QImage:
+        """
+        渲染页面的一部分（在工作线程中调用）
+        
+        Args:
+            index: 页码（从0开始）
+            scale: 缩放比例
+            rect: 该缩放比例下页面内的像素区域
+            
+        Returns:
+            区域图像
+        """
+        return self.render(index, scale).copy(rect)
+    
+    def close(self):
+        """释放文档资源"""
+
+
+class PdfPageSource(PageSource):
+    """PDF页面来源"""
+    
+    def __init__(self, file_path: str, zoom_level: float = 1.5):
+        """
+        打开PDF并读取各页尺寸
+        
+        Args:
+            file_path: PDF路径
+            zoom_level: 缩放比例为1.0时的渲染倍率（相对于72dpi）
+        """
+        super().__init__()
+        self.file_path = file_path
+        self.zoom_level = zoom_level
+        with _MUPDF_LOCK:
+            self._doc = pymupdf.open(file_path)
+            matrix = pymupdf.Matrix(zoom_level, zoom_level)
+            for page in self._doc:
+                # 与get_pixmap相同的取整方式
+                rect = (page.rect * matrix).irect
+                self.page_sizes.append(QSize(rect.width, rect.height))
+    
+    def render(self, index: int, scale: float) -> QImage:
+        zoom = self.zoom_level * scale
+        with _MUPDF_LOCK:
+            if self._doc is None:
+                return QImage()
+            pix = self._doc[index].get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        return pixmap_to_qimage(pix)
+    
+    def render_tile(self, index: int, scale: float, rect: QRect) -> QImage:
+        zoom = self.zoom_level * scale
+        with _MUPDF_LOCK:
+            if self._doc is None:
+                return QImage()
+            page = self._doc[index]
+            # 像素区域换算为页面坐标，只光栅化该区域
+            x0, y0 = page.rect.x0, page.rect.y0
+            clip = pymupdf.Rect(
+                x0 + rect.x() / zoom, y0 + rect.y() / zoom,
+                x0 + (rect.x() + rect.width()) / zoom, y0 + (rect.y() + rect.height()) / zoom
+            )
+            pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), clip=clip, alpha=False)
+        return pixmap_to_qimage(pix)
+    
+    def close(self):
+        with _MUPDF_LOCK:
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+
+
+class TextDocumentPageSource(PageSource):
+    """按固定页面尺寸分页的QTextDocument（用于Word文档）"""
+    
+    PAGE_WIDTH = 800
+    PAGE_HEIGHT = int(PAGE_WIDTH * 1.414)   # A4比例
+    
+    always_cache = True
+    
+    def __init__(self, build: Callable[[], QTextDocument], page_sizes: Optional[List[QSize]] = None):
+        """
+        Args:
+            build: 创建并填充文档的函数
+            page_sizes: 已知的分页结果（来自磁盘缓存），提供时推迟到首次渲染才创建文档
+        """
+        super().__init__()
+        self._build = build
+        self.text_doc: Optional[QTextDocument] = None
+        if page_sizes is None:
+            num_pages = int(self._document().size().height() / self.PAGE_HEIGHT) + 1
+            page_sizes = [QSize(self.PAGE_WIDTH, self.PAGE_HEIGHT)] * num_pages
+        self.page_sizes = page_sizes
+    
+    def _document(self) -> QTextDocument:
+        """排版后的文档（首次访问时创建）"""
+        if self.text_doc is None:
+            self.text_doc = self._build()
+            self.text_doc.setTextWidth(self.PAGE_WIDTH)
+        return self.text_doc
+    
+    def render(self, index: int, scale: float) -> QImage:
+        return self.render_tile(index, scale, QRect(QPoint(0, 0), self.page_size(index, scale)))
+    
+    def render_tile(self, index: int, scale: float, rect: QRect) -> QImage:
+        image = QImage(rect.width(), rect.height(), QImage.Format_RGB32)
+        image.fill(Qt.white)
+        
+        # 区域在文档坐标系中的位置
+        left = rect.x() / scale
+        top = index * self.PAGE_HEIGHT + rect.y() / scale
+        width = rect.width() / scale
+        height = min(rect.height() / scale, (index + 1) * self.PAGE_HEIGHT - top)
+        with self._lock:
+            painter = QPainter(image)
+            painter.scale(scale, scale)
+            painter.translate(-left, -top)
+            self._document().drawContents(painter, QRectF(left, top, width, height))
+            painter.end()
+        return image
+
+
+class PageHandle:
+    """页面句柄（未渲染的页面，渲染由PageRenderer按需完成）"""
+    
+    __slots__ = ('source', 'index')
+    
+    def __init__(self, source: PageSource, index: int):
+        self.source = source
+        self.index = index
+    
+    def size(self, scale: float = 1.0) -> QSize:
+        """指定缩放比例下的页面尺寸"""
+        return self.source.page_size(self.index, scale)
+
+
+def page_handles(source: PageSource) -> List[PageHandle]:
+    """为页面来源的每一页创建句柄"""
+    return [PageHandle(source, index) for index in range(source.page_count)]
+
+
+class _RenderSignals(QObject):
+    """
+    工作线程 -> 主线程的渲染结果信号（来源代数，缓存键，图像）
+    
+    不设父对象，由提交的渲染任务持有引用，查看器销毁期间工作线程发出信号也不会访问已释放的对象；
+    接收方销毁后连接自动断开
+    """
+    rendered = Signal(int, object, QImage)
+
+
+class PageRenderer(QObject):
+    """
+    页面渲染调度和缓存
+    
+    request() 返回已缓存的页面图像，未缓存的页面提交后台渲染，渲染完成后发出 page_ready 信号。
+    已不需要的页面（翻页或缩放后）在开始渲染前跳过。
+    """
+    
+    MAX_CACHED_PAGES = 8
+    
+    page_ready = Signal(int)  # 页码
+    
+    def __init__(
+        self,
+        max_cached_pages: int = MAX_CACHED_PAGES,
+        page_cache: Optional[PageCache] = None,
+        kind: str = PAGE,
+        parent=None
+    ):
+        """
+        Args:
+            max_cached_pages: 内存中缓存的页面数上限
+            page_cache: 磁盘缓存（可选），渲染前先读取，渲染代价高的页面写入
+            kind: PAGE（页面）或 THUMBNAIL（缩略图，总是写入磁盘缓存）
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.max_cached_pages = max_cached_pages
+        self.page_cache = page_cache
+        self.kind = kind
+        self.source: Optional[PageSource] = None
+        # 键为 (页码, 缩放比例)，分块渲染时为 (页码, 缩放比例, 列, 行)
+        self._cache: "OrderedDict[tuple, QPixmap]" = OrderedDict()
+        self._pending: Set[tuple] = set()
+        self._wanted: Set[tuple] = set()
+        self._wanted_lock = threading.Lock()
+        self._generation = 0    # 切换页面来源时递增，丢弃旧来源的渲染结果
+        self._signals = _RenderSignals()
+        self._signals.rendered.connect(self._on_rendered)
+    
+    @staticmethod
+    def _key(index: int, scale: float) -> Tuple[int, float]:
+        return index, round(scale, 3)
+    
+    def set_source(self, source: Optional[PageSource]):
+        """切换页面来源，清空缓存"""
+        self.source = source
+        self._generation += 1
+        self._cache.clear()
+        self._pending.clear()
+        with self._wanted_lock:
+            self._wanted.clear()
+    
+    def cached(self, index: int, scale: float) -> Optional[QPixmap]:
+        """读取缓存的页面图像（不触发渲染）"""
+        pixmap = self._cache.get(self._key(index, scale))
+        if pixmap is not None:
+            self._cache.move_to_end(self._key(index, scale))
+        return pixmap
+    
+    def any_cached(self, index: int) -> Optional[QPixmap]:
+        """读取该页任意缩放比例的缓存图像（缩放后重新渲染期间临时显示）"""
+        for key, pixmap in reversed(self._cache.items()):
+            if key[0] == index:
+                return pixmap
+        return None
+    
+    def request(self, indexes: List[int], scale: float) -> Dict[int, QPixmap]:
+        """
+        请求渲染一组页面（通常为当前页和相邻页），取消其余未开始的渲染
+        
+        Args:
+            indexes: 页码列表，按优先级排列
+            scale: 缩放比例
+            
+        Returns:
+            已缓存的页面 {页码: 图像}
+        """
+        if self.source is None:
+            return {}
+        
+        keys = [self._key(index, scale) for index in indexes if 0 <= index < self.source.page_count]
+        return {key[0]: pixmap for key, pixmap in self._request(keys).items()}
+    
+    def _request(self, keys: List[tuple]) -> Dict[tuple, QPixmap]:
+        """提交未缓存的键（按优先级排列）渲染，返回已缓存的 {键: 图像}"""
+        with self._wanted_lock:
+            self._wanted = set(keys)
+        
+        ready = {}
+        pool = render_pool()
+        for priority, key in enumerate(keys):
+            pixmap = self._cache.get(key)
+            if pixmap is not None:
+                self._cache.move_to_end(key)
+                ready[key] = pixmap
+            elif key not in self._pending:
+                self._pending.add(key)
+                pool.start(
+                    lambda key=key, source=self.source, generation=self._generation, signals=self._signals:
+                        self._render(source, generation, key, signals),
+                    -priority
+                )
+        return ready
+    
+    def _render(self, source: PageSource, generation: int, key: tuple, signals: _RenderSignals):
+        """渲染页面（工作线程）"""
+        with self._wanted_lock:
+            wanted = key in self._wanted
+        image = QImage()
+        if wanted:
+            try:
+                image = self._load(source, key)
+            except Exception as e:
+                print(f"⚠️  渲染第{key[0] + 1}页失败: {e}")
+        signals.rendered.emit(generation, key, image)
+    
+    def _load(self, source: PageSource, key: Tuple[int, float]) -> QImage:
+        """读取磁盘缓存，未命中时渲染（工作线程）"""
+        index, scale = key
+        cache = self.page_cache if source.source_id else None
+        if cache is not None:
+            try:
+                image = cache.get_image(source.source_id, index, scale, self.kind)
+                if image is not None:
+                    return image
+            except Exception as e:
+                print(f"⚠️  读取预览缓存失败: {e}")
+        
+        start = time.perf_counter()
+        image = source.render(index, scale)
+        elapsed = time.perf_counter() - start
+        
+        if cache is not None and not image.isNull() and (
+            source.always_cache or self.kind == THUMBNAIL or elapsed >= cache.MIN_RENDER_SECONDS
+        ):
+            try:
+                cache.put_image(source.source_id, index, scale, image, self.kind)
+            except Exception as e:
+                print(f"⚠️  写入预览缓存失败: {e}")
+        return image
+    
+    def _on_rendered(self, generation: int, key: tuple, image: QImage):
+        """保存渲染结果（主线程）"""
+        if generation != self._generation:
+            return
+        self._pending.discard(key)
+        if image.isNull():
+            return
+        
+        self._cache[key] = QPixmap.fromImage(image)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached_pages:
+            self._cache.popitem(last=False)
+        self.page_ready.emit(key[0])
+    
+    def close(self):
+        """停止后续渲染并释放页面来源"""
+        with self._wanted_lock:
+            self._wanted.clear()
+        self._generation += 1
+        self._cache.clear()
+        self._pending.clear()
+        if self.source is not None:
+            self.source.close()
+
+
+class TileRenderer(PageRenderer):
+    """
+    页面分块渲染（高倍缩放时只渲染视口内的部分）
+    
+    页面按 TILE_SIZE 见方切分，以 (页码, 缩放比例, 列, 行) 为键缓存；
+    各缩放比例的分块共用一个LRU缓存，内存占用与缩放倍数无关。
+    分块渲染很快且与视口位置相关，不写入磁盘缓存。
+    """
+    
+    TILE_SIZE = 512
+    MAX_CACHED_TILES = 48   # 约48MB
+    
+    def __init__(self, max_cached_tiles: int = MAX_CACHED_TILES, parent=None):
+        super().__init__(max_cached_pages=max_cached_tiles, parent=parent)
+    
+    @classmethod
+    def tile_rect(cls, source: PageSource, index: int, scale: float, col: int, row: int) -> QRect:
+        """分块在页面内的像素区域（页面右侧和底部的分块可能不足 TILE_SIZE）"""
+        page_rect = QRect(QPoint(0, 0), source.page_size(index, scale))
+        tile = QRect(col * cls.TILE_SIZE, row * cls.TILE_SIZE, cls.TILE_SIZE, cls.TILE_SIZE)
+        return tile.intersected(page_rect)
+    
+    def request_tiles(self, index: int, scale: float, visible: QRect) -> Dict[Tuple[int, int], QPixmap]:
+        """
+        请求渲染页面可见区域的分块，取消其余未开始的渲染
+        
+        Args:
+            index: 页码
+            scale: 缩放比例
+            visible: 页面内的可见像素区域
+            
+        Returns:
+            已缓存的分块 {(列, 行): 图像}
+        """
+        if self.source is None or not 0 <= index < self.source.page_count:
+            return {}
+        visible = visible.intersected(QRect(QPoint(0, 0), self.source.page_size(index, scale)))
+        if visible.isEmpty():
+            return {}
+        
+        size = self.TILE_SIZE
+        center = visible.center()
+        tiles = [
+            (col, row)
+            for row in range(visible.top() // size, visible.bottom() // size + 1)
+            for col in range(visible.left() // size, visible.right() // size + 1)
+        ]
+        # 视口中心附近的分块先渲染
+        tiles.sort(key=lambda tile: (
+            abs((tile[0] + 0.5) * size - center.x()) + abs((tile[1] + 0.5) * size - center.y())
+        ))
+        
+        scale = round(scale, 3)
+        ready = self._request([(index, scale, col, row) for col, row in tiles])
+        return {key[2:]: pixmap for key, pixmap in ready.items()}
+    
+    def _load(self, source: PageSource, key: Tuple[int, float, int, int]) -> QImage:
+        index, scale, col, row = key
+        return source.render_tile(index, scale, self.tile_rect(source, index, scale, col, row))
@@ -1,10 +1,11 @@
 """
 附图格式检查器
 """
-from typing import List
+from typing import List, Optional
 import numpy as np
 from PIL import Image
 
+from ..core.config_snapshot import ConfigSnapshot
 from ..core.models import CheckResult, PatentDocument, CheckCategory, Severity
 from ..core.rule_engine import BaseChecker
 
@@ -12,11 +13,16 @@ from ..core.rule_engine import BaseChecker
 class ImageChecker(BaseChecker):
     """附图格式检查器"""
     
-    MIN_DPI = 200  # 最低分辨率要求
-    COLOR_THRESHOLD = 0.05  # 彩色像素阈值（5%）
+    SECTIONS = ('image_rules',)
+    CACHEABLE = True
     
-    def __init__(self, config: dict = None):
-        super().__init__(config or {'enabled': True})
+    def __init__(self, config: dict = None, snapshot: Optional[ConfigSnapshot] = None):
+        super().__init__(config, snapshot)
+        
+        rules = self.snapshot.image
+        self.min_dpi = rules.min_dpi  # 最低分辨率要求
+        self.check_color = rules.check_color_pixels
+        self.color_threshold = rules.max_color_pixel_ratio  # 彩色像素比例上限
     
     def check(self, document: PatentDocument) -> List[CheckResult]:
         """检查附图格式"""
@@ -42,22 +48,22 @@ class ImageChecker(BaseChecker):
                 
                 # 检查分辨率
                 dpi = info['dpi'][0] if isinstance(info['dpi'], tuple) else info['dpi']
-                if dpi < self.MIN_DPI:
+                if dpi < self.min_dpi:
                     results.append(CheckResult(
                         rule_id="I001",
                         category=CheckCategory.IMAGE_FORMAT,
                         severity=Severity.WARNING,
                         title=f"附图{i}分辨率过低",
-                        description=f"当前分辨率为{dpi}dpi，低于要求的{self.MIN_DPI}dpi",
+                        description=f"当前分辨率为{dpi}dpi，低于要求的{self.min_dpi}dpi",
                         location=fig_path,
-                        suggestion=f"请提高图片分辨率至{self.MIN_DPI}dpi以上",
+                        suggestion=f"请提高图片分辨率至{self.min_dpi}dpi以上",
                         reference="专利审查指南第一部分第一章5.2节"
                     ))
                 
                 # 检查彩色像素
-                if info['mode'] in ['RGB', 'RGBA']:
+                if self.check_color and info['mode'] in ['RGB', 'RGBA']:
                     color_ratio = self._check_color_pixels(img)
-                    if color_ratio > self.COLOR_THRESHOLD:
+                    if color_ratio > self.color_threshold:
                         results.append(CheckResult(
                             rule_id="I002",
                             category=CheckCategory.IMAGE_FORMAT,
@@ -10,6 +10,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.core.config_loader import ConfigLoader
 from src.core.models import CheckReport
 from src.core.rule_engine import RuleEngine
 from src.file_parser.parser import FileParser
@@ -17,6 +18,7 @@ from src.structure_checker.checker import StructureChecker
 from src.image_checker.checker import ImageChecker
 from src.alignment_checker.checker import AlignmentChecker
 from src.report_generator.pdf_generator import PDFReportGenerator
+from src.report_generator.json_writer import JSONReportWriter
 
 
 def main():
@@ -30,6 +32,7 @@ def main():
   python main_full.py /path/to/patent_folder
   python main_full.py /path/to/specification.docx
   python main_full.py --output report.pdf /path/to/files
+  python main_full.py --no-pdf --compact -j report.json /path/to/files
         """
     )
     parser.add_argument('path', help='专利文件或文件夹路径')
@@ -39,6 +42,8 @@ def main():
                        help='输出JSON报告路径 (默认: patent_check_report.json)')
     parser.add_argument('--no-pdf', action='store_true',
                        help='不生成PDF报告')
+    parser.add_argument('--compact', action='store_true',
+                       help='JSON报告使用紧凑格式（每个检查结果一行）')
     
     args = parser.parse_args()
     
@@ -69,20 +74,25 @@ def main():
         # 3. 初始化规则引擎
         engine = RuleEngine()
         
-        # 4. 注册检查器
+        # 4. 注册检查器（共用同一份配置快照）
         print("🔍 正在执行检查...")
-        engine.register_checker(StructureChecker())
-        engine.register_checker(ImageChecker())
-        engine.register_checker(AlignmentChecker())
+        snapshot = ConfigLoader().snapshot()
+        engine.register_checker(StructureChecker(snapshot=snapshot))
+        engine.register_checker(ImageChecker(snapshot=snapshot))
+        engine.register_checker(AlignmentChecker(snapshot=snapshot))
         
-        # 5. 执行检查
-        results = engine.run_checks(document)
+        # 5. 执行检查，结果产生后立即写入JSON报告
+        with JSONReportWriter(args.json, compact=args.compact) as json_writer:
+            json_writer.begin(report)
         
-        # 6. 添加结果到报告
-        for result in results:
-            report.add_result(result)
+            # 6. 添加结果到报告
+            for result in engine.iter_checks(document):
+                report.add_result(result)
+                json_writer.write_result(result)
         
-        print(f"   ✓ 完成检查，共{len(results)}项结果")
+            json_writer.finish(report)
+        
+        print(f"   ✓ 完成检查，共{report.total_checks}项结果")
         print()
         
         # 7. 打印摘要
@@ -92,15 +102,12 @@ def main():
         print("\n📄 正在生成报告...")
         
         # JSON报告
-        import json
-        with open(args.json, 'w', encoding='utf-8') as f:
-            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
         print(f"   ✓ JSON报告: {Path(args.json).absolute()}")
         
         # PDF报告
         if not args.no_pdf:
             try:
-                pdf_gen = PDFReportGenerator()
+                pdf_gen = PDFReportGenerator(snapshot=snapshot)
                 pdf_gen.generate(report, args.output)
                 print(f"   ✓ PDF报告: {Path(args.output).absolute()}")
             except Exception as e:
@@ -0,0 +1,187 @@
+"""
+中文字体管理
+每个进程只查找并注册一次中文字体，查找结果缓存在磁盘字体索引中
+"""
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+
+FONT_NAME = 'ChineseFont'
+FALLBACK_FONT = 'Helvetica'
+
+# macOS系统字体（按优先级）
+MACOS_FONT_PATHS = [
+    '/System/Library/Fonts/STHeiti Light.ttc',  # 华文黑体
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+    '/System/Library/Fonts/PingFang.ttc',  # 苹方
+    '/System/Library/Fonts/Supplemental/Songti.ttc',  # 宋体
+]
+
+# Windows系统字体（按优先级）
+WINDOWS_FONT_PATHS = [
+    'C:/Windows/Fonts/simhei.ttf',  # 黑体
+    'C:/Windows/Fonts/msyh.ttc',  # 微软雅黑
+    'C:/Windows/Fonts/simsun.ttc',  # 宋体
+]
+
+# Linux字体目录
+LINUX_FONT_DIRS = [
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    '~/.local/share/fonts',
+    '~/.fonts',
+]
+
+# Linux常见中文字体文件名（按优先级，仅TrueType轮廓；reportlab不支持OTF/CFF字体）
+LINUX_FONT_FILES = [
+    'wqy-microhei.ttc',  # 文泉驿微米黑
+    'wqy-zenhei.ttc',  # 文泉驿正黑
+    'DroidSansFallbackFull.ttf',
+    'DroidSansFallback.ttf',
+    'uming.ttc',  # AR PL UMing
+    'ukai.ttc',  # AR PL UKai
+    'simhei.ttf',
+    'simsun.ttc',
+    'msyh.ttc',
+]
+
+
+class FontManager:
+    """中文字体管理器"""
+    
+    def __init__(
+        self,
+        index_path: Optional[Path] = None,
+        font_dirs: Optional[List[str]] = None,
+        font_files: Optional[List[str]] = None,
+        font_paths: Optional[List[str]] = None
+    ):
+        """
+        初始化字体管理器
+        
+        Args:
+            index_path: 字体索引文件路径，默认 ~/.patentcheck/font_index.json
+            font_dirs: 递归搜索的字体目录，默认按平台选择
+            font_files: 在字体目录中查找的字体文件名（按优先级）
+            font_paths: 直接尝试的字体文件路径（按优先级），默认按平台选择
+        """
+        self.index_path = index_path or Path.home() / ".patentcheck" / "font_index.json"
+        
+        if sys.platform == 'darwin':
+            default_paths, default_dirs = MACOS_FONT_PATHS, ['/Library/Fonts', '~/Library/Fonts']
+        elif sys.platform.startswith('win'):
+            default_paths, default_dirs = WINDOWS_FONT_PATHS, []
+        else:
+            default_paths, default_dirs = [], LINUX_FONT_DIRS
+        
+        self.font_paths = default_paths if font_paths is None else font_paths
+        self.font_dirs = default_dirs if font_dirs is None else font_dirs
+        self.font_files = LINUX_FONT_FILES if font_files is None else font_files
+        
+        self._font_name = None
+        self._lock = threading.Lock()
+    
+    def get_font_name(self) -> str:
+        """
+        获取可用于PDF的中文字体名称（首次调用时注册字体）
+        
+        Returns:
+            已注册的中文字体名称，未找到时返回Helvetica
+        """
+        if self._font_name is None:
+            with self._lock:
+                if self._font_name is None:
+                    self._font_name = self._resolve()
+        return self._font_name
+    
+    def _resolve(self) -> str:
+        """按 字体索引 -> 字体查找 的顺序注册中文字体"""
+        indexed = self._load_index()
+        if indexed and self._register(indexed):
+            return FONT_NAME
+        
+        for font_path in self._discover():
+            if font_path == indexed:
+                continue
+            if self._register(font_path):
+                self._save_index(font_path)
+                print(f"✓ 成功注册中文字体: {font_path}")
+                return FONT_NAME
+        
+        print("⚠️  未找到中文字体，PDF可能无法正确显示中文")
+        return FALLBACK_FONT
+    
+    def _discover(self):
+        """按优先级产出候选字体文件路径"""
+        for font_path in self.font_paths:
+            if os.path.isfile(font_path):
+                yield font_path
+        
+        if not self.font_dirs or not self.font_files:
+            return
+        
+        # 一次遍历字体目录，按文件名优先级排序
+        priority = {name.lower(): i for i, name in enumerate(self.font_files)}
+        found = []
+        for font_dir in self.font_dirs:
+            font_dir = os.path.expanduser(font_dir)
+            for root, _, files in os.walk(font_dir):
+                for name in files:
+                    rank = priority.get(name.lower())
+                    if rank is not None:
+                        found.append((rank, os.path.join(root, name)))
+        
+        for _, font_path in sorted(found):
+            yield font_path
+    
+    @staticmethod
+    def _register(font_path: str) -> bool:
+        """注册字体，失败返回False"""
+        try:
+            pdfmetrics.registerFont(TTFont(FONT_NAME, font_path))
+            return True
+        except Exception:
+            return False
+    
+    def _load_index(self) -> Optional[str]:
+        """读取字体索引，字体文件已变化时视为无效"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            font_path = index['font_path']
+            stat = os.stat(font_path)
+            if stat.st_size == index['size'] and int(stat.st_mtime) == index['mtime']:
+                return font_path
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+    
+    def _save_index(self, font_path: str):
+        """保存字体索引"""
+        try:
+            stat = os.stat(font_path)
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'font_path': font_path,
+                    'size': stat.st_size,
+                    'mtime': int(stat.st_mtime)
+                }, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"保存字体索引失败: {e}")
+
+
+# 进程级字体管理器
+font_manager = FontManager()
+
+
+def get_chinese_font() -> str:
+    """获取已注册的中文字体名称（每个进程只注册一次）"""
+    return font_manager.get_font_name()
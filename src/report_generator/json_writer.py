@@ -0,0 +1,126 @@
+"""
+流式JSON报告写入器
+检查结果产生后立即写入文件，不在内存中构建完整的报告字典
+"""
+import json
+
+from ..core.models import CheckReport, CheckResult
+
+
+class JSONReportWriter:
+    """
+    流式JSON报告写入器
+    
+    输出与 json.dump(report.to_dict(), indent=2) 等价的JSON文档（键顺序不同：
+    results在前，summary等统计字段在结束时写入）。紧凑模式下不缩进，每个检查
+    结果单独一行，便于批量任务运行时用 tail -f 查看进度。
+    """
+    
+    def __init__(self, output_path: str, compact: bool = False):
+        """
+        打开输出文件
+        
+        Args:
+            output_path: 输出文件路径
+            compact: 是否使用紧凑格式
+        """
+        self.output_path = output_path
+        self.compact = compact
+        self._file = open(output_path, 'w', encoding='utf-8')
+        self._count = 0
+        
+        if compact:
+            self._dump_kwargs = {'ensure_ascii': False, 'separators': (',', ':')}
+        else:
+            self._dump_kwargs = {'ensure_ascii': False, 'indent': 2}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def begin(self, report: CheckReport):
+        """
+        写入报告头部
+        
+        Args:
+            report: 检测报告（只使用生成时间）
+        """
+        timestamp = self._dumps(report.timestamp.isoformat())
+        if self.compact:
+            self._file.write(f'{{"timestamp":{timestamp},"results":[')
+        else:
+            self._file.write(f'{{\n  "timestamp": {timestamp},\n  "results": [')
+        self._file.flush()
+    
+    def write_result(self, result: CheckResult):
+        """
+        追加一个检查结果并立即刷新到磁盘
+        
+        Args:
+            result: 检查结果
+        """
+        separator = ',' if self._count else ''
+        if self.compact:
+            self._file.write(f'{separator}\n{self._dumps(result.to_dict())}')
+        else:
+            self._file.write(f'{separator}\n    {self._dumps(result.to_dict(), indent=4)}')
+        self._count += 1
+        self._file.flush()
+    
+    def finish(self, report: CheckReport):
+        """
+        写入统计摘要和AI审查结果，结束JSON文档并关闭文件
+        
+        Args:
+            report: 检测报告（统计信息应已包含全部结果）
+        """
+        tail = {
+            'summary': report.get_summary(),
+            'ai_review_result': report.ai_review_result,
+            'ai_review_prompt': report.ai_review_prompt
+        }
+        
+        if self.compact:
+            closing = '\n]' if self._count else ']'
+            fields = ''.join(f',{self._dumps(k)}:{self._dumps(v)}' for k, v in tail.items())
+        else:
+            closing = '\n  ]' if self._count else ']'
+            fields = ''.join(f',\n  {self._dumps(k)}: {self._dumps(v, indent=2)}' for k, v in tail.items())
+        
+        self._file.write(f'{closing}{fields}' + ('}' if self.compact else '\n}'))
+        self.close()
+    
+    def close(self):
+        """关闭文件（未调用finish时文件内容不完整）"""
+        if not self._file.closed:
+            self._file.close()
+    
+    @property
+    def result_count(self) -> int:
+        """已写入的检查结果数量"""
+        return self._count
+    
+    def _dumps(self, value, indent: int = 0) -> str:
+        """序列化单个值，缩进模式下嵌套行整体右移indent个空格"""
+        text = json.dumps(value, **self._dump_kwargs)
+        if indent and not self.compact:
+            text = text.replace('\n', '\n' + ' ' * indent)
+        return text
+
+
+def write_report_json(report: CheckReport, output_path: str, compact: bool = False):
+    """
+    将已完成的检测报告流式写入JSON文件
+    
+    Args:
+        report: 检测报告
+        output_path: 输出文件路径
+        compact: 是否使用紧凑格式
+    """
+    with JSONReportWriter(output_path, compact=compact) as writer:
+        writer.begin(report)
+        for result in report.results:
+            writer.write_result(result)
+        writer.finish(report)
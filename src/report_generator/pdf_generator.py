@@ -1,44 +1,97 @@
 """
 PDF报告生成器
 """
+from typing import Dict, List, Mapping, Optional
+from xml.sax.saxutils import escape
+
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.units import cm
-from datetime import datetime
 
-from ..core.models import CheckReport, Severity
+from ..core.config_loader import ConfigLoader
+from ..core.config_snapshot import ConfigSnapshot
+from ..core.models import CheckCategory, CheckReport, CheckResult, Severity
+from .fonts import get_chinese_font
+
+
+# 检查类别显示名称（按报告中的分组顺序）
+CATEGORY_NAMES = {
+    CheckCategory.STRUCTURE: '说明书结构',
+    CheckCategory.IMAGE_FORMAT: '附图形式',
+    CheckCategory.MARKER: '标号检测',
+    CheckCategory.ALIGNMENT: '图文对齐',
+    CheckCategory.ABSTRACT: '摘要附图',
+    CheckCategory.AI_REVIEW: 'AI审查',
+}
+
+SEVERITY_LABELS = {
+    Severity.ERROR: '[ERROR]',
+    Severity.WARNING: '[WARNING]',
+    Severity.INFO: '[INFO]',
+    Severity.PASS: '[PASS]'
+}
+
+SEVERITY_ORDER = [Severity.ERROR, Severity.WARNING, Severity.INFO, Severity.PASS]
 
 
 class PDFReportGenerator:
     """PDF报告生成器"""
     
-    def __init__(self):
-        # 注册中文字体（macOS系统）
-        self.chinese_font = 'Helvetica'  # 默认字体
-        
-        # 尝试多个中文字体路径
-        font_paths = [
-            '/System/Library/Fonts/STHeiti Light.ttc',  # 华文黑体
-            '/System/Library/Fonts/STHeiti Medium.ttc',
-            '/System/Library/Fonts/PingFang.ttc',  # 苹方
-            '/System/Library/Fonts/Supplemental/Songti.ttc',  # 宋体
-        ]
+    # 每个表格的最大行数：表格跨页拆分时会重新测量剩余行，分块后构建时间随结果数线性增长
+    ROWS_PER_TABLE = 100
+    
+    # 详细结果表格列宽（序号、级别、内容、位置），合计为A4可用宽度17cm
+    RESULT_COL_WIDTHS = [1.2*cm, 2.3*cm, 9.5*cm, 4*cm]
+    
+    def __init__(self, output_config: Optional[Dict] = None, snapshot: Optional[ConfigSnapshot] = None):
+        """
+        初始化报告生成器
+        
+        Args:
+            output_config: 报告输出选项，覆盖规则配置中的report_rules.output
+            snapshot: 配置快照，默认使用当前加载的配置
+        """
+        # 中文字体每个进程只查找、注册一次
+        self.chinese_font = get_chinese_font()
         
-        for font_path in font_paths:
+        rules = (snapshot or ConfigLoader().snapshot()).report
+        output_config = output_config or {}
+        self.include_summary = output_config.get('include_summary', rules.include_summary)
+        self.include_statistics = output_config.get('include_statistics', rules.include_statistics)
+        self.group_by_category = output_config.get('group_by_category', rules.group_by_category)
+        
+        self.severity_colors = self._load_severity_colors(rules.severity_colors)
+        self.styles = self._build_styles()
+    
+    def _load_severity_colors(self, severity_colors: Mapping[str, str]) -> Dict[Severity, colors.Color]:
+        """读取各错误级别的显示颜色"""
+        result = {}
+        for severity in Severity:
+            value = severity_colors.get(severity.value)
             try:
-                pdfmetrics.registerFont(TTFont('ChineseFont', font_path))
-                self.chinese_font = 'ChineseFont'
-                print(f"✓ 成功注册中文字体: {font_path}")
-                break
-            except Exception as e:
-                continue
-        
-        if self.chinese_font == 'Helvetica':
-            print("⚠️  未找到中文字体，PDF可能无法正确显示中文")
+                result[severity] = colors.HexColor(value) if value else colors.black
+            except ValueError:
+                result[severity] = colors.black
+        return result
+    
+    def _build_styles(self) -> Dict[str, ParagraphStyle]:
+        """预先构建报告中共用的段落样式"""
+        sample = getSampleStyleSheet()
+        font = self.chinese_font
+        bold_font = 'Helvetica-Bold' if font == 'Helvetica' else font
+        
+        return {
+            'title': ParagraphStyle('ReportTitle', parent=sample['Title'], fontName=font),
+            'heading': ParagraphStyle('ReportHeading', parent=sample['Heading2'], fontName=font),
+            'normal': ParagraphStyle('ReportNormal', parent=sample['Normal'], fontName=font),
+            'cell': ParagraphStyle('ReportCell', parent=sample['Normal'], fontName=font, fontSize=9, leading=12),
+            'header': ParagraphStyle(
+                'ReportHeader', parent=sample['Normal'], fontName=bold_font,
+                fontSize=10, leading=13, textColor=colors.whitesmoke
+            ),
+        }
     
     def generate(self, report: CheckReport, output_path: str):
         """
@@ -57,104 +110,83 @@ class PDFReportGenerator:
             bottomMargin=2*cm
         )
         
-        # 构建文档内容
-        story = []
-        styles = getSampleStyleSheet()
+        doc.build(self.build_story(report))
+    
+    def build_story(self, report: CheckReport) -> list:
+        """
+        构建报告内容
         
-        # 创建中文样式
-        if self.chinese_font != 'Helvetica':
-            # 修改所有样式使用中文字体
-            for style_name in styles.byName:
-                styles[style_name].fontName = self.chinese_font
+        Args:
+            report: 检测报告对象
+            
+        Returns:
+            reportlab流式元素列表
+        """
+        styles = self.styles
+        story = []
         
         # 标题
-        title = Paragraph(
-            "<b>专利申请自检报告</b>",
-            styles['Title']
-        )
-        story.append(title)
+        story.append(Paragraph("<b>专利申请自检报告</b>", styles['title']))
         story.append(Spacer(1, 0.5*cm))
         
         # 基本信息
+        spec_path = escape(report.document.specification_path or '未指定')
         info_text = f"""
         生成时间: {report.timestamp.strftime('%Y-%m-%d %H:%M:%S')}<br/>
-        检测文件: {report.document.specification_path or '未指定'}
+        检测文件: {spec_path}
         """
-        story.append(Paragraph(info_text, styles['Normal']))
+        story.append(Paragraph(info_text, styles['normal']))
         story.append(Spacer(1, 0.5*cm))
         
         # 摘要统计
-        summary = report.get_summary()
-        summary_data = [
-            ['统计项', '数量'],
-            ['总检查项', str(summary['total'])],
-            ['严重错误', str(summary['errors'])],
-            ['警告', str(summary['warnings'])],
-            ['提示', str(summary['infos'])],
-            ['通过', str(summary['passes'])]
-        ]
+        if self.include_summary:
+            story.append(self._summary_table(report))
+            story.append(Spacer(1, 1*cm))
         
-        summary_table = Table(summary_data, colWidths=[8*cm, 4*cm])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(summary_table)
-        story.append(Spacer(1, 1*cm))
+        # 分类统计
+        if self.include_statistics and report.results:
+            story.append(Paragraph("<b>分类统计</b>", styles['heading']))
+            story.append(Spacer(1, 0.3*cm))
+            story.append(self._statistics_table(report))
+            story.append(Spacer(1, 1*cm))
         
         # 详细结果
-        story.append(Paragraph("<b>检测详情</b>", styles['Heading2']))
+        story.append(Paragraph("<b>检测详情</b>", styles['heading']))
         story.append(Spacer(1, 0.3*cm))
         
-        for i, result in enumerate(report.results, 1):
-            # 错误级别图标
-            severity_icon = {
-                Severity.ERROR: '[ERROR]',
-                Severity.WARNING: '[WARNING]',
-                Severity.INFO: '[INFO]',
-                Severity.PASS: '[PASS]'
-            }
-            
-            result_text = f"""
-            <b>{i}. {severity_icon[result.severity]} {result.title}</b><br/>
-            位置: {result.location}<br/>
-            描述: {result.description}<br/>
-            """
-            
-            if result.suggestion:
-                result_text += f"建议: {result.suggestion}<br/>"
-            if result.reference:
-                result_text += f"参考: {result.reference}<br/>"
+        if self.group_by_category:
+            groups: Dict[CheckCategory, List[CheckResult]] = {}
+            for result in report.results:
+                groups.setdefault(result.category, []).append(result)
             
-            story.append(Paragraph(result_text, styles['Normal']))
-            story.append(Spacer(1, 0.3*cm))
+            for category in CheckCategory:
+                results = groups.get(category)
+                if not results:
+                    continue
+                title = f"<b>{CATEGORY_NAMES[category]}</b>（{len(results)}项）"
+                story.append(Paragraph(title, styles['normal']))
+                story.append(Spacer(1, 0.2*cm))
+                story.extend(self._result_tables(results))
+                story.append(Spacer(1, 0.5*cm))
+        else:
+            story.extend(self._result_tables(report.results))
         
         # AI审查结果
         if report.ai_review_result:
             story.append(Spacer(1, 1*cm))
-            story.append(Paragraph("<b>AI审查结果</b>", styles['Heading2']))
+            story.append(Paragraph("<b>AI审查结果</b>", styles['heading']))
             story.append(Spacer(1, 0.3*cm))
             
             # 显示使用的提示词
             if report.ai_review_prompt:
-                prompt_text = f"<b>审查提示词:</b> {report.ai_review_prompt}<br/>"
-                story.append(Paragraph(prompt_text, styles['Normal']))
+                prompt_text = f"<b>审查提示词:</b> {escape(report.ai_review_prompt)}<br/>"
+                story.append(Paragraph(prompt_text, styles['normal']))
                 story.append(Spacer(1, 0.2*cm))
             
-            # 格式化AI审查结果，将换行符转换为<br/>
-            ai_result_text = report.ai_review_result.replace('\n', '<br/>')
-            # 简单转义HTML特殊字符
-            ai_result_text = ai_result_text.replace('<', '&lt;').replace('>', '&gt;')
-            # 再把<br/>恢复
-            ai_result_text = ai_result_text.replace('&lt;br/&gt;', '<br/>')
+            # 转义特殊字符后将换行符转换为<br/>
+            ai_result_text = escape(report.ai_review_result).replace('\n', '<br/>')
             
-            story.append(Paragraph(ai_result_text, styles['Normal']))
+            story.append(Paragraph(ai_result_text, styles['normal']))
             story.append(Spacer(1, 0.5*cm))
         
         # 免责声明
@@ -165,7 +197,106 @@ class PDFReportGenerator:
         最终审查以国家知识产权局的正式审查为准。
         """
         story.append(Spacer(1, 1*cm))
-        story.append(Paragraph(disclaimer, styles['Normal']))
+        story.append(Paragraph(disclaimer, styles['normal']))
+        
+        return story
+    
+    def _summary_table(self, report: CheckReport) -> Table:
+        """构建摘要统计表"""
+        summary = report.get_summary()
+        summary_data = [
+            ['统计项', '数量'],
+            ['总检查项', str(summary['total'])],
+            ['严重错误', str(summary['errors'])],
+            ['警告', str(summary['warnings'])],
+            ['提示', str(summary['infos'])],
+            ['通过', str(summary['passes'])]
+        ]
+        
+        summary_table = Table(summary_data, colWidths=[8*cm, 4*cm])
+        summary_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), self.chinese_font),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        return summary_table
+    
+    def _statistics_table(self, report: CheckReport) -> Table:
+        """构建 类别 x 错误级别 统计表"""
+        data = [['检查类别'] + [SEVERITY_LABELS[s] for s in SEVERITY_ORDER] + ['合计']]
+        for category, counts in report.table.category_counts().items():
+            row = [counts[s] for s in SEVERITY_ORDER]
+            data.append([CATEGORY_NAMES[category]] + [str(n) for n in row] + [str(sum(row))])
+        
+        table = Table(data, colWidths=[4*cm] + [2.4*cm] * len(SEVERITY_ORDER) + [2*cm], repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), self.chinese_font),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+        ]))
+        return table
+    
+    def _result_tables(self, results: List[CheckResult]) -> List[Table]:
+        """
+        将检查结果构建为分块表格
         
-        # 生成PDF
-        doc.build(story)
+        Args:
+            results: 检查结果列表
+            
+        Returns:
+            表格列表（每个表格最多ROWS_PER_TABLE行，表头在跨页时重复）
+        """
+        header_style = self.styles['header']
+        header = [
+            Paragraph('序号', header_style),
+            Paragraph('级别', header_style),
+            Paragraph('检查内容', header_style),
+            Paragraph('位置', header_style),
+        ]
+        
+        tables = []
+        for offset in range(0, len(results), self.ROWS_PER_TABLE):
+            chunk = results[offset:offset + self.ROWS_PER_TABLE]
+            rows = [header]
+            commands = [
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('FONTNAME', (0, 0), (-1, -1), self.chinese_font),
+                ('FONTSIZE', (0, 1), (1, -1), 9),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ]
+            
+            for row, result in enumerate(chunk, 1):
+                rows.append(self._result_row(offset + row, result))
+                commands.append(('TEXTCOLOR', (1, row), (1, row), self.severity_colors[result.severity]))
+            
+            table = Table(rows, colWidths=self.RESULT_COL_WIDTHS, repeatRows=1)
+            table.setStyle(TableStyle(commands))
+            tables.append(table)
+        
+        return tables
+    
+    def _result_row(self, index: int, result: CheckResult) -> list:
+        """构建单个检查结果的表格行"""
+        cell_style = self.styles['cell']
+        
+        content = f"<b>{escape(result.title)}</b><br/>{escape(result.description)}"
+        if result.suggestion:
+            content += f"<br/>建议: {escape(result.suggestion)}"
+        if result.reference:
+            content += f"<br/>参考: {escape(result.reference)}"
+        
+        return [
+            str(index),
+            SEVERITY_LABELS[result.severity],
+            Paragraph(content, cell_style),
+            Paragraph(escape(result.location or ''), cell_style),
+        ]
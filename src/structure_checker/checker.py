@@ -1,27 +1,28 @@
 """
 说明书结构检查器
 """
-from typing import List
-from docx import Document
+from typing import Iterator, List, Optional
 
+from ..core.config_snapshot import ConfigSnapshot
 from ..core.models import CheckResult, PatentDocument, CheckCategory, Severity
 from ..core.rule_engine import BaseChecker
+from .section_locator import SectionLocator
 
 
 class StructureChecker(BaseChecker):
     """说明书结构检查器"""
     
-    # 必需章节
-    REQUIRED_SECTIONS = [
-        '技术领域',
-        '背景技术',
-        '发明内容',
-        '附图说明',
-        '具体实施方式'
-    ]
+    SECTIONS = ('structure_rules',)
     
-    def __init__(self, config: dict = None):
-        super().__init__(config or {'enabled': True})
+    def __init__(self, config: dict = None, snapshot: Optional[ConfigSnapshot] = None):
+        super().__init__(config, snapshot)
+        
+        # config中的同名选项优先于规则配置
+        rules = self.snapshot.structure
+        self.required_sections = list(self.config.get('required_sections', rules.required_sections))
+        self.optional_sections = list(self.config.get('optional_sections', rules.optional_sections))
+        self.section_order_strict = self.config.get('section_order_strict', rules.section_order_strict)
+        self.locator = SectionLocator(self.required_sections, self.optional_sections)
     
     def check(self, document: PatentDocument) -> List[CheckResult]:
         """检查说明书结构"""
@@ -40,25 +41,26 @@ class StructureChecker(BaseChecker):
             return results
         
         try:
-            from ..file_parser.parser import FileParser
+            # 单次扫描定位所有章节，全部章节找到后即停止读取文档
+            scan = self.locator.begin()
+            paragraphs = self._iter_paragraphs(document.specification_path)
+            total = None
+            try:
+                for para in paragraphs:
+                    scan.feed(para)
+                    if scan.complete:
+                        break
+                else:
+                    total = scan.index
+            finally:
+                paragraphs.close()
             
-            # 根据文件类型加载文档
-            if document.specification_path.lower().endswith('.pdf'):
-                # 加载PDF文档
-                text = FileParser.extract_pdf_text(document.specification_path, use_ocr=True)
-                # 将文本按行分割
-                paragraphs = [line.strip() for line in text.split('\n') if line.strip()]
-            else:
-                # 加载Word文档
-                doc = FileParser.load_word_document(document.specification_path)
-                # 提取所有段落标题
-                paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
+            sections = scan.finish(total=total)
+            document.sections = sections
+            spans = {name: span.to_dict() for name, span in sections.items()}
             
             # 检查必需章节
-            missing_sections = []
-            for section in self.REQUIRED_SECTIONS:
-                if not self._section_exists(section, paragraphs):
-                    missing_sections.append(section)
+            missing_sections = [s for s in self.required_sections if s not in sections]
             
             if missing_sections:
                 results.append(CheckResult(
@@ -70,18 +72,36 @@ class StructureChecker(BaseChecker):
                     location=document.specification_path,
                     suggestion=f"请在说明书中添加：{', '.join(missing_sections)}",
                     reference="专利法实施细则第18条",
-                    details={'missing': missing_sections}
+                    details={'missing': missing_sections, 'sections': spans}
                 ))
             else:
+                optional_found = [s for s in self.optional_sections if s in sections]
                 results.append(CheckResult(
                     rule_id="S002",
                     category=CheckCategory.STRUCTURE,
                     severity=Severity.PASS,
                     title="说明书结构完整",
                     description="说明书包含所有必需章节",
-                    location=document.specification_path
+                    location=document.specification_path,
+                    details={'sections': spans, 'optional_found': optional_found}
                 ))
             
+            # 检查章节顺序
+            violations = self.locator.find_order_violations(sections)
+            if violations:
+                pairs = [f"{earlier}应位于{later}之前" for earlier, later in violations]
+                results.append(CheckResult(
+                    rule_id="S004",
+                    category=CheckCategory.STRUCTURE,
+                    severity=Severity.ERROR if self.section_order_strict else Severity.INFO,
+                    title="章节顺序不规范",
+                    description=f"章节顺序与要求不一致：{'；'.join(pairs)}",
+                    location=document.specification_path,
+                    suggestion=f"建议按以下顺序排列：{' → '.join(self.required_sections)}",
+                    reference="专利法实施细则第18条",
+                    details={'violations': violations, 'sections': spans}
+                ))
+        
         except Exception as e:
             results.append(CheckResult(
                 rule_id="S003",
@@ -94,11 +114,24 @@ class StructureChecker(BaseChecker):
             ))
         
         return results
-    
-    def _section_exists(self, section: str, paragraphs: List[str]) -> bool:
-        """检查章节是否存在"""
-        for para in paragraphs:
-            # 简单的关键词匹配
-            if section in para and len(para) < 50:  # 标题通常较短
-                return True
-        return False
+
+    def _iter_paragraphs(self, spec_path: str) -> Iterator[str]:
+        """
+        逐个产出说明书的非空段落（PDF按行切分）
+        
+        Args:
+            spec_path: 说明书路径
+        """
+        from ..file_parser.parser import FileParser
+        
+        if spec_path.lower().endswith('.pdf'):
+            # 逐页读取PDF文档
+            for page in FileParser.iter_pdf_pages(spec_path, use_ocr=True):
+                for line in page.text.split('\n'):
+                    if line.strip():
+                        yield line.strip()
+        else:
+            # 流式读取Word文档段落
+            for text in FileParser.iter_word_paragraphs(spec_path):
+                if text.strip():
+                    yield text.strip()
@@ -0,0 +1,183 @@
+"""
+说明书章节定位器
+基于Aho-Corasick多模式匹配，一次扫描即可定位全部必需/可选章节
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..core.models import SectionSpan
+
+
+class SectionLocator:
+    """章节定位器（Aho-Corasick自动机）"""
+    
+    # 标题通常较短，超过该长度的段落不视为章节标题
+    MAX_HEADING_LENGTH = 50
+    
+    def __init__(self, required_sections: List[str], optional_sections: Optional[List[str]] = None):
+        """
+        初始化章节定位器
+        
+        Args:
+            required_sections: 必需章节列表（顺序即期望的章节顺序）
+            optional_sections: 可选章节列表
+        """
+        self.required_sections = list(required_sections)
+        self.optional_sections = [s for s in (optional_sections or []) if s not in self.required_sections]
+        self.patterns = self.required_sections + self.optional_sections
+        
+        # 自动机：goto表、失败指针、输出（模式序号列表）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._build()
+    
+    def _build(self):
+        """构建Aho-Corasick自动机"""
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append(pattern_id)
+        
+        # 广度优先计算失败指针
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+    
+    def match(self, text: str) -> List[int]:
+        """
+        返回文本中命中的模式序号（按出现顺序，可能重复）
+        
+        Args:
+            text: 待匹配文本
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        hits = []
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                hits.extend(output[state])
+        return hits
+    
+    def begin(self) -> 'SectionScan':
+        """开始一次增量扫描"""
+        return SectionScan(self)
+    
+    def locate(self, paragraphs: Iterable[str]) -> Dict[str, SectionSpan]:
+        """
+        单次扫描定位所有章节
+        
+        Args:
+            paragraphs: 段落文本序列
+        
+        Returns:
+            章节名称 -> 章节位置
+        """
+        scan = self.begin()
+        for para in paragraphs:
+            scan.feed(para)
+        return scan.finish(total=scan.index)
+    
+    def find_order_violations(self, sections: Dict[str, SectionSpan]) -> List[Tuple[str, str]]:
+        """
+        检查必需章节顺序
+        
+        Args:
+            sections: 定位结果
+        
+        Returns:
+            顺序颠倒的章节对列表 [(应在前的章节, 实际在前的章节)]
+        """
+        found = [s for s in self.required_sections if s in sections]
+        violations = []
+        for i, earlier in enumerate(found):
+            for later in found[i + 1:]:
+                if sections[later].start < sections[earlier].start:
+                    violations.append((earlier, later))
+        return violations
+
+
+class SectionScan:
+    """一次增量章节扫描的状态"""
+    
+    def __init__(self, locator: SectionLocator):
+        self.locator = locator
+        self.index = 0
+        self._found: Dict[str, Tuple[int, str]] = {}
+    
+    @property
+    def complete(self) -> bool:
+        """所有必需和可选章节是否都已找到"""
+        return len(self._found) == len(self.locator.patterns)
+    
+    @property
+    def required_complete(self) -> bool:
+        """所有必需章节是否都已找到"""
+        return all(s in self._found for s in self.locator.required_sections)
+    
+    def feed(self, paragraph: str):
+        """
+        输入下一个段落
+        
+        Args:
+            paragraph: 段落文本（已去除首尾空白）
+        """
+        index = self.index
+        self.index += 1
+        
+        if not paragraph or len(paragraph) >= self.locator.MAX_HEADING_LENGTH:
+            return
+        
+        hits = self.locator.match(paragraph)
+        if not hits:
+            return
+        
+        # 同一标题命中多个模式时取最长的尚未找到的章节
+        patterns = self.locator.patterns
+        candidates = [patterns[h] for h in set(hits) if patterns[h] not in self._found]
+        if candidates:
+            name = max(candidates, key=len)
+            self._found[name] = (index, paragraph)
+    
+    def finish(self, total: Optional[int] = None) -> Dict[str, SectionSpan]:
+        """
+        结束扫描，生成章节区间
+        
+        Args:
+            total: 段落总数；提前结束扫描时传None，最后一个章节延续至文末
+        
+        Returns:
+            章节名称 -> 章节位置（按出现顺序）
+        """
+        required = set(self.locator.required_sections)
+        ordered = sorted(self._found.items(), key=lambda item: item[1][0])
+        
+        sections = {}
+        for i, (name, (start, heading)) in enumerate(ordered):
+            end = ordered[i + 1][1][0] if i + 1 < len(ordered) else total
+            sections[name] = SectionSpan(
+                name=name,
+                start=start,
+                end=end,
+                required=name in required,
+                heading=heading
+            )
+        return sections
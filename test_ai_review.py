@@ -9,7 +9,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from src.ai_reviewer.reviewer import AIReviewer
-from src.ai_reviewer.deepseek_client import DeepSeekClient
+from src.ai_reviewer.deepseek_client import get_shared_client
 
 
 def test_api_connection():
@@ -19,7 +19,7 @@ def test_api_connection():
     print("=" * 60)
     
     try:
-        client = DeepSeekClient()
+        client = get_shared_client()
         print("✓ DeepSeek客户端初始化成功")
         
         # 测试连接
@@ -58,7 +58,7 @@ def test_simple_review():
     print("=" * 60)
     
     try:
-        client = DeepSeekClient()
+        client = get_shared_client()
         
         # 测试简单对话
         print("发送测试消息: '你好，请简短介绍一下你自己'")
@@ -0,0 +1,561 @@
+"""
+AI审查模块测试
+"""
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import openai
+
+from src.ai_reviewer.async_batch import AsyncBatchReviewer, TokenBucket
+from src.ai_reviewer.chunked_review import ChunkedReviewer
+from benchmarks.mock_llm_server import MockBehavior, MockLLMServer
+from src.ai_reviewer import deepseek_client
+from src.ai_reviewer.deepseek_client import DeepSeekClient, TokenUsage, coalesce_deltas, get_shared_client
+from src.ai_reviewer.response_cache import ResponseCache
+from src.ai_reviewer.reviewer import AIReviewer
+from src.ai_reviewer.text_cleaner import clean_pdf_pages
+from src.ai_reviewer.token_budget import TokenBudget, estimate_tokens
+
+
+def make_chunk(content):
+    """构造流式响应块"""
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class TestStreaming(unittest.TestCase):
+    """测试流式审查输出"""
+    
+    def setUp(self):
+        self.client = DeepSeekClient(api_key="test-key")
+        self.create = mock.Mock()
+        self.client.client = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        )
+    
+    def test_stream_chat_completion(self):
+        """测试产出非空文本增量"""
+        self.create.return_value = iter([
+            make_chunk("说明书"), SimpleNamespace(choices=[]), make_chunk(None), make_chunk("结构完整")
+        ])
+        
+        deltas = list(self.client.stream_review_with_prompt("正文", "请审查"))
+        
+        self.assertEqual(deltas, ["说明书", "结构完整"])
+        kwargs = self.create.call_args.kwargs
+        self.assertTrue(kwargs["stream"])
+        self.assertEqual([m["role"] for m in kwargs["messages"]], ["system", "user"])
+    
+    def test_stream_error(self):
+        """测试流中断时抛出异常"""
+        def broken_stream():
+            yield make_chunk("部分")
+            raise ConnectionError("连接中断")
+        
+        self.create.return_value = broken_stream()
+        
+        with self.assertRaisesRegex(Exception, "DeepSeek API调用失败"):
+            list(self.client.stream_chat_completion([{"role": "user", "content": "你好"}]))
+    
+    def test_coalesce_deltas(self):
+        """测试首个增量立即产出，其余合并"""
+        deltas = ["a", "b", "c", "d"]
+        
+        batches = list(coalesce_deltas(deltas, interval=60))
+        self.assertEqual(batches, ["a", "bcd"])
+        
+        batches = list(coalesce_deltas(deltas, interval=60, max_chars=2))
+        self.assertEqual(batches, ["a", "bc", "d"])
+        self.assertEqual(list(coalesce_deltas([])), [])
+
+
+class TestResponseCache(unittest.TestCase):
+    """测试AI审查结果缓存"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "ai_cache.db"
+        self.cache = ResponseCache(self.db_path)
+    
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+    
+    def test_key(self):
+        """测试缓存键忽略空白差异，区分提示词和模型参数"""
+        client = SimpleNamespace(base_url=DeepSeekClient.DEFAULT_BASE_URL, model=DeepSeekClient.DEFAULT_MODEL)
+        key = AIReviewer.cache_key("技术领域\n本发明涉及...", "请审查", client)
+        
+        self.assertEqual(key, AIReviewer.cache_key("技术领域  \r\n本发明涉及...\n\n\n", "请审查 ", client))
+        self.assertNotEqual(key, AIReviewer.cache_key("技术领域\n本发明涉及...", "请评估", client))
+        self.assertNotEqual(key, ResponseCache.make_key(
+            "技术领域\n本发明涉及...", "请审查", DeepSeekClient.DEFAULT_BASE_URL, "deepseek-reasoner",
+            DeepSeekClient.DEFAULT_TEMPERATURE, DeepSeekClient.DEFAULT_SYSTEM_PROMPT
+        ))
+    
+    def test_key_per_endpoint(self):
+        """测试不同API地址（如本地模拟服务）和模型的审查结果互不复用"""
+        reviewer = AIReviewer(self.cache)
+        reviewer.client = mock.Mock(base_url="http://127.0.0.1:8000", model=DeepSeekClient.DEFAULT_MODEL)
+        reviewer.client.review_with_prompt.return_value = "模拟意见"
+        
+        with mock.patch.object(AIReviewer, "extract_document_text", return_value="说明书正文"):
+            self.assertEqual(reviewer.review_patent("spec.docx", "请审查"), "模拟意见")
+            
+            reviewer.client = mock.Mock(base_url=DeepSeekClient.DEFAULT_BASE_URL, model=DeepSeekClient.DEFAULT_MODEL)
+            reviewer.client.review_with_prompt.return_value = "审查意见"
+            self.assertEqual(reviewer.review_patent("spec.docx", "请审查"), "审查意见")
+            
+            reviewer.client.model = "deepseek-reasoner"
+            reviewer.client.review_with_prompt.return_value = "推理模型意见"
+            self.assertEqual(reviewer.review_patent("spec.docx", "请审查"), "推理模型意见")
+        
+        self.assertEqual(len(self.cache), 3)
+    
+    def test_persistent(self):
+        """测试结果跨会话保存"""
+        self.cache.put("k1", "审查意见")
+        self.cache.close()
+        
+        self.cache = ResponseCache(self.db_path)
+        self.assertEqual(self.cache.get("k1"), "审查意见")
+        self.assertIsNone(self.cache.get("k2"))
+    
+    def test_eviction(self):
+        """测试过期和容量淘汰"""
+        cache = ResponseCache(self.db_path, max_entries=2)
+        with mock.patch("src.ai_reviewer.response_cache.time.time", side_effect=[100, 200, 250, 300]):
+            cache.put("k1", "a")
+            cache.put("k2", "b")
+            cache.get("k1")  # k2成为最久未使用
+            cache.put("k3", "c")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("k2"))
+        
+        cache.ttl = 0
+        with mock.patch("src.ai_reviewer.response_cache.time.time", return_value=10 ** 10):
+            self.assertIsNone(cache.get("k1"))
+        cache.close()
+    
+    def test_review_patent_cache_hit(self):
+        """测试重复审查直接返回缓存结果"""
+        reviewer = AIReviewer(self.cache)
+        reviewer.client = mock.Mock(base_url=DeepSeekClient.DEFAULT_BASE_URL, model=DeepSeekClient.DEFAULT_MODEL)
+        reviewer.client.review_with_prompt.return_value = "审查意见"
+        
+        with mock.patch.object(AIReviewer, "extract_document_text", return_value="说明书正文"):
+            self.assertEqual(reviewer.review_patent("spec.docx", "请审查"), "审查意见")
+            self.assertEqual(reviewer.review_patent("spec.docx", "请审查"), "审查意见")
+        
+        self.assertEqual(reviewer.client.review_with_prompt.call_count, 1)
+
+
+class FakeReviewClient:
+    """记录调用的模拟客户端"""
+    
+    base_url = "http://fake-review"
+    model = DeepSeekClient.DEFAULT_MODEL
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.reviewed = []
+        self.reduced = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+    
+    def review_with_prompt(self, document_content, review_prompt, system_prompt=None, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.reviewed.append(document_content)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return f"意见{len(document_content)}"
+    
+    def chat_completion(self, messages, **kwargs):
+        self.reduced.append(messages)
+        return "合并意见"
+    
+    def stream_chat_completion(self, messages, **kwargs):
+        self.reduced.append(messages)
+        yield "合并"
+        yield "意见"
+
+
+class TestChunkedReviewer(unittest.TestCase):
+    """测试长文档分段审查"""
+    
+    DOCUMENT = "\n".join([
+        "一种图像处理方法",
+        "技术领域", "本发明涉及图像处理。",
+        "背景技术", "现有技术存在不足。",
+        "发明内容", "本发明提供一种方法。",
+        "附图说明", "图1为流程图。",
+        "具体实施方式"
+    ] + [f"实施例{i}：" + "步骤" * 40 for i in range(60)])
+    
+    def test_split_covers_document(self):
+        """测试按章节切分且不丢失内容"""
+        reviewer = ChunkedReviewer(FakeReviewClient(), max_chunk_chars=2000)
+        chunks = reviewer.split(self.DOCUMENT)
+        
+        self.assertGreater(len(chunks), 2)
+        self.assertTrue(all(len(c.text) <= 2000 for c in chunks))
+        self.assertTrue(chunks[0].title.startswith("开头部分、技术领域"))
+        self.assertIn("具体实施方式（", chunks[-1].title)
+        
+        joined = "".join("".join(c.text.split()) for c in chunks)
+        self.assertEqual(joined, "".join(self.DOCUMENT.split()))
+    
+    def test_map_reduce(self):
+        """测试分段并发审查并合并"""
+        client = FakeReviewClient(delay=0.05)
+        reviewer = ChunkedReviewer(client, max_chunk_chars=2000, max_workers=3)
+        progress = []
+        
+        result = reviewer.review(self.DOCUMENT, "请审查", on_progress=progress.append)
+        
+        chunks = reviewer.split(self.DOCUMENT)
+        self.assertEqual(result, "合并意见")
+        self.assertEqual(len(client.reviewed), len(chunks))
+        self.assertEqual(len(progress), len(chunks))
+        self.assertEqual(client.max_active, 3)
+        reduce_prompt = client.reduced[0][1]["content"]
+        self.assertIn(f"【{chunks[-1].title}】", reduce_prompt)
+        self.assertIn(f"意见{len(chunks[-1].text)}", reduce_prompt)
+    
+    def test_stream_review(self):
+        """测试长文档流式输出合并结果"""
+        client = FakeReviewClient()
+        reviewer = ChunkedReviewer(client, max_chunk_chars=2000)
+        
+        self.assertEqual(list(reviewer.stream_review(self.DOCUMENT, "请审查")), ["合并", "意见"])
+        self.assertEqual(len(client.reduced), 1)
+
+
+def api_error(error_class, status_code):
+    """构造API状态错误"""
+    response = SimpleNamespace(status_code=status_code, headers={"retry-after": "0"}, request=None)
+    return error_class("error", response=response, body=None)
+
+
+class FakeAsyncClient:
+    """按脚本返回结果或抛出错误的异步客户端"""
+    
+    base_url = "http://fake-async"
+    model = DeepSeekClient.DEFAULT_MODEL
+    
+    def __init__(self, script):
+        self.script = script
+        self.active = 0
+        self.max_active = 0
+    
+    async def async_chat_completion(self, messages, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            content = messages[-1]["content"]
+            for name, outcomes in self.script.items():
+                if name in content and outcomes:
+                    outcome = outcomes.pop(0)
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    return outcome
+            return "审查意见"
+        finally:
+            self.active -= 1
+
+
+class TestAsyncBatchReviewer(unittest.TestCase):
+    """测试异步批量审查"""
+    
+    def run_batch(self, client, paths, **kwargs):
+        reviewer = AIReviewer()
+        batch = AsyncBatchReviewer(reviewer, client, **kwargs)
+        batch.BASE_DELAY = 0.01
+        with mock.patch.object(AIReviewer, "extract_document_text", side_effect=lambda path: f"文档{path}"):
+            return asyncio.run(batch.run(paths, "请审查"))
+    
+    def test_retry_and_stats(self):
+        """测试429/5xx退避重试、不可重试错误立即失败"""
+        client = FakeAsyncClient({
+            "文档a": [api_error(openai.RateLimitError, 429), api_error(openai.InternalServerError, 503)],
+            "文档b": [api_error(openai.BadRequestError, 400)]
+        })
+        
+        results = self.run_batch(client, ["a", "b", "c"], requests_per_minute=6000)
+        
+        self.assertTrue(results["a"]["success"])
+        self.assertEqual(results["a"]["retries"], 2)
+        self.assertEqual(results["a"]["calls"], 3)
+        self.assertFalse(results["b"]["success"])
+        self.assertEqual(results["b"]["retries"], 0)
+        self.assertEqual(results["c"]["result"], "审查意见")
+        self.assertGreater(results["c"]["latency"], 0)
+    
+    def test_concurrency_limit(self):
+        """测试并发数不超过上限"""
+        client = FakeAsyncClient({})
+        paths = [str(i) for i in range(10)]
+        
+        results = self.run_batch(client, paths, max_concurrency=3, requests_per_minute=6000)
+        
+        self.assertTrue(all(r["success"] for r in results.values()))
+        self.assertEqual(client.max_active, 3)
+    
+    def test_token_bucket(self):
+        """测试令牌桶限制请求速率"""
+        async def acquire_all():
+            bucket = TokenBucket(rate=50, capacity=2)
+            start = time.monotonic()
+            for _ in range(7):
+                await bucket.acquire()
+            return time.monotonic() - start
+        
+        # 2个突发令牌 + 5个按50/秒补充
+        self.assertGreaterEqual(asyncio.run(acquire_all()), 0.09)
+
+
+class TestTokenBudget(unittest.TestCase):
+    """测试token预算"""
+    
+    def test_estimate_tokens(self):
+        """测试中英文按不同比例估算"""
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("专利" * 50), 60)
+        self.assertEqual(estimate_tokens("a" * 100), 30)
+    
+    def test_plan(self):
+        """测试短文档单次调用，长文档按预算分段且合并调用不超出上下文"""
+        budget = TokenBudget()
+        
+        plan = budget.plan("技术领域\n" + "内容" * 1000, "请审查")
+        self.assertTrue(plan.single_call)
+        self.assertEqual(plan.output_tokens, TokenBudget.OUTPUT_TOKENS)
+        
+        document = "实施例" * 60000
+        plan = budget.plan(document, "请审查")
+        self.assertFalse(plan.single_call)
+        self.assertLessEqual(estimate_tokens("实" * plan.chunk_chars), TokenBudget.MAX_CHUNK_TOKENS)
+        chunk_count = -(-len(document) // plan.chunk_chars)
+        self.assertLessEqual(
+            chunk_count * plan.map_output_tokens + plan.output_tokens,
+            budget.limits.context_tokens
+        )
+    
+    def test_chunked_reviewer_uses_plan(self):
+        """测试默认按token预算切分并限制输出长度"""
+        client = FakeReviewClient()
+        client.review_with_prompt = mock.Mock(return_value="意见")
+        reviewer = ChunkedReviewer(client, budget=TokenBudget(max_chunk_tokens=2000))
+        
+        reviewer.review(TestChunkedReviewer.DOCUMENT, "请审查")
+        
+        self.assertGreater(client.review_with_prompt.call_count, 1)
+        for call in client.review_with_prompt.call_args_list:
+            # 按全文平均字符/token比例换算，单段允许少量偏差
+            self.assertLessEqual(estimate_tokens(call.args[0]), 2000 * 1.05)
+            self.assertEqual(call.kwargs["max_tokens"], TokenBudget.MAP_OUTPUT_TOKENS)
+    
+    def test_clean_pdf_pages(self):
+        """测试去除页眉页脚、页码和多余空白"""
+        pages = [
+            f"CN 112345678 A   说明书\n{i}/3页\n[000{i}]  第{i}段   内容\n\n\n\n{tail}\n- {i} -"
+            for i, tail in enumerate(["甲", "乙", "丙"], 1)
+        ]
+        
+        text = clean_pdf_pages(pages)
+        
+        self.assertNotIn("CN 112345678", text)
+        self.assertNotIn("页", text)
+        self.assertNotIn("- 2 -", text)
+        self.assertIn("[0002] 第2段 内容\n乙", text)
+
+    def test_clean_pdf_pages_keeps_body_digits(self):
+        """测试正文中只含数字的行（表格数值、附图标记）不被当作页码删除，包括紧邻页眉和页脚的行"""
+        pages = [
+            f"说明书\n{i}0\n{head}实验数据如下\n温度\n{i}25\n附图标记\n10\n{tail}\n{i}1\n{i}"
+            for i, head, tail in zip(range(1, 4), "甲乙丙", "子丑寅")
+        ]
+        
+        text = clean_pdf_pages(pages)
+        
+        self.assertNotIn("说明书", text)
+        self.assertIn("10\n甲实验数据如下\n温度\n125\n附图标记\n10\n子\n11", text)
+        self.assertIn("325", text)
+        self.assertIn("寅\n31", text)
+        self.assertNotIn("11\n1", text)
+        self.assertFalse(text.endswith("\n3"))
+
+
+class TestPrefixCache(unittest.TestCase):
+    """测试多提示词审查的上下文缓存友好布局"""
+    
+    def test_document_before_prompt(self):
+        """测试文档在前、审查要求在后，不同提示词共享相同前缀"""
+        first = DeepSeekClient.build_review_messages("说明书正文", "请检查术语")
+        second = DeepSeekClient.build_review_messages("说明书正文", "请检查格式")
+        
+        self.assertEqual(first[0], second[0])
+        user = first[1]["content"]
+        self.assertLess(user.index("说明书正文"), user.index("请检查术语"))
+        prefix = user[:user.index("请检查术语")]
+        self.assertTrue(second[1]["content"].startswith(prefix))
+    
+    def test_token_usage(self):
+        """测试累计DeepSeek和OpenAI两种格式的缓存命中用量"""
+        usage = TokenUsage()
+        usage.add(SimpleNamespace(
+            prompt_tokens=100, completion_tokens=10,
+            prompt_cache_hit_tokens=64, prompt_cache_miss_tokens=36
+        ))
+        usage.add(SimpleNamespace(
+            prompt_tokens=100, completion_tokens=5,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=80)
+        ))
+        usage.add(None)
+        
+        self.assertEqual(usage.to_dict(), {
+            'calls': 2, 'prompt_tokens': 200, 'completion_tokens': 15,
+            'cache_hit_tokens': 144, 'cache_miss_tokens': 56
+        })
+    
+    def test_review_prompts(self):
+        """测试预热一次后并发审查全部提示词，并复用结果缓存"""
+        client = FakeReviewClient(delay=0.05)
+        warm_up = mock.Mock(return_value="收到")
+        client.chat_completion = warm_up
+        prompts = ["请检查术语", "请检查格式", "请检查实施例"]
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ResponseCache(Path(temp_dir) / "ai_cache.db")
+            reviewer = AIReviewer(cache)
+            reviewer.client = client
+            
+            results = reviewer.review_prompts("说明书正文", prompts)
+            again = reviewer.review_prompts("说明书正文", prompts[:2])
+            cache.close()
+        
+        self.assertEqual(list(results), prompts)
+        self.assertTrue(all(r['success'] and not r['cached'] for r in results.values()))
+        self.assertEqual(warm_up.call_count, 1)
+        self.assertEqual(warm_up.call_args.kwargs["max_tokens"], 1)
+        self.assertEqual(client.max_active, len(prompts))
+        self.assertTrue(all(r['cached'] for r in again.values()))
+        self.assertEqual(len(client.reviewed), len(prompts))
+
+
+
+class TestSharedClient(unittest.TestCase):
+    """测试进程内共享的DeepSeek客户端"""
+    
+    def setUp(self):
+        self.env = mock.patch.dict("os.environ", {"DEEPSEEK_API_KEY": "test-key"})
+        self.env.start()
+        deepseek_client.close_shared_clients()
+    
+    def tearDown(self):
+        deepseek_client.close_shared_clients()
+        self.env.stop()
+    
+    def test_shared_instance(self):
+        """测试相同密钥和地址复用同一客户端，.env只加载一次"""
+        with mock.patch.object(deepseek_client, "_env_loaded", False), \
+                mock.patch.object(deepseek_client, "load_dotenv") as load_dotenv:
+            first = get_shared_client()
+            self.assertIs(get_shared_client(), first)
+            self.assertIsNot(get_shared_client(base_url="http://127.0.0.1:8000"), first)
+            self.assertEqual(load_dotenv.call_count, 1)
+        
+        self.assertIs(AIReviewer()._get_client(), first)
+        
+        deepseek_client.close_shared_clients()
+        self.assertIsNot(get_shared_client(), first)
+    
+    def test_timeout_from_env(self):
+        """测试从环境变量读取超时配置"""
+        with mock.patch.dict("os.environ", {"DEEPSEEK_TIMEOUT": "30", "DEEPSEEK_CONNECT_TIMEOUT": "2.5"}):
+            client = DeepSeekClient()
+        self.assertEqual(client.timeout.read, 30)
+        self.assertEqual(client.timeout.connect, 2.5)
+        self.assertEqual(client.client.timeout, client.timeout)
+        client.close()
+        
+        with mock.patch.dict("os.environ", {"DEEPSEEK_TIMEOUT": "abc"}):
+            with self.assertRaisesRegex(ValueError, "DEEPSEEK_TIMEOUT"):
+                DeepSeekClient()
+    
+    def test_async_client_per_loop(self):
+        """测试同一事件循环内复用异步客户端，不同事件循环各自创建"""
+        client = get_shared_client()
+        
+        async def get_twice():
+            first = client.async_client
+            self.assertIs(client.async_client, first)
+            await client.aclose()
+            return first
+        
+        self.assertIsNot(asyncio.run(get_twice()), asyncio.run(get_twice()))
+        self.assertEqual(client._async_clients, {})
+
+
+
+class TestMockLLMServer(unittest.TestCase):
+    """通过本地模拟LLM服务测试真实HTTP调用链路"""
+    
+    def test_stream_usage_and_prefix_cache(self):
+        """测试流式输出、用量统计、长连接复用和相同前缀的缓存命中"""
+        behavior = MockBehavior(latency=0, tokens_per_second=0, response_tokens=40)
+        with MockLLMServer(behavior) as server:
+            client = DeepSeekClient("mock", server.base_url)
+            usage = TokenUsage()
+            document = "本发明涉及一种专利审查装置。" * 100
+            
+            first = ''.join(client.stream_review_with_prompt(document, "请检查术语", usage=usage))
+            second = client.review_with_prompt(document, "请检查格式", usage=usage)
+            client.review_with_prompt(document, "请检查附图", usage=usage)
+            client.close()
+        
+        self.assertTrue(first)
+        self.assertEqual(first, second)
+        self.assertEqual(usage.calls, 3)
+        self.assertEqual(usage.completion_tokens, 120)
+        self.assertGreater(usage.cache_hit_tokens, estimate_tokens(document) // 2)
+        self.assertEqual(server.stats.streamed, 1)
+        # 非流式请求复用长连接
+        self.assertLess(server.stats.connections, server.stats.requests)
+    
+    def test_batch_retries_server_limit(self):
+        """测试服务端并发上限返回429时批量审查退避重试后全部成功"""
+        behavior = MockBehavior(latency=0.05, tokens_per_second=0, response_tokens=10, max_concurrency=1)
+        with MockLLMServer(behavior) as server:
+            client = DeepSeekClient("mock", server.base_url)
+            batch = AsyncBatchReviewer(AIReviewer(), client, max_concurrency=3, requests_per_minute=6000)
+            batch.BASE_DELAY = 0.01
+            
+            async def run():
+                try:
+                    return await batch.run(["a", "b", "c"], "请审查")
+                finally:
+                    await client.aclose()
+            
+            with mock.patch.object(AIReviewer, "extract_document_text", side_effect=lambda path: f"文档{path}"):
+                results = asyncio.run(run())
+            client.close()
+        
+        self.assertTrue(all(r["success"] for r in results.values()))
+        self.assertGreater(sum(r["retries"] for r in results.values()), 0)
+        self.assertEqual(server.stats.errors_429, sum(r["retries"] for r in results.values()))
+        self.assertEqual(server.stats.max_active, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,7 @@ from src.structure_checker.checker import StructureChecker
 from src.image_checker.checker import ImageChecker
 from src.alignment_checker.checker import AlignmentChecker
 from src.abstract_checker.checker import AbstractChecker
+from src.structure_checker.section_locator import SectionLocator
 
 
 class TestStructureChecker(unittest.TestCase):
@@ -30,6 +31,64 @@ class TestStructureChecker(unittest.TestCase):
         self.assertIsNotNone(checker.category)
 
 
+class TestSectionLocator(unittest.TestCase):
+    """测试章节定位器"""
+    
+    def setUp(self):
+        self.locator = SectionLocator(
+            ['技术领域', '背景技术', '发明内容', '附图说明', '具体实施方式'],
+            ['有益效果', '实施例']
+        )
+        self.paragraphs = [
+            '一种紧固装置',
+            '技术领域',
+            '本发明涉及机械领域。',
+            '背景技术',
+            '现有技术存在不足。',
+            '发明内容',
+            '有益效果',
+            '附图说明',
+            '图1为结构示意图。',
+            '具体实施方式',
+            '实施例1',
+        ]
+    
+    def test_locate_all_sections(self):
+        """测试单次扫描定位必需和可选章节"""
+        sections = self.locator.locate(self.paragraphs)
+        
+        self.assertEqual(sections['技术领域'].start, 1)
+        self.assertEqual(sections['技术领域'].end, 3)
+        self.assertTrue(sections['技术领域'].required)
+        self.assertFalse(sections['有益效果'].required)
+        self.assertEqual(sections['实施例'].end, len(self.paragraphs))
+        self.assertTrue(sections['附图说明'].contains(8))
+    
+    def test_long_paragraph_is_not_heading(self):
+        """测试长段落不视为章节标题"""
+        paragraphs = ['本发明的技术领域' + '很长的描述' * 20]
+        self.assertEqual(self.locator.locate(paragraphs), {})
+    
+    def test_order_violations(self):
+        """测试章节顺序检查"""
+        paragraphs = ['背景技术', '技术领域', '发明内容', '附图说明', '具体实施方式']
+        sections = self.locator.locate(paragraphs)
+        
+        violations = self.locator.find_order_violations(sections)
+        self.assertEqual(violations, [('技术领域', '背景技术')])
+    
+    def test_incremental_scan(self):
+        """测试增量扫描提前结束"""
+        scan = self.locator.begin()
+        for para in self.paragraphs[:10]:
+            scan.feed(para)
+        self.assertTrue(scan.required_complete)
+        self.assertFalse(scan.complete)
+        
+        sections = scan.finish()
+        self.assertIsNone(sections['具体实施方式'].end)
+
+
 class TestImageChecker(unittest.TestCase):
     """测试图像检查器"""
     
@@ -74,6 +133,22 @@ class TestAlignmentChecker(unittest.TestCase):
         gaps = checker._find_gaps(markers)
         self.assertTrue(len(gaps) > 0)
 
+    def test_spec_text_read_without_side_effects(self):
+        """测试标号检查不修改文档（结果可缓存），检测线程已读取全文时直接复用"""
+        spec_path = Path(__file__).parent.parent / "test_data" / "说明书.docx"
+        checker = AlignmentChecker()
+        doc = PatentDocument(specification_path=str(spec_path), figures=[])
+        
+        self.assertTrue(checker.CACHEABLE)
+        results = checker.check(doc)
+        self.assertNotIn("A004", [r.rule_id for r in results])
+        self.assertIsNone(doc.specification_content)
+        
+        # 已读取全文时不再重新读取文件
+        doc.specification_content = "部件12为壳体"
+        doc.specification_path = "/path/to/nonexistent.docx"
+        self.assertEqual(checker._read_spec_text(doc), "部件12为壳体")
+
 
 class TestAbstractChecker(unittest.TestCase):
     """测试摘要检查器"""
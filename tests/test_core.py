@@ -1,12 +1,21 @@
 """
 核心模块单元测试
 """
+import json
+import tempfile
 import unittest
+from datetime import datetime
+from pathlib import Path
+
+from src.core.config_loader import ConfigLoader
+from src.core.config_snapshot import compile_config
+from src.core.config_watcher import ConfigWatcher
+from src.core.history_store import HistoryStore
 from src.core.models import (
     Severity, CheckCategory, CheckResult, 
     PatentDocument, CheckReport
 )
-from src.core.rule_engine import BaseChecker, RuleEngine
+from src.core.rule_engine import BaseChecker, RuleEngine, ResultCache
 
 
 class TestModels(unittest.TestCase):
@@ -132,5 +141,336 @@ class TestRuleEngine(unittest.TestCase):
         self.assertEqual(results[0].severity, Severity.PASS)
 
 
+class TestCompactResults(unittest.TestCase):
+    """测试紧凑检查结果和列式统计表"""
+    
+    def _result(self, rule_id="I001", severity=Severity.WARNING, category=CheckCategory.IMAGE_FORMAT):
+        return CheckResult(
+            rule_id=rule_id,
+            category=category,
+            severity=severity,
+            title="分辨率不足",
+            description="图1分辨率低于200dpi",
+            location="".join(["图1", ".png"])
+        )
+    
+    def test_slots_and_interning(self):
+        """测试检查结果无实例字典且位置字符串共享"""
+        a, b = self._result(), self._result()
+        
+        self.assertFalse(hasattr(a, '__dict__'))
+        self.assertIs(a.location, b.location)
+        self.assertEqual(a, b)
+    
+    def test_lazy_details(self):
+        """测试details按需创建且to_dict保持兼容"""
+        result = self._result()
+        self.assertEqual(result.to_dict()['details'], {})
+        
+        result.details['dpi'] = 150
+        self.assertEqual(result.to_dict()['details'], {'dpi': 150})
+    
+    def test_details_keeps_caller_dict(self):
+        """测试传入的空字典不被丢弃，调用方之后填入的内容可见"""
+        details = {}
+        result = CheckResult(
+            rule_id="I001",
+            category=CheckCategory.IMAGE_FORMAT,
+            severity=Severity.WARNING,
+            title="分辨率不足",
+            description="图1分辨率低于200dpi",
+            location="图1.png",
+            details=details
+        )
+        details['dpi'] = 150
+        self.assertIs(result.details, details)
+        self.assertEqual(result.to_dict()['details'], {'dpi': 150})
+        
+        replaced = {}
+        result.details = replaced
+        replaced['dpi'] = 72
+        self.assertEqual(result.to_dict()['details'], {'dpi': 72})
+    
+    def test_result_table_counts(self):
+        """测试统计表计数与报告计数器一致"""
+        report = CheckReport()
+        for i in range(100):
+            report.add_result(self._result(
+                rule_id=f"I00{i % 3}",
+                severity=[Severity.ERROR, Severity.WARNING, Severity.PASS][i % 3],
+                category=CheckCategory.STRUCTURE if i < 10 else CheckCategory.IMAGE_FORMAT
+            ))
+        
+        table = report.table
+        self.assertEqual(len(table), 100)
+        self.assertEqual(table.severity_counts()[Severity.ERROR], report.errors)
+        self.assertEqual(table.rule_counts(), {'I000': 34, 'I001': 33, 'I002': 33})
+        
+        categories = table.category_counts()
+        self.assertEqual(list(categories), [CheckCategory.STRUCTURE, CheckCategory.IMAGE_FORMAT])
+        self.assertEqual(sum(categories[CheckCategory.STRUCTURE].values()), 10)
+
+
+class TestHistoryStore(unittest.TestCase):
+    """测试检测历史存储"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = HistoryStore(Path(self.temp_dir.name) / 'history.db')
+    
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+    
+    def _result(self, rule_id, severity):
+        return CheckResult(
+            rule_id=rule_id,
+            category=CheckCategory.IMAGE_FORMAT,
+            severity=severity,
+            title="附图检查",
+            description="图1分辨率不足",
+            location="图1.png",
+            details={'dpi': 150} if severity == Severity.ERROR else None
+        )
+    
+    def _add(self, folder, time, severity):
+        results = [self._result("I002", severity), self._result("I001", Severity.PASS)]
+        return self.store.add_run(folder, {'total': 2}, results, time=time)
+    
+    def test_paging(self):
+        """测试按时间倒序分页"""
+        for day in range(1, 6):
+            self._add(f"/patents/{day}", datetime(2026, 9, day), Severity.PASS)
+        
+        self.assertEqual(self.store.count_runs(), 5)
+        page = self.store.list_runs(limit=2, offset=2)
+        self.assertEqual([r['folder'] for r in page], ["/patents/3", "/patents/2"])
+    
+    def test_find_runs_by_rule_and_time(self):
+        """测试查询某月某规则未通过的检测"""
+        self._add("/patents/a", datetime(2026, 8, 30), Severity.ERROR)
+        run_id = self._add("/patents/b", datetime(2026, 9, 15), Severity.ERROR)
+        self._add("/patents/c", datetime(2026, 9, 20), Severity.PASS)
+        
+        runs = self.store.find_runs(
+            rule_id="I002", severities=["error", "warning"],
+            since=datetime(2026, 9, 1), until=datetime(2026, 10, 1)
+        )
+        self.assertEqual([r['id'] for r in runs], [run_id])
+        
+        results = self.store.get_results(run_id)
+        self.assertEqual(results[0]['details'], {'dpi': 150})
+        self.assertEqual(results[1]['details'], {})
+    
+    def test_latest_only_and_delete(self):
+        """测试每个文件夹只取最近一次及删除记录"""
+        self._add("/patents/a", datetime(2026, 9, 1), Severity.PASS)
+        latest = self._add("/patents/a", datetime(2026, 9, 2), Severity.PASS)
+        
+        runs = self.store.list_runs(latest_only=True)
+        self.assertEqual([r['id'] for r in runs], [latest])
+        
+        self.store.delete_run(latest)
+        self.assertEqual(self.store.count_runs(), 1)
+        self.assertEqual(self.store.get_results(latest), [])
+    
+    def test_full_text_search(self):
+        """测试全文搜索说明书和检查结果"""
+        spec_run = self.store.add_run(
+            "/patents/a", {'total': 0}, time=datetime(2026, 9, 1),
+            spec_text="本发明涉及一种齿轮减速器，包括壳体和输出轴。"
+        )
+        result_run = self._add("/patents/b", datetime(2026, 9, 2), Severity.ERROR)
+        
+        runs = self.store.search("齿轮减速器")
+        self.assertEqual([r['id'] for r in runs], [spec_run])
+        self.assertEqual(runs[0]['match'], 'spec')
+        self.assertIn("齿轮减速器", runs[0]['snippet'])
+        
+        # 少于3个字符的关键词和多关键词组合
+        self.assertEqual([r['id'] for r in self.store.search("壳体 输出轴")], [spec_run])
+        self.assertEqual([r['id'] for r in self.store.search("分辨率")], [result_run])
+        self.assertEqual(self.store.search("不存在的部件"), [])
+        
+        self.store.delete_run(spec_run)
+        self.assertEqual(self.store.search("齿轮减速器"), [])
+    
+    def test_short_terms_use_index(self):
+        """测试一两个字的关键词使用二元组索引，删除和重新打开后索引保持一致"""
+        first = self.store.add_run(
+            "/patents/a", {'total': 0}, time=datetime(2026, 9, 1), spec_text="壳体内设有齿轮，轴承位于端盖。"
+        )
+        second = self.store.add_run(
+            "/patents/b", {'total': 0}, time=datetime(2026, 9, 2), spec_text="支架上安装电机和轴。"
+        )
+        
+        self.assertEqual([r['id'] for r in self.store.search("壳体")], [first])
+        self.assertEqual([r['id'] for r in self.store.search("轴")], [second, first])
+        self.assertEqual([r['id'] for r in self.store.search("盖")], [first])
+        self.assertEqual([r['id'] for r in self.store.search("电机 轴")], [second])
+        self.assertEqual(self.store.search("体壳"), [])
+        
+        where, params = self.store._match_condition('spec_index', ["壳体"])
+        plan = ' '.join(row[3] for row in self.store._query(
+            f"EXPLAIN QUERY PLAN SELECT rowid FROM spec_index WHERE {where}", params
+        ))
+        self.assertIn("spec_short_index", plan)
+        
+        self.store.delete_run(first)
+        self.assertEqual(self.store.search("壳体"), [])
+        self.assertEqual([r['id'] for r in self.store.search("轴")], [second])
+        
+        # 旧版数据库没有二元组索引，重新打开时补建
+        self.store._conn.execute("DROP TABLE spec_short_index")
+        self.store._conn.execute("DROP TABLE result_short_index")
+        self.store.close()
+        self.store = HistoryStore(Path(self.temp_dir.name) / 'history.db')
+        self.assertEqual([r['id'] for r in self.store.search("电机")], [second])
+    
+    def test_migrate_json_once(self):
+        """测试旧版history.json只导入一次"""
+        history_file = Path(self.temp_dir.name) / 'history.json'
+        history_file.write_text(json.dumps([
+            {"folder": "/patents/a", "time": "2026-09-01 10:00:00", "summary": {"total": 3, "errors": 1}}
+        ]), encoding='utf-8')
+        
+        self.assertEqual(self.store.migrate_json(history_file), 1)
+        self.assertEqual(self.store.migrate_json(history_file), 0)
+        self.assertEqual(self.store.list_runs()[0]['summary']['errors'], 1)
+
+
+class TestConfigSnapshot(unittest.TestCase):
+    """测试配置快照"""
+    
+    RAW = {
+        "image_rules": {"resolution": {"min_dpi": 150}, "quality": {"max_color_pixel_ratio": 0.01}},
+        "marker_rules": {"validation": {"check_continuity": True}}
+    }
+    
+    def test_compile_typed_and_frozen(self):
+        """测试编译为不可变的类型化对象"""
+        snapshot = compile_config(self.RAW)
+        
+        self.assertEqual(snapshot.image.min_dpi, 150)
+        self.assertEqual(snapshot.image.max_color_pixel_ratio, 0.01)
+        self.assertEqual(snapshot.get("image_rules.resolution.min_dpi"), 150)
+        self.assertFalse(hasattr(snapshot.image, '__dict__'))
+        with self.assertRaises(AttributeError):
+            snapshot.image.min_dpi = 300
+    
+    def test_hashes(self):
+        """测试哈希与键顺序无关且按分区变化"""
+        snapshot = compile_config(self.RAW)
+        reordered = compile_config(json.loads(json.dumps(self.RAW, sort_keys=True)))
+        self.assertEqual(snapshot.version, reordered.version)
+        
+        changed = json.loads(json.dumps(self.RAW))
+        changed["image_rules"]["resolution"]["min_dpi"] = 300
+        changed = compile_config(changed)
+        self.assertNotEqual(changed.version, snapshot.version)
+        self.assertEqual(changed.changed_sections(snapshot), ('image_rules',))
+        self.assertEqual(changed.hash_of('marker_rules'), snapshot.hash_of('marker_rules'))
+    
+    def test_invalid_value(self):
+        """测试配置项类型错误"""
+        with self.assertRaises(ValueError):
+            compile_config({"image_rules": {"resolution": {"min_dpi": "high"}}})
+
+
+class CountingChecker(BaseChecker):
+    """记录调用次数的可缓存检查器"""
+    
+    SECTIONS = ('image_rules',)
+    CACHEABLE = True
+    
+    def __init__(self, snapshot):
+        super().__init__(snapshot=snapshot)
+        self.calls = 0
+    
+    def check(self, document):
+        self.calls += 1
+        return [CheckResult("T001", CheckCategory.IMAGE_FORMAT, Severity.PASS, "通过", "通过", "mock")]
+
+
+class TestResultCache(unittest.TestCase):
+    """测试检查结果缓存"""
+    
+    def test_cache_by_rules_hash(self):
+        """测试规则不变时复用结果，规则变化后重新检查"""
+        cache = ResultCache()
+        document = PatentDocument(specification_path="missing.docx")
+        snapshot = compile_config(TestConfigSnapshot.RAW)
+        checker = CountingChecker(snapshot)
+        
+        for _ in range(2):
+            engine = RuleEngine(result_cache=cache)
+            engine.register_checker(checker)
+            self.assertEqual(len(engine.run_checks(document)), 1)
+        self.assertEqual(checker.calls, 1)
+        
+        changed = compile_config({"image_rules": {"resolution": {"min_dpi": 300}}})
+        engine = RuleEngine(result_cache=cache)
+        engine.register_checker(CountingChecker(changed))
+        engine.run_checks(document)
+        self.assertEqual(len(cache), 2)
+        
+        self.assertEqual(cache.invalidate(('marker_rules',)), 0)
+        self.assertEqual(cache.invalidate(('image_rules',)), 2)
+
+
+class TestConfigWatcher(unittest.TestCase):
+    """测试检测规则热加载"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_path = Path(self.temp_dir.name) / "rules.json"
+        self.write_config(150)
+        
+        self.loader = ConfigLoader()
+        self.loader.load_config(str(self.config_path))
+        self.notified = []
+        self.loader.subscribe(self.on_changed)
+        self.watcher = ConfigWatcher(self.loader)
+    
+    def tearDown(self):
+        self.loader.unsubscribe(self.on_changed)
+        self.loader.reload()
+        self.temp_dir.cleanup()
+    
+    def on_changed(self, snapshot, changed):
+        self.notified.append(changed)
+    
+    def write_config(self, min_dpi, text=None):
+        if text is None:
+            text = json.dumps({
+                "image_rules": {"resolution": {"min_dpi": min_dpi}},
+                "marker_rules": {"validation": {"check_continuity": True}}
+            })
+        self.config_path.write_text(text, encoding='utf-8')
+    
+    def test_reload_changed_sections(self):
+        """测试文件稳定后热加载并只通知变化的分区"""
+        old = self.loader.snapshot()
+        self.write_config(300)
+        
+        self.assertIsNone(self.watcher.poll())  # 等待文件写入完成
+        self.assertEqual(self.watcher.poll(), ('image_rules',))
+        self.assertEqual(self.notified, [('image_rules',)])
+        self.assertEqual(self.loader.snapshot().image.min_dpi, 300)
+        
+        # 已持有的旧快照不受影响
+        self.assertEqual(old.image.min_dpi, 150)
+    
+    def test_invalid_config_kept(self):
+        """测试无效配置不替换当前快照"""
+        current = self.loader.snapshot()
+        self.write_config(0, text='{"image_rules": {"resolution": {"min_dpi": "high"}}}')
+        
+        self.watcher.poll()
+        self.assertIsNone(self.watcher.poll())
+        self.assertIs(self.loader.snapshot(), current)
+        self.assertEqual(self.notified, [])
+
+
 if __name__ == '__main__':
     unittest.main()
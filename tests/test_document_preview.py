@@ -6,7 +6,7 @@ import os
 from pathlib import Path
 import pytest
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QRect, QSize
 from PySide6.QtTest import QTest
 
 # 添加项目根目录到路径
@@ -14,6 +14,8 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from src.gui.document_preview_dialog import DocumentPreviewDialog, DocumentViewer, DocumentLoadThread
+from src.gui.page_cache import THUMBNAIL, PageCache
+from src.gui.page_renderer import PageRenderer, TileRenderer, pixmap_to_qimage
 from src.core.models import PatentDocument, CheckReport
 
 
@@ -46,6 +48,39 @@ def test_word_path():
     return None
 
 
+@pytest.fixture
+def long_pdf_path(tmp_path):
+    """生成30页的PDF"""
+    import pymupdf
+    
+    doc = pymupdf.open()
+    for i in range(30):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i + 1}")
+    path = tmp_path / "long.pdf"
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def load_pages(doc_type, file_path, page_cache=None):
+    """同步执行加载线程，返回页面列表"""
+    thread = DocumentLoadThread(doc_type, file_path, page_cache=page_cache)
+    results = {}
+    thread.finished.connect(lambda doc_type, pages: results.update(pages=pages))
+    thread.run()
+    return results['pages']
+
+
+def wait_until(condition, timeout=5000):
+    """处理事件直到条件成立"""
+    waited = 0
+    while not condition() and waited < timeout:
+        QTest.qWait(20)
+        waited += 20
+    return condition()
+
+
 class TestDocumentViewer:
     """测试DocumentViewer类"""
     
@@ -86,6 +121,276 @@ class TestDocumentViewer:
         assert viewer.zoom_factor == 1.0
 
 
+class TestOnDemandRendering:
+    """测试按需渲染"""
+    
+    def test_load_does_not_render(self, qapp, long_pdf_path):
+        """测试加载只读取页面尺寸"""
+        pages = load_pages("说明书", long_pdf_path)
+        
+        assert len(pages) == 30
+        assert abs(pages[0].size().width() - 595 * 1.5) <= 1
+        assert abs(pages[0].size(2.0).height() - 842 * 3.0) <= 2
+        pages[0].source.close()
+    
+    def test_renders_current_and_neighbours(self, qapp, long_pdf_path):
+        """测试只渲染当前页和相邻页，渲染期间显示占位文字"""
+        viewer = DocumentViewer()
+        viewer.set_pages(load_pages("说明书", long_pdf_path))
+        assert "正在渲染" in viewer.image_label.text()
+        
+        assert wait_until(lambda: viewer.image_label.pixmap() is not None and not viewer.image_label.pixmap().isNull())
+        assert viewer.image_label.pixmap().size() == viewer.pages[0].size()
+        assert wait_until(lambda: viewer.renderer.cached(1, 1.0) is not None)
+        
+        for _ in range(10):
+            viewer.next_page()
+        assert wait_until(lambda: viewer.renderer.cached(10, 1.0) is not None)
+        cached_pages = {index for index, _ in viewer.renderer._cache}
+        assert cached_pages <= {0, 1, 9, 10, 11} | set(range(2, 9))
+        assert len(viewer.renderer._cache) <= PageRenderer.MAX_CACHED_PAGES
+        
+        # 缩小时整页重新渲染（放大时改为分块渲染，见TestTileRendering）
+        viewer.zoom_out()
+        assert wait_until(lambda: viewer.renderer.cached(10, viewer.zoom_factor) is not None)
+        assert abs(viewer.image_label.pixmap().width() - viewer.pages[10].size(viewer.zoom_factor).width()) <= 1
+        viewer.close_document()
+    
+    def test_lru_limit(self, qapp, long_pdf_path):
+        """测试缓存页数不超过上限，最久未显示的页面先淘汰"""
+        pages = load_pages("说明书", long_pdf_path)
+        renderer = PageRenderer(max_cached_pages=3)
+        renderer.set_source(pages[0].source)
+        
+        for index in range(5):
+            renderer.request([index], 1.0)
+            assert wait_until(lambda: renderer.cached(index, 1.0) is not None)
+        
+        assert [key[0] for key in renderer._cache] == [2, 3, 4]
+        renderer.close()
+
+
+class TestTileRendering:
+    """测试高倍缩放时分块渲染视口"""
+    
+    def test_tile_matches_full_page(self, qapp, long_pdf_path):
+        """测试分块与整页渲染的对应区域一致"""
+        source = load_pages("说明书", long_pdf_path)[0].source
+        rect = TileRenderer.tile_rect(source, 0, 3.0, 0, 0)
+        assert rect.size() == QSize(TileRenderer.TILE_SIZE, TileRenderer.TILE_SIZE)
+        assert source.render_tile(0, 3.0, rect) == source.render(0, 3.0).copy(rect)
+        
+        # 页面右下角的分块不足TILE_SIZE
+        page_size = source.page_size(0, 3.0)
+        last = TileRenderer.tile_rect(
+            source, 0, 3.0,
+            (page_size.width() - 1) // TileRenderer.TILE_SIZE,
+            (page_size.height() - 1) // TileRenderer.TILE_SIZE
+        )
+        assert last.right() == page_size.width() - 1
+        assert last.bottom() == page_size.height() - 1
+        # MuPDF按页面边界取整，边缘分块可能相差1像素（绘制时拉伸到分块区域）
+        tile = source.render_tile(0, 3.0, last)
+        assert abs(tile.width() - last.width()) <= 1
+        assert abs(tile.height() - last.height()) <= 1
+        source.close()
+    
+    def test_word_tile_matches_full_page(self, qapp, tmp_path):
+        """测试Word页面分块与整页渲染一致"""
+        from docx import Document
+        
+        path = tmp_path / "spec.docx"
+        doc = Document()
+        for i in range(200):
+            doc.add_paragraph(f"第{i + 1}段 本发明涉及一种装置。")
+        doc.save(str(path))
+        source = load_pages("说明书", str(path))[0].source
+        
+        rect = TileRenderer.tile_rect(source, 1, 2.0, 1, 2)
+        assert source.render_tile(1, 2.0, rect) == source.render(1, 2.0).copy(rect)
+    
+    def test_requests_visible_tiles_only(self, qapp, long_pdf_path):
+        """测试只渲染可见区域的分块，各缩放比例的分块共用有上限的缓存"""
+        pages = load_pages("说明书", long_pdf_path)
+        renderer = TileRenderer(max_cached_tiles=6)
+        renderer.set_source(pages[0].source)
+        
+        visible = QRect(400, 100, 300, 300)
+        assert renderer.request_tiles(0, 4.0, visible) == {}
+        assert wait_until(lambda: len(renderer.request_tiles(0, 4.0, visible)) == 2)
+        assert set(renderer.request_tiles(0, 4.0, visible)) == {(0, 0), (1, 0)}
+        assert {key[2:] for key in renderer._cache} == {(0, 0), (1, 0)}
+        
+        for zoom in (2.0, 3.0, 5.0):
+            visible = QRect(0, 0, 1200, 1000)
+            assert wait_until(lambda: len(renderer.request_tiles(0, zoom, visible)) == 6)
+        assert len(renderer._cache) <= 6
+        assert {key[1] for key in renderer._cache} == {5.0}
+        renderer.close()
+    
+    def test_viewer_switches_to_tiles(self, qapp, long_pdf_path):
+        """测试放大后显示视口分块，缩小后恢复整页显示"""
+        viewer = DocumentViewer()
+        viewer.resize(800, 600)
+        viewer.show()
+        viewer.set_pages(load_pages("说明书", long_pdf_path))
+        assert wait_until(lambda: viewer.renderer.cached(0, 1.0) is not None)
+        
+        for _ in range(8):
+            viewer.zoom_in()
+        assert viewer.scroll_area.widget() is viewer.tile_view
+        assert viewer.tile_view.page_size == viewer.pages[0].size(viewer.zoom_factor)
+        assert viewer.tile_view.backdrop is not None
+        assert wait_until(lambda: len(viewer.tile_view.tiles) > 0)
+        
+        # 只渲染视口内的分块，不渲染该缩放比例的整页
+        page_size = viewer.pages[0].size(viewer.zoom_factor)
+        total_tiles = (
+            -(-page_size.width() // TileRenderer.TILE_SIZE) * -(-page_size.height() // TileRenderer.TILE_SIZE)
+        )
+        assert len(viewer.tile_renderer._cache) < total_tiles
+        assert viewer.renderer.cached(0, viewer.zoom_factor) is None
+        
+        viewer.fit_to_window()
+        assert viewer.scroll_area.widget() is viewer.image_label
+        assert viewer.image_label.pixmap().size() == viewer.pages[0].size()
+        viewer.close_document()
+
+
+class TestPixmapConversion:
+    """测试PyMuPDF像素图直接转换为QImage"""
+    
+    @pytest.mark.parametrize("alpha", [False, True])
+    def test_matches_png_roundtrip(self, qapp, alpha):
+        """测试与PNG编码解码的结果一致（奇数宽度、半透明像素）"""
+        import pymupdf
+        from PySide6.QtGui import QImage
+        
+        doc = pymupdf.open()
+        page = doc.new_page(width=101, height=53)
+        page.draw_rect(pymupdf.Rect(0, 0, 50, 53), fill=(1, 0, 0), fill_opacity=0.5, width=0)
+        page.insert_text((10, 40), "Test")
+        pix = page.get_pixmap(alpha=alpha)
+        
+        image = pixmap_to_qimage(pix)
+        expected = QImage.fromData(pix.tobytes("png")).convertToFormat(image.format())
+        del pix
+        doc.close()
+        
+        assert image.size() == expected.size()
+        assert image == expected
+
+
+class TestPageCache:
+    """测试预览页面磁盘缓存"""
+    
+    @staticmethod
+    def make_image(width, height, color):
+        from PySide6.QtGui import QImage
+        
+        image = QImage(width, height, QImage.Format_RGB32)
+        image.fill(color)
+        return image
+    
+    def test_image_roundtrip(self, qapp, tmp_path):
+        """测试图像按页码、缩放比例和类型分别保存"""
+        cache = PageCache(tmp_path / "preview.db")
+        image = self.make_image(101, 53, Qt.red)
+        cache.put_image("doc", 0, 1.0, image)
+        
+        assert cache.get_image("doc", 0, 1.0) == image
+        assert cache.get_image("doc", 0, 1.0, THUMBNAIL) is None
+        assert cache.get_image("doc", 0, 1.2) is None
+        assert cache.get_image("doc", 1, 1.0) is None
+        assert cache.get_image("other", 0, 1.0) is None
+        cache.close()
+    
+    def test_file_hash(self, qapp, tmp_path):
+        """测试文件哈希随内容变化"""
+        cache = PageCache(tmp_path / "preview.db")
+        path = tmp_path / "a.pdf"
+        path.write_bytes(b"first")
+        first = cache.file_hash(str(path))
+        assert cache.file_hash(str(path)) == first
+        
+        path.write_bytes(b"second")
+        os.utime(path, ns=(0, 12345))
+        assert cache.file_hash(str(path)) != first
+        cache.close()
+    
+    def test_evicts_least_recently_used(self, qapp, tmp_path):
+        """测试超过大小上限时淘汰最久未使用的图像"""
+        from PySide6.QtGui import QImage
+        
+        # 随机像素几乎不可压缩，每张约100KB
+        noise = QImage(os.urandom(160 * 160 * 4), 160, 160, QImage.Format_RGB32)
+        cache = PageCache(tmp_path / "preview.db", max_mb=0.25)
+        cache.put_image("doc", 0, 1.0, noise)
+        cache.put_image("doc", 1, 1.0, noise)
+        assert cache.get_image("doc", 0, 1.0) is not None
+        cache.put_image("doc", 2, 1.0, noise)
+        
+        assert cache.total_bytes() <= cache.max_bytes
+        assert cache.get_image("doc", 1, 1.0) is None
+        assert cache.get_image("doc", 0, 1.0) is not None
+        assert cache.get_image("doc", 2, 1.0) is not None
+        cache.close()
+    
+    def test_word_reopen_uses_cache(self, qapp, tmp_path, monkeypatch):
+        """测试重新打开Word文档时使用缓存的分页结果和页面，不重新排版"""
+        from docx import Document
+        import src.gui.document_preview_dialog as preview
+        
+        path = tmp_path / "spec.docx"
+        doc = Document()
+        for i in range(200):
+            doc.add_paragraph(f"第{i + 1}段 本发明涉及一种装置。")
+        doc.save(str(path))
+        cache = PageCache(tmp_path / "preview.db")
+        
+        pages = load_pages("说明书", str(path), cache)
+        renderer = PageRenderer(page_cache=cache)
+        renderer.set_source(pages[0].source)
+        renderer.request([0], 1.0)
+        assert wait_until(lambda: renderer.cached(0, 1.0) is not None)
+        first = renderer.cached(0, 1.0).toImage()
+        renderer.close()
+        
+        builds = []
+        original = preview.build_word_document
+        monkeypatch.setattr(preview, "build_word_document", lambda *args: builds.append(1) or original(*args))
+        reopened = load_pages("说明书", str(path), cache)
+        assert [page.size() for page in reopened] == [page.size() for page in pages]
+        
+        renderer = PageRenderer(page_cache=cache)
+        renderer.set_source(reopened[0].source)
+        renderer.request([0], 1.0)
+        assert wait_until(lambda: renderer.cached(0, 1.0) is not None)
+        assert renderer.cached(0, 1.0).toImage() == first
+        assert builds == []
+        renderer.close()
+        cache.close()
+    
+    def test_thumbnails(self, qapp, long_pdf_path, tmp_path):
+        """测试缩略图列表和缩略图写入缓存"""
+        cache = PageCache(tmp_path / "preview.db")
+        viewer = DocumentViewer(page_cache=cache)
+        viewer.set_pages(load_pages("说明书", long_pdf_path, cache))
+        
+        assert viewer.thumb_list.count() == 30
+        assert viewer.thumb_list.item(0).text() == "第1页"
+        assert wait_until(lambda: not viewer.thumb_list.item(0).icon().isNull())
+        source_id = viewer.pages[0].source.source_id
+        assert cache.get_image(source_id, 0, viewer.thumbnail_scale(), THUMBNAIL) is not None
+        
+        viewer.thumb_list.setCurrentRow(5)
+        assert viewer.current_page == 5
+        viewer.next_page()
+        assert viewer.thumb_list.currentRow() == 6
+        viewer.close_document()
+        cache.close()
+
+
 class TestDocumentLoadThread:
     """测试DocumentLoadThread类"""
     
@@ -230,6 +535,18 @@ class TestDocumentPreviewDialog:
         dialog.documents = documents
         # 应该能正常处理，不会崩溃
 
+    def test_accept_closes_documents(self, qapp, long_pdf_path):
+        """测试点击关闭按钮（accept）时释放已打开的文档"""
+        dialog = DocumentPreviewDialog()
+        dialog.set_documents({"说明书": long_pdf_path})
+        viewer = dialog.viewers["说明书"]
+        assert wait_until(lambda: len(viewer.pages) == 30)
+        source = viewer.pages[0].source
+        assert source._doc is not None
+        
+        dialog.accept()
+        assert source._doc is None
+
 
 class TestIntegration:
     """集成测试"""
@@ -0,0 +1,281 @@
+"""
+文件解析模块测试
+"""
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pymupdf
+import pytesseract
+from docx import Document
+from PIL import Image
+
+from src.file_parser.docx_stream import DocxStreamReader
+from src.file_parser.parser import FileParser
+from src.file_parser.pdf_ocr import ImageRegion, OcrRasterizer, PdfPageAnalyzer
+
+
+class TestDocxStreamReader(unittest.TestCase):
+    """测试流式DOCX读取器"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        
+        image_path = os.path.join(cls.temp_dir.name, 'fig.png')
+        Image.new('RGB', (20, 10), 'white').save(image_path)
+        
+        doc = Document()
+        doc.add_paragraph('技术领域')
+        doc.add_paragraph('本发明涉及一种紧固装置。')
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = '标号'
+        table.cell(0, 1).text = '名称'
+        table.cell(1, 0).text = '12'
+        table.cell(1, 1).text = '螺栓'
+        doc.add_picture(image_path)
+        doc.add_paragraph('具体实施方式')
+        
+        cls.docx_path = os.path.join(cls.temp_dir.name, '说明书.docx')
+        doc.save(cls.docx_path)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+    
+    def test_paragraphs_match_python_docx(self):
+        """测试段落文本与python-docx一致"""
+        expected = [p.text for p in Document(self.docx_path).paragraphs]
+        self.assertEqual(list(FileParser.iter_word_paragraphs(self.docx_path)), expected)
+    
+    def test_blocks_in_document_order(self):
+        """测试按文档顺序产出段落、表格和图片"""
+        blocks = list(FileParser.iter_word_blocks(self.docx_path))
+        kinds = [b.kind for b in blocks]
+        
+        self.assertLess(kinds.index('table'), kinds.index('image'))
+        
+        table = next(b for b in blocks if b.kind == 'table')
+        self.assertEqual(table.rows, [['标号', '名称'], ['12', '螺栓']])
+    
+    def test_read_image_part(self):
+        """测试读取图片数据"""
+        with DocxStreamReader(self.docx_path) as reader:
+            image = next(b for b in reader.iter_blocks() if b.kind == 'image')
+            data = reader.read_part(image.target)
+        
+        self.assertTrue(image.target.startswith('word/media/'))
+        self.assertTrue(data.startswith(b'\x89PNG'))
+    
+    def test_invalid_file(self):
+        """测试非DOCX文件"""
+        path = os.path.join(self.temp_dir.name, 'broken.docx')
+        with open(path, 'wb') as f:
+            f.write(b'not a zip')
+        
+        with self.assertRaises(ValueError):
+            list(FileParser.iter_word_paragraphs(path))
+
+
+class TestPdfPageIterator(unittest.TestCase):
+    """测试PDF逐页文本迭代"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.pdf_path = os.path.join(cls.temp_dir.name, '说明书.pdf')
+        
+        doc = pymupdf.open()
+        for heading in ['技术领域', '背景技术', '发明内容']:
+            page = doc.new_page()
+            page.insert_text((72, 72), heading, fontname='china-s')
+            page.insert_text((72, 100), '正文内容', fontname='china-s')
+        doc.save(cls.pdf_path)
+        doc.close()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+    
+    def test_page_records(self):
+        """测试单页结果包含文本、文本块和耗时"""
+        pages = list(FileParser.iter_pdf_pages(self.pdf_path, use_ocr=False))
+        
+        self.assertEqual([p.page_number for p in pages], [1, 2, 3])
+        self.assertIn('背景技术', pages[1].text)
+        self.assertTrue(pages[1].blocks)
+        self.assertFalse(pages[1].ocr_used)
+        self.assertGreaterEqual(pages[1].elapsed, 0.0)
+    
+    def test_stop_early(self):
+        """测试提前停止迭代"""
+        pages = FileParser.iter_pdf_pages(self.pdf_path, use_ocr=False)
+        first = next(pages)
+        pages.close()
+        
+        self.assertEqual(first.page_number, 1)
+    
+    def test_extract_text_wrapper(self):
+        """测试字符串接口与逐页接口一致"""
+        text = FileParser.extract_pdf_text(self.pdf_path, use_ocr=False)
+        pages = FileParser.iter_pdf_pages(self.pdf_path, use_ocr=False)
+        
+        self.assertEqual(text, ''.join(p.text + '\n' for p in pages))
+    
+    def test_invalid_file(self):
+        """测试无法打开的PDF"""
+        with self.assertRaises(ValueError):
+            next(FileParser.iter_pdf_pages('/path/to/nonexistent.pdf'))
+
+
+class TestPdfPageAnalyzer(unittest.TestCase):
+    """测试PDF图片区域OCR"""
+    
+    def setUp(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 200), 'white').save(buffer, format='PNG')
+        self.image_png = buffer.getvalue()
+        
+        self.doc = pymupdf.open()
+        self.page = self.doc.new_page()
+        self.page.insert_text((72, 72), '技术领域', fontname='china-s')
+        self.image_rect = pymupdf.Rect(100, 200, 300, 300)
+        self.page.insert_image(self.image_rect, stream=self.image_png)
+        self.analyzer = PdfPageAnalyzer()
+    
+    def tearDown(self):
+        self.doc.close()
+    
+    def test_image_regions(self):
+        """测试图片区域及渲染倍率"""
+        regions = self.analyzer.image_regions(self.page)
+        
+        self.assertEqual(len(regions), 1)
+        self.assertEqual(regions[0].rect, self.image_rect)
+        self.assertAlmostEqual(regions[0].native_scale, 2.0)
+    
+    def test_ocr_only_image_region(self):
+        """测试混合页面只对图片区域做OCR并合并文本"""
+        with mock.patch('src.file_parser.pdf_ocr.pytesseract.image_to_string',
+                        return_value='扫描插图文字') as ocr:
+            text, blocks, ocr_used = self.analyzer.analyze(self.page)
+        
+        self.assertTrue(ocr_used)
+        self.assertEqual(ocr.call_count, 1)
+        image = ocr.call_args[0][0]
+        self.assertEqual(image.mode, 'L')
+        self.assertLess(image.size[0], 450)
+        self.assertLess(text.index('技术领域'), text.index('扫描插图文字'))
+    
+    def test_ocr_failure_keeps_text_layer(self):
+        """测试图片区域OCR失败时仍返回文本层"""
+        with mock.patch('src.file_parser.pdf_ocr.pytesseract.image_to_string',
+                        side_effect=RuntimeError('tesseract is not installed')):
+            text, blocks, ocr_used = self.analyzer.analyze(self.page)
+        
+        self.assertFalse(ocr_used)
+        self.assertIn('技术领域', text)
+        self.assertTrue(blocks)
+    
+    def test_ocr_failure_without_text_layer(self):
+        """测试没有文本层的页面OCR失败时报错"""
+        page = self.doc.new_page()
+        
+        with mock.patch('src.file_parser.pdf_ocr.pytesseract.image_to_string',
+                        side_effect=RuntimeError('tesseract is not installed')):
+            with self.assertRaises(RuntimeError):
+                self.analyzer.analyze(page)
+    
+    def test_tesseract_missing_skips_ocr(self):
+        """测试未安装Tesseract时只提示一次，之后的图片区域不再渲染和识别"""
+        for _ in range(3):
+            page = self.doc.new_page()
+            page.insert_text((72, 72), '具体实施方式', fontname='china-s')
+            page.insert_image(self.image_rect, stream=self.image_png)
+        
+        output = io.StringIO()
+        with mock.patch('src.file_parser.pdf_ocr.pytesseract.image_to_string',
+                        side_effect=pytesseract.TesseractNotFoundError()) as ocr, \
+                mock.patch.object(self.analyzer.rasterizer, 'rasterize',
+                                  wraps=self.analyzer.rasterizer.rasterize) as rasterize, \
+                contextlib.redirect_stdout(output):
+            texts = [self.analyzer.analyze(page)[0] for page in self.doc]
+            with self.assertRaises(pytesseract.TesseractNotFoundError):
+                self.analyzer.analyze(self.doc.new_page())
+        
+        self.assertEqual(ocr.call_count, 1)
+        self.assertEqual(rasterize.call_count, 1)
+        self.assertEqual(output.getvalue().count('⚠️'), 1)
+        self.assertIn('技术领域', texts[0])
+        self.assertTrue(all('具体实施方式' in text for text in texts[1:]))
+    
+    def test_extract_text_with_failing_ocr(self):
+        """测试含插图的文本PDF在OCR不可用时仍能提取全文"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, '说明书.pdf')
+            self.doc.save(path)
+            
+            with mock.patch('src.file_parser.pdf_ocr.pytesseract.image_to_string',
+                            side_effect=RuntimeError('tesseract is not installed')):
+                text = FileParser.extract_pdf_text(path)
+        
+        self.assertIn('技术领域', text)
+    
+    def test_text_only_page_skips_ocr(self):
+        """测试纯文本页面不调用OCR"""
+        page = self.doc.new_page()
+        page.insert_text((72, 72), '背景技术', fontname='china-s')
+        
+        with mock.patch('src.file_parser.pdf_ocr.pytesseract.image_to_string') as ocr:
+            text, blocks, ocr_used = self.analyzer.analyze(page)
+        
+        self.assertFalse(ocr_used)
+        ocr.assert_not_called()
+        self.assertIn('背景技术', text)
+
+
+class TestOcrRasterizer(unittest.TestCase):
+    """测试OCR光栅化器"""
+    
+    def setUp(self):
+        self.rasterizer = OcrRasterizer(target_dpi=300, min_dpi=150, max_pixels=12_000_000)
+    
+    def test_scale_for_a4_page(self):
+        """测试A4页面按目标分辨率渲染"""
+        scale = self.rasterizer.choose_scale(pymupdf.paper_rect('a4'))
+        self.assertAlmostEqual(scale, 300 / 72)
+    
+    def test_scale_capped_by_pixels(self):
+        """测试大幅面页面受像素上限约束"""
+        rect = pymupdf.paper_rect('a0')
+        scale = self.rasterizer.choose_scale(rect)
+        
+        self.assertLess(scale, 300 / 72)
+        self.assertLessEqual(rect.width * rect.height * scale * scale, 12_000_000 * 1.0001)
+    
+    def test_scale_limited_by_native_resolution(self):
+        """测试图片区域不超过原始分辨率渲染，但不低于最低分辨率"""
+        rect = pymupdf.Rect(0, 0, 100, 100)
+        self.assertAlmostEqual(self.rasterizer.choose_scale(rect, native_scale=3.0), 3.0)
+        self.assertAlmostEqual(self.rasterizer.choose_scale(rect, native_scale=0.5), 150 / 72)
+    
+    def test_rasterize_grayscale(self):
+        """测试直接渲染为灰度图"""
+        doc = pymupdf.open()
+        page = doc.new_page()
+        region = ImageRegion(rect=pymupdf.Rect(0, 0, 72, 36))
+        
+        pix = self.rasterizer.rasterize(page, region)
+        image = OcrRasterizer.to_image(pix)
+        
+        self.assertEqual(pix.n, 1)
+        self.assertEqual(image.mode, 'L')
+        self.assertEqual(image.size, (300, 150))
+        doc.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
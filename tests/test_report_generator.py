@@ -0,0 +1,178 @@
+"""
+报告生成模块测试
+"""
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import reportlab
+
+from reportlab.platypus import Table
+
+from src.core.models import CheckReport, CheckResult, CheckCategory, Severity, PatentDocument
+from src.report_generator.fonts import FontManager, FONT_NAME, FALLBACK_FONT
+from src.report_generator.pdf_generator import PDFReportGenerator
+from src.report_generator.json_writer import JSONReportWriter, write_report_json
+
+
+REPORTLAB_FONT_DIR = os.path.join(os.path.dirname(reportlab.__file__), 'fonts')
+
+
+class TestFontManager(unittest.TestCase):
+    """测试中文字体管理器"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index_path = Path(self.temp_dir.name) / 'font_index.json'
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def _manager(self, font_files):
+        return FontManager(
+            index_path=self.index_path,
+            font_dirs=[REPORTLAB_FONT_DIR],
+            font_files=font_files,
+            font_paths=[]
+        )
+    
+    def test_discover_and_register(self):
+        """测试在字体目录中按优先级查找字体"""
+        manager = self._manager(['missing.ttc', 'Vera.ttf'])
+        
+        self.assertEqual(manager.get_font_name(), FONT_NAME)
+        self.assertTrue(self.index_path.exists())
+    
+    def test_index_skips_discovery(self):
+        """测试字体索引命中时不再查找字体"""
+        self._manager(['Vera.ttf']).get_font_name()
+        
+        manager = self._manager(['Vera.ttf'])
+        with mock.patch.object(FontManager, '_discover') as discover:
+            self.assertEqual(manager.get_font_name(), FONT_NAME)
+        discover.assert_not_called()
+    
+    def test_registers_once_per_manager(self):
+        """测试同一管理器只注册一次"""
+        manager = self._manager(['Vera.ttf'])
+        with mock.patch.object(FontManager, '_register', return_value=True) as register:
+            manager.get_font_name()
+            manager.get_font_name()
+        self.assertEqual(register.call_count, 1)
+    
+    def test_fallback_font(self):
+        """测试未找到字体时回退"""
+        manager = self._manager(['missing.ttc'])
+        self.assertEqual(manager.get_font_name(), FALLBACK_FONT)
+
+
+class TestPDFReportGenerator(unittest.TestCase):
+    """测试PDF报告生成器"""
+    
+    def _report(self, count):
+        report = CheckReport(document=PatentDocument(specification_path="说明书.docx"))
+        for i in range(count):
+            report.add_result(CheckResult(
+                rule_id="I001",
+                category=CheckCategory.IMAGE_FORMAT if i % 2 else CheckCategory.STRUCTURE,
+                severity=Severity.WARNING,
+                title=f"图{i}",
+                description="分辨率 < 200dpi & 颜色异常",
+                location=f"图{i}.png"
+            ))
+        return report
+    
+    def _tables(self, story):
+        return [f for f in story if isinstance(f, Table)]
+    
+    def test_results_chunked_into_tables(self):
+        """测试检查结果按类别分组并分块成表格"""
+        generator = PDFReportGenerator({'group_by_category': True, 'include_summary': False,
+                                        'include_statistics': False})
+        generator.ROWS_PER_TABLE = 10
+        tables = self._tables(generator.build_story(self._report(30)))
+        
+        # 每类15项，各分为10+5两个表格（另加表头行）
+        self.assertEqual([len(t._cellvalues) for t in tables], [11, 6, 11, 6])
+    
+    def test_output_options(self):
+        """测试摘要与分类统计开关"""
+        report = self._report(4)
+        full = PDFReportGenerator({'group_by_category': False})
+        bare = PDFReportGenerator({'group_by_category': False, 'include_summary': False,
+                                   'include_statistics': False})
+        
+        self.assertEqual(len(self._tables(full.build_story(report))), 3)
+        self.assertEqual(len(self._tables(bare.build_story(report))), 1)
+    
+    def test_generate_escapes_markup(self):
+        """测试包含特殊字符的结果可以正常生成PDF"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, 'report.pdf')
+            report = self._report(5)
+            report.ai_review_result = "结论: <b>未闭合 & 标签"
+            PDFReportGenerator().generate(report, output_path)
+            self.assertGreater(os.path.getsize(output_path), 0)
+
+
+class TestJSONReportWriter(unittest.TestCase):
+    """测试流式JSON报告写入器"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.temp_dir.name, 'report.json')
+        
+        self.report = CheckReport()
+        for i in range(3):
+            self.report.add_result(CheckResult(
+                rule_id=f"S00{i}",
+                category=CheckCategory.STRUCTURE,
+                severity=Severity.WARNING,
+                title="章节\"缺失\"",
+                description="第一行\n第二行",
+                location="说明书",
+                details={'sections': ['技术领域']}
+            ))
+        self.report.ai_review_result = "审查结论"
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def _read(self):
+        with open(self.output_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def test_matches_to_dict(self):
+        """测试缩进和紧凑格式的内容都与to_dict一致"""
+        for compact in (False, True):
+            write_report_json(self.report, self.output_path, compact=compact)
+            self.assertEqual(json.loads(self._read()), self.report.to_dict())
+    
+    def test_indented_format(self):
+        """测试缩进格式与json.dump(indent=2)一致"""
+        write_report_json(self.report, self.output_path)
+        expected = json.dumps(json.loads(self._read()), ensure_ascii=False, indent=2)
+        self.assertEqual(self._read(), expected)
+    
+    def test_compact_one_result_per_line(self):
+        """测试紧凑格式每个结果一行"""
+        write_report_json(self.report, self.output_path, compact=True)
+        lines = self._read().split('\n')
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[1].rstrip(','))['rule_id'], "S000")
+    
+    def test_results_flushed_immediately(self):
+        """测试结果写入后立即可见"""
+        with JSONReportWriter(self.output_path, compact=True) as writer:
+            writer.begin(self.report)
+            writer.write_result(self.report.results[0])
+            self.assertIn('"S000"', self._read())
+            writer.finish(self.report)
+        self.assertEqual(writer.result_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()